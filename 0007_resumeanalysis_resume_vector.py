@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resume', '0006_analysisjob'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='resumeanalysis',
+            name='resume_embedding',
+        ),
+        migrations.AddField(
+            model_name='resumeanalysis',
+            name='resume_vector',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resume', '0007_resumeanalysis_resume_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobListingSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(max_length=255)),
+                ('location', models.CharField(max_length=255)),
+                ('listings', models.JSONField(default=list)),
+                ('fetched_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('role', 'location')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+import uuid
+
+from django.db import migrations, models
+
+
+def gen_public_ids(apps, schema_editor):
+    ResumeAnalysis = apps.get_model('resume', 'ResumeAnalysis')
+    for analysis in ResumeAnalysis.objects.only('pk').iterator():
+        analysis.public_id = uuid.uuid4()
+        analysis.save(update_fields=['public_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resume', '0008_joblistingsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumeanalysis',
+            name='public_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, null=True),
+        ),
+        migrations.RunPython(gen_public_ids, reverse_code=migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='resumeanalysis',
+            name='public_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
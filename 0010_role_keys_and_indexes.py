@@ -0,0 +1,88 @@
+from django.db import migrations, models
+
+
+def _role_key(role_name):
+    return " ".join((role_name or "").split()).casefold()
+
+
+def fill_role_keys(apps, schema_editor):
+    for model_name, name_field, preference in (
+        ('RoleMarketBenchmark', 'role', ('-updated_at', '-pk')),
+        # A locked profile is the one analyses were scored against
+        ('RoleSkill', 'role_name', ('-is_locked', '-updated_at', '-pk')),
+    ):
+        model = apps.get_model('resume', model_name)
+        max_length = model._meta.get_field('role_key').max_length
+        seen = set()
+        # Rows that only differ by case or spacing can't share a key. The
+        # preferred row gets the plain one, which lookups use; the others are
+        # kept under "<key>#<pk>", which models.stored_role_key preserves
+        for row in model.objects.only('pk', name_field).order_by(*preference).iterator():
+            key = _role_key(getattr(row, name_field))
+            if key in seen:
+                suffix = f"#{row.pk}"
+                key = f"{key[:max_length - len(suffix)]}{suffix}"
+            else:
+                seen.add(key)
+            model.objects.filter(pk=row.pk).update(role_key=key)
+
+    ResumeAnalysis = apps.get_model('resume', 'ResumeAnalysis')
+    for row in ResumeAnalysis.objects.only('pk', 'target_role').iterator():
+        ResumeAnalysis.objects.filter(pk=row.pk).update(role_key=_role_key(row.target_role))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resume', '0009_resumeanalysis_public_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rolemarketbenchmark',
+            name='role_key',
+            field=models.CharField(editable=False, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='roleskill',
+            name='role_key',
+            field=models.CharField(editable=False, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='resumeanalysis',
+            name='role_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_role_keys, reverse_code=migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='rolemarketbenchmark',
+            name='role_key',
+            field=models.CharField(editable=False, max_length=100, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='roleskill',
+            name='role_key',
+            field=models.CharField(editable=False, max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='analysisjob',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='resumeanalysis',
+            index=models.Index(fields=['role_key', '-created_at'], name='analysis_role_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resumeanalysis',
+            index=models.Index(fields=['created_at', 'role_key'], name='analysis_created_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='analysisjob',
+            index=models.Index(fields=['status', 'created_at'], name='analysisjob_claim_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='analysisjob',
+            index=models.Index(fields=['status', 'started_at'], name='analysisjob_stale_idx'),
+        ),
+    ]
@@ -1,52 +1,79 @@
 import os
-import requests
 import logging
+import time
+from django.conf import settings
+from resume import http_client
+from resume.metrics import ADZUNA_REQUEST_SECONDS
 
 logger = logging.getLogger(__name__)
 
-def fetch_live_jobs(role: str, location: str = "India") -> list:
+DEFAULT_ADZUNA_API_BASE = "https://api.adzuna.com/v1/api"
+
+def _search_url():
+    base = getattr(settings, 'ADZUNA_API_BASE', None) or DEFAULT_ADZUNA_API_BASE
+    return f"{base.rstrip('/')}/jobs/in/search/1"
+
+def _timed_get(params):
+    started = time.perf_counter()
+    status = "error"
+    try:
+        response = http_client.get(_search_url(), params=params, timeout=10)
+        status = response.status_code
+        return response
+    finally:
+        ADZUNA_REQUEST_SECONDS.observe(time.perf_counter() - started, status=status)
+
+def _build_search_params(role, location, results_per_page=5):
     app_id = os.getenv("ADZUNA_APP_ID")
     app_key = os.getenv("ADZUNA_APP_KEY")
     
     if not app_id or not app_key:
         logger.error("Adzuna API credentials missing in environment variables.")
-        return []
+        return None
 
-    base_url = "https://api.adzuna.com/v1/api/jobs/in/search/1"
-    
-    params = {
+    return {
         "app_id": app_id,
         "app_key": app_key,
         "what": role,
         "where": location,
-        "results_per_page": 5,
+        "results_per_page": results_per_page,
         "content-type": "application/json"
     }
 
-    try:
-        response = requests.get(base_url, params=params, timeout=10)
-        
-        if response.status_code != 200:
-            logger.error(f"Adzuna API returned status code {response.status_code}")
-            return []
-            
-        data = response.json()
-        results = data.get("results", [])
+def _structure_jobs(response):
+    data = response.json()
+    results = data.get("results", [])
+    
+    structured_jobs = []
+    for job in results:
+        structured_jobs.append({
+            "title": job.get("title", "").replace("<strong>", "").replace("</strong>", ""),
+            "company": job.get("company", {}).get("display_name", ""),
+            "location": job.get("location", {}).get("display_name", ""),
+            "salary_min": job.get("salary_min"),
+            "salary_max": job.get("salary_max"),
+            "redirect_url": job.get("redirect_url", ""),
+            "description": job.get("description", "").replace("<strong>", "").replace("</strong>", "")[:150] + "..."
+        })
         
-        structured_jobs = []
-        for job in results:
-            structured_jobs.append({
-                "title": job.get("title", "").replace("<strong>", "").replace("</strong>", ""),
-                "company": job.get("company", {}).get("display_name", ""),
-                "location": job.get("location", {}).get("display_name", ""),
-                "salary_min": job.get("salary_min"),
-                "salary_max": job.get("salary_max"),
-                "redirect_url": job.get("redirect_url", ""),
-                "description": job.get("description", "").replace("<strong>", "").replace("</strong>", "")[:150] + "..."
-            })
-            
-        return structured_jobs
+    return structured_jobs
 
+def fetch_job_listings(role: str, location: str = "India", results_per_page: int = 50):
+    """
+    Structured listings for (role, location), or None when Adzuna could not
+    be reached or answered with an error, so callers can tell an outage from
+    "no jobs".
+    """
+    params = _build_search_params(role, location, results_per_page)
+    if params is None:
+        return None
+
+    try:
+        response = _timed_get(params)
     except Exception as e:
         logger.error(f"Error fetching jobs from Adzuna: {str(e)}")
-        return []
+        return None
+    if response.status_code != 200:
+        logger.error(f"Adzuna API returned status code {response.status_code}")
+        return None
+    return _structure_jobs(response)
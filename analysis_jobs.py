@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from .analysis_service import run_analysis
+from .models import AnalysisJob
+from .persistence import flush_pending_analyses
+from .pdf_parser import extract_text_from_pdf
+
+logger = logging.getLogger(__name__)
+
+_wake = threading.Event()
+_workers = []
+_workers_lock = threading.Lock()
+_last_reap = None
+_reap_lock = threading.Lock()
+
+def enqueue_analysis_job(resume_file, target_role):
+    job = AnalysisJob.objects.create(resume_file=resume_file, target_role=target_role)
+    ensure_workers_started()
+    _wake.set()
+    return job
+
+def ensure_workers_started():
+    """
+    Starts this process's job workers on first use. The queue itself lives
+    in the database, so any process running workers can pick up a job.
+    """
+    if _workers:
+        return
+    with _workers_lock:
+        if _workers:
+            return
+        for index in range(getattr(settings, 'ANALYSIS_JOB_WORKERS', 2)):
+            worker = threading.Thread(target=_worker_loop, name=f"analysis-job-{index}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+
+def requeue_stale_jobs():
+    """Puts jobs whose worker died mid-run back on the queue."""
+    cutoff = timezone.now() - timezone.timedelta(seconds=getattr(settings, 'ANALYSIS_JOB_STALE_SECONDS', 600))
+    max_attempts = getattr(settings, 'ANALYSIS_JOB_MAX_ATTEMPTS', 2)
+    stale = AnalysisJob.objects.filter(status=AnalysisJob.STATUS_RUNNING, started_at__lt=cutoff)
+    stale.filter(attempts__gte=max_attempts).update(
+        status=AnalysisJob.STATUS_FAILED, error="Worker stopped before the job finished", finished_at=timezone.now()
+    )
+    stale.update(status=AnalysisJob.STATUS_PENDING)
+
+def reap_stale_jobs_periodically():
+    """Runs requeue_stale_jobs at most once per ANALYSIS_JOB_REAP_INTERVAL in this process."""
+    global _last_reap
+    with _reap_lock:
+        now = time.monotonic()
+        if _last_reap is not None and now - _last_reap < getattr(settings, 'ANALYSIS_JOB_REAP_INTERVAL', 60):
+            return
+        _last_reap = now
+    requeue_stale_jobs()
+
+def claim_next_job():
+    while True:
+        candidate = AnalysisJob.objects.filter(status=AnalysisJob.STATUS_PENDING).values_list('pk', flat=True).first()
+        if candidate is None:
+            return None
+        # Conditional update: exactly one worker (in any process) wins the job
+        claimed = AnalysisJob.objects.filter(pk=candidate, status=AnalysisJob.STATUS_PENDING).update(
+            status=AnalysisJob.STATUS_RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1
+        )
+        if claimed:
+            return AnalysisJob.objects.get(pk=candidate)
+
+def process_job(job):
+    progress = {"stages": {}, "last_stage": None}
+
+    def record_progress(stage, value, elapsed_ms):
+        progress["stages"][stage] = elapsed_ms
+        progress["last_stage"] = stage
+        AnalysisJob.objects.filter(pk=job.pk).update(progress=progress)
+
+    try:
+        started = time.perf_counter()
+        resume_text = extract_text_from_pdf(job.resume_file)
+        if not resume_text:
+            raise ValueError("PDF extraction failed")
+        record_progress("extraction", None, round((time.perf_counter() - started) * 1000, 1))
+
+        result, _ = run_analysis(resume_text, job.resume_file, job.target_role, on_stage_complete=record_progress)
+        # Don't report an analysis as done before it is stored
+        flush_pending_analyses()
+        AnalysisJob.objects.filter(pk=job.pk).update(
+            status=AnalysisJob.STATUS_COMPLETED, result=result, progress=progress, finished_at=timezone.now()
+        )
+    except Exception as e:
+        logger.error(f"Analysis job {job.pk} failed: {e}")
+        AnalysisJob.objects.filter(pk=job.pk).update(
+            status=AnalysisJob.STATUS_FAILED, error=str(e), finished_at=timezone.now()
+        )
+
+def _worker_loop():
+    poll_interval = getattr(settings, 'ANALYSIS_JOB_POLL_INTERVAL', 2)
+    while True:
+        try:
+            # A job whose worker died (in any process) goes back on the queue
+            reap_stale_jobs_periodically()
+            job = claim_next_job()
+            if job is None:
+                _wake.wait(poll_interval)
+                _wake.clear()
+                continue
+            process_job(job)
+        except Exception as e:
+            logger.error(f"Analysis job worker error: {e}")
+            _wake.wait(poll_interval)
+        finally:
+            close_old_connections()
@@ -0,0 +1,146 @@
+import copy
+import threading
+from asgiref.sync import sync_to_async
+from .serializers import ResumeAnalysisSerializer
+from .llm_engine import analyze_resume_with_llm, aanalyze_resume_with_llm, generate_resume_embedding, resolve_fit_mode
+from .embeddings import vector_to_bytes
+from .persistence import build_analysis, save_analysis
+from .pipeline import stage_timings_enabled
+from .dashboard_renderer import merge_dashboard_narrative
+from .caching import get_cached_analysis, set_cached_analysis, aget_cached_analysis, aset_cached_analysis
+
+class DashboardNarrativeJoin:
+    """
+    Meets the background dashboard narrative with the cached response:
+    whichever of the two arrives last writes the enriched cache entry.
+    """
+
+    def __init__(self, resume_text, target_role, variant):
+        self.resume_text = resume_text
+        self.target_role = target_role
+        self.variant = variant
+        self._lock = threading.Lock()
+        self._narrative = None
+        self._result = None
+
+    def on_narrative(self, narrative):
+        with self._lock:
+            self._narrative = narrative
+            result = self._result
+        if result is not None:
+            self._store(result, narrative)
+
+    def attach(self, result):
+        with self._lock:
+            self._result = copy.deepcopy(result)
+            narrative = self._narrative
+        if narrative is not None:
+            self._store(self._result, narrative)
+
+    def _store(self, result, narrative):
+        if not result.get('dashboard_summary'):
+            return
+        enriched = {**result, "dashboard_summary": merge_dashboard_narrative(result['dashboard_summary'], narrative)}
+        set_cached_analysis(self.resume_text, self.target_role, enriched, self.variant)
+
+def run_analysis(resume_text, resume_file, target_role, on_stage_complete=None, fit_mode=None):
+    """
+    Runs (or serves from cache) the full analysis for already-extracted
+    resume text and persists it. Returns (result, created); `created` is
+    False for an exact cache hit.
+    """
+    fit_mode = resolve_fit_mode(fit_mode)
+    variant = _cache_variant(fit_mode)
+    cached = get_cached_analysis(resume_text, target_role, variant)
+    if cached and cached['cache_similarity'] < 1.0:
+        analysis, file_data, analysis_data = _from_near_duplicate(cached, resume_text, resume_file, target_role)
+        save_analysis(analysis, file_data)
+        result = _build_response(analysis, analysis_data, fit_mode)
+        set_cached_analysis(resume_text, target_role, result, variant)
+        return {**result, "cache_similarity": cached['cache_similarity']}, True
+    if cached:
+        return cached, False
+
+    narrative_join = DashboardNarrativeJoin(resume_text, target_role, variant)
+    # Live jobs are fetched concurrently inside the analysis pipeline
+    analysis_data = analyze_resume_with_llm(
+        resume_text, target_role, on_stage_complete=on_stage_complete, fit_mode=fit_mode,
+        on_dashboard_narrative=narrative_join.on_narrative
+    )
+
+    analysis, file_data = build_analysis(resume_file, **_analysis_fields(analysis_data, target_role))
+    save_analysis(analysis, file_data)
+    result = _build_response(analysis, analysis_data, fit_mode)
+    set_cached_analysis(resume_text, target_role, result, variant)
+    narrative_join.attach(result)
+    if stage_timings_enabled():
+        result['stage_timings'] = analysis_data.get('stage_timings')
+    return result, True
+
+async def arun_analysis(resume_text, resume_file, target_role, on_stage_complete=None, fit_mode=None):
+    fit_mode = resolve_fit_mode(fit_mode)
+    variant = _cache_variant(fit_mode)
+    cached = await aget_cached_analysis(resume_text, target_role, variant)
+    if cached and cached['cache_similarity'] < 1.0:
+        analysis, file_data, analysis_data = _from_near_duplicate(cached, resume_text, resume_file, target_role)
+        await sync_to_async(save_analysis, thread_sensitive=False)(analysis, file_data)
+        result = _build_response(analysis, analysis_data, fit_mode)
+        await aset_cached_analysis(resume_text, target_role, result, variant)
+        return {**result, "cache_similarity": cached['cache_similarity']}, True
+    if cached:
+        return cached, False
+
+    narrative_join = DashboardNarrativeJoin(resume_text, target_role, variant)
+    analysis_data = await aanalyze_resume_with_llm(
+        resume_text, target_role, on_stage_complete=on_stage_complete, fit_mode=fit_mode,
+        on_dashboard_narrative=narrative_join.on_narrative
+    )
+
+    analysis, file_data = build_analysis(resume_file, **_analysis_fields(analysis_data, target_role))
+    await sync_to_async(save_analysis, thread_sensitive=False)(analysis, file_data)
+    result = _build_response(analysis, analysis_data, fit_mode)
+    await aset_cached_analysis(resume_text, target_role, result, variant)
+    await sync_to_async(narrative_join.attach, thread_sensitive=False)(result)
+    if stage_timings_enabled():
+        result['stage_timings'] = analysis_data.get('stage_timings')
+    return result, True
+
+def _from_near_duplicate(cached, resume_text, resume_file, target_role):
+    """
+    Reuses only the LLM-derived analysis of a near-duplicate resume. This
+    upload still gets its own row, file, public_id and embedding; the other
+    upload's identity never leaves the cache.
+    """
+    analysis_data = {**cached, "resume_embedding": generate_resume_embedding(resume_text)}
+    analysis, file_data = build_analysis(resume_file, **_analysis_fields(analysis_data, target_role))
+    return analysis, file_data, analysis_data
+
+def _cache_variant(fit_mode):
+    # Full-LLM results keep their original cache keys
+    return "" if fit_mode == "llm" else fit_mode
+
+def _analysis_fields(analysis_data, target_role):
+    vector = analysis_data.get('resume_embedding')
+    return {
+        "target_role": target_role,
+        "extracted_skills": analysis_data['extracted_skills'],
+        "matched_skills": analysis_data['matched_skills'],
+        "missing_skills": analysis_data['missing_skills'],
+        "match_percentage": analysis_data['match_percentage'],
+        "readiness_score": analysis_data['readiness_score'],
+        "roadmap": analysis_data['roadmap'],
+        "confidence_score": analysis_data.get('confidence_score', 0.0),
+        "resume_vector": vector_to_bytes(vector) if vector is not None else None
+    }
+
+def _build_response(analysis, analysis_data, fit_mode="llm"):
+    result = ResumeAnalysisSerializer(analysis).data
+    result['fit_mode'] = fit_mode
+
+    # Append non-model data
+    result['improvement_plan'] = analysis_data.get('improvement_plan')
+    result['dashboard_summary'] = analysis_data.get('dashboard_summary')
+    result['live_jobs'] = analysis_data.get('live_jobs')
+    result['role_profile_version'] = analysis_data.get('role_profile_version')
+    result['prompt_compaction'] = analysis_data.get('prompt_compaction')
+    return result
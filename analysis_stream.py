@@ -0,0 +1,81 @@
+import json
+import logging
+import queue
+import threading
+from django.conf import settings
+from django.db import close_old_connections
+from .analysis_service import run_analysis
+from .llm_engine import compaction_report
+from .persistence import flush_pending_analyses
+from .pdf_parser import extract_pdf
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+def _stage_payload(stage, value):
+    # Only what the browser can render; vectors and model rows stay server-side
+    if value is None or stage == "embedding":
+        return None
+    if stage == "compaction":
+        return compaction_report(value)
+    if stage == "profile":
+        return {"required_skills": value.required_skills, "version": value.version}
+    return value
+
+def format_sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+def stream_analysis_events(resume_file, target_role, fit_mode=None):
+    """
+    Yields Server-Sent Events for one analysis: a `stage` event as each
+    pipeline stage finishes (extraction first), then `result` with the full
+    response, or `error`. The pipeline runs in its own thread and keeps
+    going if the client disconnects, so the result is still persisted and
+    cached.
+    """
+    events = queue.Queue()
+
+    def on_stage_complete(stage, value, elapsed_ms):
+        events.put(("stage", {"stage": stage, "elapsed_ms": elapsed_ms, "data": _stage_payload(stage, value)}))
+
+    def worker():
+        try:
+            extraction = extract_pdf(resume_file)
+            on_stage_complete("extraction", {
+                "page_count": extraction["page_count"],
+                "chars": len(extraction["text"]),
+                "cache_hit": extraction["cache_hit"]
+            }, extraction["parse_ms"])
+            if not extraction["text"]:
+                raise ValueError("PDF extraction failed")
+
+            result, created = run_analysis(
+                extraction["text"], resume_file, target_role,
+                on_stage_complete=on_stage_complete, fit_mode=fit_mode
+            )
+            # The client keeps the public_id, so it must be stored first
+            flush_pending_analyses()
+            events.put(("result", {**result, "created": created}))
+        except Exception as e:
+            logger.error(f"Streaming analysis failed: {e}")
+            events.put(("error", {"error": "Processing failed", "details": str(e)}))
+        finally:
+            events.put(_DONE)
+            close_old_connections()
+
+    threading.Thread(target=worker, name="analysis-stream", daemon=True).start()
+
+    keepalive = getattr(settings, 'SSE_KEEPALIVE_SECONDS', 15)
+    # Tells EventSource-style clients how long to wait before reconnecting
+    yield "retry: 3000\n\n"
+    while True:
+        try:
+            item = events.get(timeout=keepalive)
+        except queue.Empty:
+            # Comment frame keeps proxies from closing an idle connection
+            yield ": keep-alive\n\n"
+            continue
+        if item is _DONE:
+            return
+        yield format_sse(*item)
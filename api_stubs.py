@@ -0,0 +1,222 @@
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+_GENERATE_PATH = re.compile(r"/models/([^/:]+):generateContent$")
+_ADZUNA_PATH = re.compile(r"/jobs/([a-z]{2})/search/(\d+)$")
+
+# Canned Gemini answers, picked by the first marker found in the prompt.
+# Order matters: the multi-role fit prompt also contains the single-role one.
+CANNED_RESPONSES = [
+    ("EACH of these roles", "multi_role_fit"),
+    ("Career Fit Evaluator", "fit"),
+    ("Growth Simulator", "growth"),
+    ("Career Coach", "dashboard"),
+    ("skill profile", "role_profile"),
+]
+
+DEFAULT_FIXTURES = {
+    "fit": {
+        "extracted_skills": ["Python", "SQL", "Excel", "Git"],
+        "matched_skills": ["Python", "SQL", "Excel"],
+        "missing_skills": ["Tableau", "Statistics"],
+        "match_percentage": 68,
+        "readiness_score": 64,
+        "reason": "Solid core skills; lacks visualisation and statistics depth.",
+        "roadmap": {"short_term": ["Learn Tableau"], "long_term": ["Study applied statistics"]}
+    },
+    "growth": {
+        "skills_to_learn": ["Tableau", "Statistics"],
+        "project_suggestion": "Build a sales dashboard from a public dataset",
+        "future_match_percentage": 82
+    },
+    "dashboard": {
+        "executive_summary": "A solid mid-level fit with a clear path to a strong one."
+    },
+    "role_profile": {
+        "skills": ["Python", "SQL", "Excel", "Tableau", "Statistics", "Power BI"]
+    },
+    "benchmark": {
+        "core_skills": ["Python", "SQL", "Excel"],
+        "advanced_skills": ["Tableau", "Statistics", "Power BI"],
+        "experience_expectation": "1-3 years of hands-on analysis work",
+        "project_expectation": "End-to-end dashboard or analysis project"
+    }
+}
+
+_MULTI_ROLE_BENCHMARKS = re.compile(r"keyed by role\):\s*\n\s*(\{.*\})\s*\n")
+
+class LatencyModel:
+    """
+    Samples per-request latency in seconds from a spec string:
+    "fixed:0.2", "uniform:0.1,0.5", "normal:0.4,0.1" (mean, stddev) or
+    "lognormal:0.8,0.5" (median, sigma) for realistic long tails.
+    """
+
+    def __init__(self, spec="fixed:0"):
+        self.spec = spec
+        kind, _, args = spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.args = [float(a) for a in args.split(",") if a.strip()]
+        if self.kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self):
+        if self.kind == "fixed":
+            return self.args[0] if self.args else 0.0
+        if self.kind == "uniform":
+            return random.uniform(self.args[0], self.args[1])
+        if self.kind == "normal":
+            return max(random.gauss(self.args[0], self.args[1]), 0.0)
+        return random.lognormvariate(math.log(self.args[0]), self.args[1])
+
+class StubConfig:
+    def __init__(self, gemini_latency="lognormal:0.8,0.4", adzuna_latency="lognormal:0.3,0.5",
+                 rate_limit_rate=0.0, server_error_rate=0.0, retry_after=1, fixtures=None, jobs_per_page=20):
+        self.gemini_latency = LatencyModel(gemini_latency)
+        self.adzuna_latency = LatencyModel(adzuna_latency)
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.retry_after = retry_after
+        self.fixtures = {**DEFAULT_FIXTURES, **(fixtures or {})}
+        self.jobs_per_page = jobs_per_page
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+
+    def record(self, key):
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def injected_error(self):
+        """Returns the status code to fail this request with, or None."""
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.server_error_rate:
+            return random.choice((500, 503))
+        return None
+
+def gemini_answer(prompt, fixtures):
+    for marker, kind in CANNED_RESPONSES:
+        if marker in prompt:
+            break
+    else:
+        # The market benchmark prompt has no stable marker of its own
+        kind = "benchmark"
+
+    if kind == "multi_role_fit":
+        match = _MULTI_ROLE_BENCHMARKS.search(prompt)
+        roles = list(json.loads(match.group(1))) if match else []
+        return kind, {"roles": [
+            {**fixtures["fit"], "role": role, "match_percentage": max(fixtures["fit"]["match_percentage"] - 7 * i, 0)}
+            for i, role in enumerate(roles)
+        ]}
+    return kind, fixtures[kind]
+
+def adzuna_results(role, location, count):
+    return {
+        "count": count,
+        "results": [
+            {
+                "title": f"<strong>{role}</strong> {['Associate', 'Engineer', 'Senior', 'Lead'][i % 4]}",
+                "company": {"display_name": f"Stub Corp {i + 1}"},
+                "location": {"display_name": location or "India"},
+                "salary_min": 400000 + 50000 * i,
+                "salary_max": 900000 + 75000 * i,
+                "redirect_url": f"https://example.com/jobs/{i + 1}",
+                "description": f"Hiring a {role} with Python, SQL and stakeholder communication skills."
+            }
+            for i in range(count)
+        ]
+    }
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _fail(self, api, status):
+        self.config.record(f"{api}_{status}")
+        headers = {"Retry-After": str(self.config.retry_after)} if status == 429 else None
+        self._send_json(status, {"error": {"code": status, "message": "Injected by api_stubs"}}, headers)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if not _GENERATE_PATH.search(path):
+            self._send_json(404, {"error": {"code": 404, "message": f"No stub for {path}"}})
+            return
+
+        time.sleep(self.config.gemini_latency.sample())
+        error = self.config.injected_error()
+        if error:
+            self._fail("gemini", error)
+            return
+        try:
+            prompt = json.loads(body)["contents"][0]["parts"][0]["text"]
+        except (ValueError, KeyError, IndexError):
+            self._send_json(400, {"error": {"code": 400, "message": "Malformed generateContent body"}})
+            return
+
+        kind, answer = gemini_answer(prompt, self.config.fixtures)
+        self.config.record(f"gemini_{kind}")
+        text = json.dumps(answer)
+        self._send_json(200, {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}],
+            # Same rough 4-chars-per-token estimate prompt_compaction uses
+            "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4}
+        })
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/__stats":
+            self._send_json(200, self.config.stats)
+            return
+        if not _ADZUNA_PATH.search(url.path):
+            self._send_json(404, {"error": f"No stub for {url.path}"})
+            return
+
+        time.sleep(self.config.adzuna_latency.sample())
+        error = self.config.injected_error()
+        if error:
+            self._fail("adzuna", error)
+            return
+        query = parse_qs(url.query)
+        count = min(int(query.get("results_per_page", ["5"])[0]), self.config.jobs_per_page)
+        self.config.record("adzuna_search")
+        self._send_json(200, adzuna_results(query.get("what", [""])[0], query.get("where", [""])[0], count))
+
+def start_stub_server(host="127.0.0.1", port=8765, config=None, background=True):
+    """
+    Serves stand-ins for Gemini generateContent and Adzuna job search.
+    Point the app at it with GEMINI_API_BASE=http://host:port/v1beta and
+    ADZUNA_API_BASE=http://host:port/adzuna. Returns the server; with
+    `background` it runs on a daemon thread.
+    """
+    handler = type("ConfiguredStubHandler", (StubRequestHandler,), {"config": config or StubConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    if background:
+        threading.Thread(target=server.serve_forever, name="api-stubs", daemon=True).start()
+    return server
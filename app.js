@@ -1,48 +1,250 @@
-document.getElementById("resumeForm").addEventListener("submit", async function(e) {
-    e.preventDefault();
+const POLL_INTERVAL_MS = 1500;
+const JOBS_RETRY_MS = 3000;
 
-    const loading = document.getElementById("loading");
-    const resultSection = document.getElementById("resultSection");
+async function runAnalysisJob(formData, loading) {
+    const loadingText = loading.textContent;
+    try {
+        return await pollAnalysisJob(formData, loading);
+    } finally {
+        loading.textContent = loadingText;
+    }
+}
 
-    loading.style.display = "block";
-    resultSection.innerHTML = "";
+async function pollAnalysisJob(formData, loading) {
+    const response = await fetch("/api/analysis-jobs/", {
+        method: "POST",
+        body: formData
+    });
+    let job = await response.json();
+    if (!response.ok) {
+        return { error: job.error || "Could not start analysis" };
+    }
 
-    const formData = new FormData(this);
+    while (job.status === "pending" || job.status === "running") {
+        await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS));
+        const poll = await fetch(`/api/analysis-jobs/${job.job_id}/`);
+        job = await poll.json();
+        if (!poll.ok) {
+            return { error: job.error || "Lost track of analysis job" };
+        }
+        const done = Object.keys((job.progress && job.progress.stages) || {});
+        if (done.length) {
+            loading.textContent = "Analyzing... completed: " + done.join(", ");
+        }
+    }
 
-    const response = await fetch("/api/analyze-resume/", {
+    if (job.status === "failed") {
+        return { error: job.error || "Processing failed" };
+    }
+    return job.result;
+}
+
+// Throws only if the request never got a response. Once the stream is open
+// the analysis is running on the server, so a later failure is reported
+// instead of retried: a retry would run and bill the analysis twice.
+async function streamAnalysis(formData, onStage) {
+    const response = await fetch("/api/analyze-resume/stream/", {
         method: "POST",
         body: formData
     });
+    if (!response.ok) {
+        const body = await response.json().catch(() => ({}));
+        return { error: body.error || "Could not start analysis" };
+    }
 
-    const data = await response.json();
-    loading.style.display = "none";
+    try {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
 
-    if (data.error) {
-        resultSection.innerHTML = "<p style='color:red'>" + data.error + "</p>";
-        return;
+            let boundary;
+            while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+                const event = parseServerEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                if (!event) continue;
+                if (event.type === "result" || event.type === "error") {
+                    return event.data;
+                }
+                onStage(event.data);
+            }
+        }
+    } catch (err) {
+        return { error: "Connection lost during analysis. Submit again in a moment to fetch the finished result." };
     }
+    return { error: "Analysis stream ended unexpectedly" };
+}
 
-    resultSection.innerHTML = `
+function parseServerEvent(frame) {
+    let type = "message";
+    const data = [];
+    for (const line of frame.split("\n")) {
+        if (line.startsWith("event:")) type = line.slice(6).trim();
+        else if (line.startsWith("data:")) data.push(line.slice(5).trim());
+    }
+    // Comment (keep-alive) and retry frames carry no data
+    return data.length ? { type, data: JSON.parse(data.join("\n")) } : null;
+}
+
+const HTML_ESCAPES = { "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;" };
+
+// Job listings come from Adzuna and summaries from the LLM, so every value
+// is escaped before it goes into markup
+function escapeHtml(value) {
+    return String(value ?? "").replace(/[&<>"']/g, ch => HTML_ESCAPES[ch]);
+}
+
+function safeUrl(value) {
+    try {
+        const url = new URL(value, window.location.href);
+        return url.protocol === "http:" || url.protocol === "https:" ? url.href : "#";
+    } catch (err) {
+        return "#";
+    }
+}
+
+function percent(value) {
+    return Math.max(0, Math.min(100, Number(value) || 0));
+}
+
+function renderFit(container, data) {
+    container.innerHTML = `
         <div class="result-card">
             <h2>Match Score</h2>
             <div class="progress-bar">
-                <div class="progress-fill" style="width:${data.match_percentage}%">
-                    ${data.match_percentage}%
+                <div class="progress-fill" style="width:${percent(data.match_percentage)}%">
+                    ${percent(data.match_percentage)}%
                 </div>
             </div>
 
             <h2>Readiness Score</h2>
             <div class="progress-bar">
-                <div class="progress-fill" style="width:${data.readiness_score}%">
-                    ${data.readiness_score}%
+                <div class="progress-fill" style="width:${percent(data.readiness_score)}%">
+                    ${percent(data.readiness_score)}%
                 </div>
             </div>
 
             <h3>Matched Skills</h3>
-            ${data.matched_skills.map(skill => `<span class="skill-tag">${skill}</span>`).join("")}
+            ${data.matched_skills.map(skill => `<span class="skill-tag">${escapeHtml(skill)}</span>`).join("")}
 
             <h3>Missing Skills</h3>
-            ${data.missing_skills.map(skill => `<span class="skill-tag" style="background:#7f1d1d">${skill}</span>`).join("")}
+            ${data.missing_skills.map(skill => `<span class="skill-tag" style="background:#7f1d1d">${escapeHtml(skill)}</span>`).join("")}
+        </div>
+    `;
+}
+
+function renderGrowth(container, plan) {
+    if (!plan) return;
+    container.innerHTML = `
+        <div class="result-card">
+            <h2>Growth Plan</h2>
+            <p>Projected match: ${percent(plan.future_match_percentage)}%</p>
+            <h3>Skills to Learn</h3>
+            ${plan.skills_to_learn.map(skill => `<span class="skill-tag">${escapeHtml(skill)}</span>`).join("")}
+            <h3>Suggested Project</h3>
+            <p>${escapeHtml(plan.project_suggestion)}</p>
         </div>
     `;
+}
+
+function renderDashboard(container, summary) {
+    if (!summary) return;
+    container.innerHTML = `
+        <div class="result-card">
+            <h2>Career Summary</h2>
+            <p>${escapeHtml(summary.executive_summary)}</p>
+            <p>Salary insight: ${escapeHtml(summary.salary_insight)}</p>
+        </div>
+    `;
+}
+
+function renderLiveJobs(container, jobs) {
+    if (!jobs || !jobs.length) return;
+    container.innerHTML = `
+        <div class="result-card">
+            <h2>Live Openings</h2>
+            ${jobs.map(job => `<p><a href="${escapeHtml(safeUrl(job.redirect_url))}" target="_blank" rel="noopener noreferrer">${escapeHtml(job.title)}</a> · ${escapeHtml(job.company)} · ${escapeHtml(job.location)}</p>`).join("")}
+        </div>
+    `;
+}
+
+// Listings for a role nobody has searched yet are fetched in the background;
+// ask for them again a few times rather than holding up the analysis
+async function loadPendingJobs(container, role, attemptsLeft = 3) {
+    await new Promise(resolve => setTimeout(resolve, JOBS_RETRY_MS));
+    let page;
+    try {
+        const response = await fetch(`/api/jobs/?role=${encodeURIComponent(role)}&page_size=5`);
+        if (!response.ok) return;
+        page = await response.json();
+    } catch (err) {
+        return;
+    }
+    if (page.results && page.results.length) {
+        renderLiveJobs(container, page.results);
+    } else if (page.pending && attemptsLeft > 1) {
+        await loadPendingJobs(container, role, attemptsLeft - 1);
+    }
+}
+
+document.getElementById("resumeForm").addEventListener("submit", async function(e) {
+    e.preventDefault();
+
+    const loading = document.getElementById("loading");
+    const resultSection = document.getElementById("resultSection");
+
+    loading.style.display = "block";
+    resultSection.innerHTML = `
+        <div id="fitResult"></div>
+        <div id="growthResult"></div>
+        <div id="dashboardResult"></div>
+        <div id="jobsResult"></div>
+    `;
+    const sections = {
+        fit: document.getElementById("fitResult"),
+        growth: document.getElementById("growthResult"),
+        dashboard: document.getElementById("dashboardResult"),
+        live_jobs: document.getElementById("jobsResult")
+    };
+    const renderers = { fit: renderFit, growth: renderGrowth, dashboard: renderDashboard, live_jobs: renderLiveJobs };
+
+    const formData = new FormData(this);
+    const loadingText = loading.textContent;
+
+    let data;
+    if (!window.ReadableStream) {
+        // No streaming support in this browser; poll a background job instead
+        data = await runAnalysisJob(formData, loading);
+    } else {
+        try {
+            // Each stage is drawn the moment the server reports it
+            data = await streamAnalysis(formData, event => {
+                const render = renderers[event.stage];
+                if (render && event.data) render(sections[event.stage], event.data);
+                loading.textContent = "Analyzing... completed: " + event.stage;
+            });
+        } catch (err) {
+            // The stream never opened, so nothing is running server-side yet
+            data = await runAnalysisJob(formData, loading);
+        }
+    }
+    loading.textContent = loadingText;
+    loading.style.display = "none";
+
+    if (data.error) {
+        resultSection.innerHTML = "<p style='color:red'>" + escapeHtml(data.error) + "</p>";
+        return;
+    }
+
+    // Cache hits arrive as a single result, so draw anything still missing
+    renderFit(sections.fit, data);
+    renderGrowth(sections.growth, data.improvement_plan);
+    renderDashboard(sections.dashboard, data.dashboard_summary);
+    renderLiveJobs(sections.live_jobs, data.live_jobs);
+    if (!data.live_jobs || !data.live_jobs.length) {
+        loadPendingJobs(sections.live_jobs, formData.get("target_role"));
+    }
 });
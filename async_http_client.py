@@ -0,0 +1,55 @@
+import asyncio
+import logging
+import weakref
+from urllib.parse import urlsplit
+import httpx
+from django.conf import settings
+from .http_client import HostConcurrencyLimitExceeded, resolve_timeout
+
+logger = logging.getLogger(__name__)
+
+# One client and one set of host semaphores per event loop: httpx clients
+# and asyncio primitives must not be shared across loops.
+_clients = weakref.WeakKeyDictionary()
+_host_semaphores = weakref.WeakKeyDictionary()
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        pool_size = getattr(settings, 'HTTP_POOL_MAXSIZE', 20)
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=_to_httpx_timeout(None)
+        )
+        _clients[loop] = client
+    return client
+
+def _to_httpx_timeout(timeout):
+    connect_timeout, read_timeout = resolve_timeout(timeout)
+    return httpx.Timeout(read_timeout, connect=connect_timeout)
+
+def _host_semaphore(url):
+    semaphores = _host_semaphores.setdefault(asyncio.get_running_loop(), {})
+    host = urlsplit(url).netloc
+    if host not in semaphores:
+        semaphores[host] = asyncio.Semaphore(getattr(settings, 'HTTP_PER_HOST_LIMIT', 16))
+    return semaphores[host]
+
+async def request(method, url, timeout=None, **kwargs):
+    semaphore = _host_semaphore(url)
+    try:
+        await asyncio.wait_for(semaphore.acquire(), getattr(settings, 'HTTP_QUEUE_TIMEOUT', 30))
+    except asyncio.TimeoutError:
+        logger.warning(f"Concurrency limit reached for {urlsplit(url).netloc}")
+        raise HostConcurrencyLimitExceeded(f"Too many concurrent requests to {urlsplit(url).netloc}")
+    try:
+        return await get_async_client().request(method, url, timeout=_to_httpx_timeout(timeout), **kwargs)
+    finally:
+        semaphore.release()
+
+async def get(url, **kwargs):
+    return await request("GET", url, **kwargs)
+
+async def post(url, **kwargs):
+    return await request("POST", url, **kwargs)
@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from .llm_engine import evaluate_fit_with_guardrails
+from .pdf_parser import extract_text_from_pdf
+from .persistence import build_analysis, flush_pending_analyses, save_analysis
+from .prompt_compaction import compact_for_fit
+from .scoring import calculate_confidence_score
+
+logger = logging.getLogger(__name__)
+
+class BatchInputError(ValueError):
+    pass
+
+def collect_batch_files(resume_files, archive):
+    """
+    Normalises a batch upload (several PDFs and/or one zip of PDFs) into a
+    list of file objects, enforcing the file-count and archive-size limits.
+    """
+    max_files = getattr(settings, 'BATCH_MAX_FILES', 200)
+    files = list(resume_files or [])
+
+    if archive is not None:
+        max_archive_bytes = getattr(settings, 'BATCH_MAX_ARCHIVE_BYTES', 200 * 1024 * 1024)
+        try:
+            with zipfile.ZipFile(archive) as bundle:
+                members = [
+                    info for info in bundle.infolist()
+                    if not info.is_dir()
+                    and info.filename.lower().endswith(".pdf")
+                    and not os.path.basename(info.filename).startswith(".")
+                    and "__MACOSX" not in info.filename
+                ]
+                if len(files) + len(members) > max_files:
+                    raise BatchInputError(f"A batch may contain at most {max_files} resumes")
+                # Checked on the declared sizes before anything is inflated
+                if sum(info.file_size for info in members) > max_archive_bytes:
+                    raise BatchInputError(f"Archive expands beyond {max_archive_bytes} bytes")
+                for info in members:
+                    files.append(ContentFile(bundle.read(info), name=os.path.basename(info.filename)))
+        except zipfile.BadZipFile:
+            raise BatchInputError("Archive is not a valid zip file")
+
+    if not files:
+        raise BatchInputError("No PDF resumes found in the upload")
+    if len(files) > max_files:
+        raise BatchInputError(f"A batch may contain at most {max_files} resumes")
+    return files
+
+def analyze_batch_item(resume_file, target_role, benchmark):
+    try:
+        resume_text = extract_text_from_pdf(resume_file)
+        if not resume_text:
+            raise ValueError("PDF extraction failed")
+
+        fit_data = evaluate_fit_with_guardrails(compact_for_fit(resume_text)["text"], target_role, benchmark)
+        if not fit_data:
+            raise ValueError("Failed to evaluate candidate fit")
+
+        confidence_score = calculate_confidence_score(fit_data['match_percentage'])
+        analysis, file_data = build_analysis(
+            resume_file,
+            target_role=target_role,
+            extracted_skills=fit_data['extracted_skills'],
+            matched_skills=fit_data['matched_skills'],
+            missing_skills=fit_data['missing_skills'],
+            match_percentage=fit_data['match_percentage'],
+            readiness_score=fit_data['readiness_score'],
+            roadmap=fit_data['roadmap'],
+            confidence_score=confidence_score
+        )
+        save_analysis(analysis, file_data)
+        return {
+            "id": str(analysis.public_id),
+            "matched_skills": fit_data['matched_skills'],
+            "missing_skills": fit_data['missing_skills'],
+            "match_percentage": fit_data['match_percentage'],
+            "readiness_score": fit_data['readiness_score'],
+            "confidence_score": confidence_score,
+            "reason": fit_data.get('reason', "")
+        }
+    finally:
+        close_old_connections()
+
+def stream_batch_analysis(files, target_role, benchmark):
+    """
+    Yields NDJSON lines: a header, one line per resume in completion order,
+    and a summary. Extraction and fit evaluation run with bounded
+    parallelism; the benchmark is resolved once for the whole batch.
+    """
+    started = time.perf_counter()
+    yield _ndjson({
+        "type": "batch",
+        "target_role": target_role,
+        "total": len(files),
+        "benchmark_version": benchmark.get('version')
+    })
+
+    succeeded = failed = 0
+    executor = ThreadPoolExecutor(
+        max_workers=getattr(settings, 'BATCH_MAX_WORKERS', 8), thread_name_prefix="batch-analysis"
+    )
+    try:
+        futures = {
+            executor.submit(analyze_batch_item, resume_file, target_role, benchmark): (index, resume_file.name)
+            for index, resume_file in enumerate(files)
+        }
+        for future in as_completed(futures):
+            index, name = futures[future]
+            try:
+                yield _ndjson({"type": "result", "index": index, "file": name, **future.result()})
+                succeeded += 1
+            except Exception as e:
+                logger.error(f"Batch item {name} failed: {e}")
+                yield _ndjson({"type": "error", "index": index, "file": name, "error": str(e)})
+                failed += 1
+    finally:
+        # Also reached when the client disconnects mid-stream
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # The summary tells the client every returned id is stored
+    flush_pending_analyses()
+    yield _ndjson({
+        "type": "summary",
+        "succeeded": succeeded,
+        "failed": failed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    })
+
+def _ndjson(payload):
+    return json.dumps(payload, default=str) + "\n"
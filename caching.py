@@ -1,14 +1,132 @@
 import hashlib
+import threading
+import time
+from collections import OrderedDict
 from django.core.cache import cache
+from .metrics import CACHE_REQUESTS
+from .fingerprint import (
+    canonicalize_resume_text, simhash, find_near_duplicate, afind_near_duplicate,
+    index_fingerprint, aindex_fingerprint
+)
 
-def get_resume_hash(resume_text, target_role):
-    combined = f"{resume_text.strip().lower()}_{target_role.strip().lower()}"
+class LRUCache:
+    """
+    Thread-safe in-process LRU with optional per-entry TTL and a total size
+    budget. Sizes are supplied by the caller (e.g. bytes of extracted text).
+    """
+
+    def __init__(self, max_entries=256, max_bytes=None, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, size=0, ttl=None):
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, expires_at)
+            self.total_bytes += size
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self.total_bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._data)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self.total_bytes -= size
+
+ANALYSIS_CACHE_TTL = 60 * 60 * 24
+
+def get_resume_hash(resume_text, target_role, variant=""):
+    # Canonical text, so re-exports of the same CV share one key
+    combined = f"{canonicalize_resume_text(resume_text)}_{target_role.strip().lower()}"
+    if variant:
+        # e.g. the fit mode; the default variant keeps the original keys
+        combined = f"{combined}_{variant}"
     return hashlib.md5(combined.encode('utf-8')).hexdigest()
 
-def get_cached_analysis(resume_text, target_role):
-    key = f"analysis_{get_resume_hash(resume_text, target_role)}"
-    return cache.get(key)
+def get_cached_analysis(resume_text, target_role, variant=""):
+    """
+    Exact hit on the canonical text, else the closest near-duplicate for the
+    same role above NEAR_DUPLICATE_THRESHOLD. Hits carry `cache_similarity`.
+    """
+    data = cache.get(f"analysis_{get_resume_hash(resume_text, target_role, variant)}")
+    if data is not None:
+        data['cache_similarity'] = 1.0
+        CACHE_REQUESTS.inc(tier="analysis", result="exact")
+        return data
+
+    fingerprint = simhash(canonicalize_resume_text(resume_text))
+    resume_hash, score = find_near_duplicate(fingerprint, target_role, variant)
+    if resume_hash:
+        data = cache.get(f"analysis_{resume_hash}")
+        if data is not None:
+            data['cache_similarity'] = score
+            CACHE_REQUESTS.inc(tier="analysis", result="near_duplicate")
+            return data
+    CACHE_REQUESTS.inc(tier="analysis", result="miss")
+    return None
+
+def set_cached_analysis(resume_text, target_role, data, variant=""):
+    resume_hash = get_resume_hash(resume_text, target_role, variant)
+    cache.set(f"analysis_{resume_hash}", data, ANALYSIS_CACHE_TTL)
+    index_fingerprint(
+        simhash(canonicalize_resume_text(resume_text)), resume_hash, target_role, variant, ANALYSIS_CACHE_TTL
+    )
+
+async def aget_cached_analysis(resume_text, target_role, variant=""):
+    data = await cache.aget(f"analysis_{get_resume_hash(resume_text, target_role, variant)}")
+    if data is not None:
+        data['cache_similarity'] = 1.0
+        CACHE_REQUESTS.inc(tier="analysis", result="exact")
+        return data
+
+    fingerprint = simhash(canonicalize_resume_text(resume_text))
+    resume_hash, score = await afind_near_duplicate(fingerprint, target_role, variant)
+    if resume_hash:
+        data = await cache.aget(f"analysis_{resume_hash}")
+        if data is not None:
+            data['cache_similarity'] = score
+            CACHE_REQUESTS.inc(tier="analysis", result="near_duplicate")
+            return data
+    CACHE_REQUESTS.inc(tier="analysis", result="miss")
+    return None
 
-def set_cached_analysis(resume_text, target_role, data):
-    key = f"analysis_{get_resume_hash(resume_text, target_role)}"
-    cache.set(key, data, 60 * 60 * 24)
+async def aset_cached_analysis(resume_text, target_role, data, variant=""):
+    resume_hash = get_resume_hash(resume_text, target_role, variant)
+    await cache.aset(f"analysis_{resume_hash}", data, ANALYSIS_CACHE_TTL)
+    await aindex_fingerprint(
+        simhash(canonicalize_resume_text(resume_text)), resume_hash, target_role, variant, ANALYSIS_CACHE_TTL
+    )
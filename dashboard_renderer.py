@@ -0,0 +1,74 @@
+# Static salary mapping for demo (Tier-1 India)
+SALARY_TIERS = {
+    "Data Analyst": "₹8L - ₹18L",
+    "Business Analyst": "₹10L - ₹22L",
+    "Backend Developer": "₹12L - ₹35L",
+    "DevOps Engineer": "₹14L - ₹40L"
+}
+DEFAULT_SALARY_RANGE = "₹10L - ₹25L"
+
+# Neighbouring roles suggested next to the target role
+ADJACENT_ROLES = {
+    "Data Analyst": ["Business Analyst", "Data Scientist"],
+    "Business Analyst": ["Data Analyst", "Product Analyst"],
+    "Backend Developer": ["Full Stack Developer", "DevOps Engineer"],
+    "DevOps Engineer": ["Site Reliability Engineer", "Cloud Engineer"],
+    "Data Scientist": ["Machine Learning Engineer", "Data Analyst"],
+    "Frontend Developer": ["Full Stack Developer", "UI Engineer"],
+}
+
+def get_salary_insight(target_role):
+    return SALARY_TIERS.get(target_role, DEFAULT_SALARY_RANGE)
+
+def _fit_band(match_percentage):
+    if match_percentage >= 85:
+        return "a strong"
+    if match_percentage >= 70:
+        return "a solid mid-level"
+    if match_percentage >= 50:
+        return "a partial"
+    return "an early-stage"
+
+def _join(items):
+    items = [str(item) for item in items if item]
+    if len(items) <= 1:
+        return "".join(items)
+    return f"{', '.join(items[:-1])} and {items[-1]}"
+
+def render_career_dashboard(target_role, fit_data, growth_data):
+    """
+    Deterministic Career Intelligence Dashboard built from the fit and growth
+    results. Produces the same keys the LLM dashboard prompt asks for.
+    """
+    current = round(fit_data['match_percentage'])
+    future = round(growth_data['future_match_percentage'])
+    strengths = fit_data['matched_skills'][:3]
+    skills_to_learn = growth_data['skills_to_learn']
+
+    summary = f"{current}% match for {target_role}, {_fit_band(current)} fit"
+    summary += f" built on {_join(strengths)}." if strengths else "."
+    if skills_to_learn:
+        summary += f" Mastering {_join(skills_to_learn[:3])} is projected to raise the match to {future}%."
+    if growth_data.get('project_suggestion'):
+        summary += f" Recommended next project: {growth_data['project_suggestion'].rstrip('.')}."
+
+    roadmap = [f"Learn {skill}" for skill in skills_to_learn]
+    if growth_data.get('project_suggestion'):
+        roadmap.append(f"Build: {growth_data['project_suggestion']}")
+
+    return {
+        "executive_summary": summary,
+        "top_roles": [target_role] + [r for r in ADJACENT_ROLES.get(target_role, []) if r != target_role],
+        "salary_insight": get_salary_insight(target_role),
+        "growth_roadmap": roadmap,
+        "narrative_source": "template"
+    }
+
+def merge_dashboard_narrative(dashboard, narrative):
+    """
+    Overlays an LLM-written executive summary on the rendered dashboard.
+    Structured fields stay deterministic.
+    """
+    if not narrative or not narrative.get('executive_summary'):
+        return dashboard
+    return {**dashboard, "executive_summary": narrative['executive_summary'], "narrative_source": "llm"}
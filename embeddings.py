@@ -0,0 +1,164 @@
+import logging
+import re
+import threading
+import time
+import zlib
+import numpy as np
+from django.conf import settings
+from .models import ResumeAnalysis
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+def get_embedding_dim():
+    return getattr(settings, 'EMBEDDING_DIM', 512)
+
+def _features(text):
+    tokens = _TOKEN.findall(text.lower())
+    for token in tokens:
+        yield token, 1.0
+        # Character trigrams make "postgres"/"postgresql" or a hyphenated
+        # word split across lines land close together
+        padded = f"<{token}>"
+        for i in range(len(padded) - 2):
+            yield f"#{padded[i:i + 3]}", 0.3
+    for first, second in zip(tokens, tokens[1:]):
+        yield f"{first} {second}", 0.7
+
+def embed_text(text):
+    """
+    Hashed n-gram vectorizer: word unigrams/bigrams and character trigrams
+    are hashed (with a sign bit) into a fixed-size space, weighted with
+    sublinear term frequency and L2-normalised. CPU-only and stateless, so
+    every worker produces identical vectors without a fitted vocabulary.
+    """
+    dim = get_embedding_dim()
+    counts = {}
+    for feature, weight in _features(text):
+        counts[feature] = counts.get(feature, 0.0) + weight
+
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, tf in counts.items():
+        digest = zlib.crc32(feature.encode('utf-8'))
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        weight = 1.0 + np.log(tf) if tf >= 1 else tf
+        vector[digest % dim] += sign * weight
+
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+def vector_to_bytes(vector):
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+def vector_from_bytes(blob):
+    if not blob:
+        return None
+    vector = np.frombuffer(bytes(blob), dtype=np.float32)
+    return vector if vector.shape[0] == get_embedding_dim() else None
+
+class VectorIndex:
+    """
+    In-memory cosine index over the most recent analyses. Vectors are
+    unit-length, so similarity is a single matrix-vector product. Rows
+    written by other workers are picked up by a periodic incremental load.
+    """
+
+    def __init__(self, max_entries, refresh_interval):
+        self.max_entries = max_entries
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._ids = []
+        self._id_set = set()
+        self._roles = []
+        self._vectors = np.zeros((0, get_embedding_dim()), dtype=np.float32)
+        self._pending = []
+        self._last_loaded_id = 0
+        self._last_refresh = 0.0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ids) + len(self._pending)
+
+    def add(self, analysis_id, target_role, vector):
+        # Buffered so a burst of writes costs one matrix rebuild, not one each
+        with self._lock:
+            if analysis_id not in self._id_set:
+                self._id_set.add(analysis_id)
+                self._pending.append((analysis_id, target_role, np.asarray(vector, dtype=np.float32)))
+
+    def _consolidate(self):
+        if not self._pending:
+            return
+        pending = sorted(self._pending, key=lambda entry: entry[0])
+        self._pending = []
+        self._ids.extend(pk for pk, _, _ in pending)
+        self._roles.extend(role.strip().lower() for _, role, _ in pending)
+        self._vectors = np.vstack([self._vectors] + [vector[None, :] for _, _, vector in pending])
+        overflow = len(self._ids) - self.max_entries
+        if overflow > 0:
+            self._id_set.difference_update(self._ids[:overflow])
+            del self._ids[:overflow]
+            del self._roles[:overflow]
+            self._vectors = self._vectors[overflow:]
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return
+        with self._lock:
+            self._last_refresh = now
+            rows = (
+                ResumeAnalysis.objects
+                .filter(pk__gt=self._last_loaded_id, resume_vector__isnull=False)
+                .order_by('-pk')
+                .values_list('pk', 'target_role', 'resume_vector')[:self.max_entries]
+            )
+            for pk, target_role, blob in rows:
+                self._last_loaded_id = max(self._last_loaded_id, pk)
+                vector = vector_from_bytes(blob)
+                if vector is not None and pk not in self._id_set:
+                    self._id_set.add(pk)
+                    self._pending.append((pk, target_role, vector))
+            self._consolidate()
+
+    def search(self, vector, k=5, target_role=None, exclude_id=None):
+        """Returns [(analysis_id, similarity)] best first."""
+        self.refresh()
+        with self._lock:
+            self._consolidate()
+            ids, roles, matrix = list(self._ids), np.array(self._roles), self._vectors
+        if not ids:
+            return []
+
+        scores = matrix @ np.asarray(vector, dtype=np.float32)
+        if target_role:
+            scores = np.where(roles == target_role.strip().lower(), scores, -np.inf)
+        if exclude_id is not None:
+            scores = np.where(np.array(ids) == exclude_id, -np.inf, scores)
+
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(ids[i], round(float(scores[i]), 4)) for i in top if np.isfinite(scores[i])]
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_vector_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = VectorIndex(
+                    max_entries=getattr(settings, 'EMBEDDING_INDEX_MAX_ENTRIES', 20000),
+                    refresh_interval=getattr(settings, 'EMBEDDING_INDEX_REFRESH_SECONDS', 30)
+                )
+    return _index
+
+def find_similar_analyses(vector, k=5, target_role=None, exclude_id=None):
+    matches = get_vector_index().search(vector, k=k, target_role=target_role, exclude_id=exclude_id)
+    analyses = ResumeAnalysis.objects.in_bulk([pk for pk, _ in matches])
+    return [(analyses[pk], score) for pk, score in matches if pk in analyses]
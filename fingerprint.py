@@ -0,0 +1,115 @@
+import hashlib
+import re
+import unicodedata
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+SIMHASH_BITS = 64
+# Four 16-bit bands: by pigeonhole, any two fingerprints within Hamming
+# distance 3 (similarity >= ~0.95) share at least one band exactly.
+SIMHASH_BANDS = 4
+SHINGLE_SIZE = 3
+MIN_SHINGLES = 20
+
+_HYPHEN_BREAK = re.compile(r"(\w)-\s*\n\s*(\w)")
+_PAGE_MARKER = re.compile(r"^\s*(page\s+)?\d+\s*(of\s+\d+)?\s*$", re.IGNORECASE | re.MULTILINE)
+_BULLETS = re.compile(r"[•●▪■◦‣∙·*»➢➤✓✔-]+(?=\s)")
+_WHITESPACE = re.compile(r"\s+")
+_TRANSLATE = str.maketrans({
+    "‘": "'", "’": "'", "“": '"', "”": '"',
+    "–": "-", "—": "-", "­": "", "​": "", "\f": "\n"
+})
+
+def canonicalize_resume_text(text):
+    """
+    Normalises the differences two exports of the same CV typically have:
+    Unicode forms, smart quotes, soft hyphens, words hyphenated across line
+    breaks, page-number lines, bullet glyphs, case and whitespace.
+    """
+    text = unicodedata.normalize("NFKC", text).translate(_TRANSLATE)
+    text = _HYPHEN_BREAK.sub(r"\1\2", text)
+    text = _PAGE_MARKER.sub(" ", text)
+    text = _BULLETS.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+def _shingle_hashes(canonical_text):
+    words = canonical_text.split(" ")
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(len(words) - SHINGLE_SIZE + 1, 0))}
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles],
+        dtype=np.uint64
+    )
+
+def simhash(canonical_text):
+    """64-bit SimHash over word shingles; None for texts too short to be stable."""
+    hashes = _shingle_hashes(canonical_text)
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    bits = (hashes[:, None] >> np.arange(SIMHASH_BITS, dtype=np.uint64)) & np.uint64(1)
+    votes = bits.sum(axis=0).astype(np.int64) * 2 - len(hashes)
+    return int(sum(1 << i for i in range(SIMHASH_BITS) if votes[i] > 0))
+
+def similarity(fingerprint_a, fingerprint_b):
+    return 1 - bin(fingerprint_a ^ fingerprint_b).count("1") / SIMHASH_BITS
+
+def _band_keys(fingerprint, target_role, variant):
+    width = SIMHASH_BITS // SIMHASH_BANDS
+    role = target_role.strip().lower().replace(" ", "_")
+    return [
+        f"simhash_{variant or 'default'}_{role}_{band}_{(fingerprint >> (band * width)) & ((1 << width) - 1):x}"
+        for band in range(SIMHASH_BANDS)
+    ]
+
+def get_near_duplicate_threshold():
+    return getattr(settings, 'NEAR_DUPLICATE_THRESHOLD', 0.95)
+
+def find_near_duplicate(fingerprint, target_role, variant="", buckets=None):
+    """
+    Returns (resume_hash, similarity) of the closest indexed resume for the
+    same role at or above the threshold, or (None, None).
+    """
+    threshold = get_near_duplicate_threshold()
+    if fingerprint is None or threshold >= 1:
+        return None, None
+    if buckets is None:
+        buckets = cache.get_many(_band_keys(fingerprint, target_role, variant))
+
+    best_hash, best_score = None, threshold
+    for entries in buckets.values():
+        for candidate, resume_hash in entries:
+            score = similarity(fingerprint, candidate)
+            if score >= best_score and (best_hash is None or score > best_score):
+                best_hash, best_score = resume_hash, score
+    if best_hash is None:
+        return None, None
+    return best_hash, round(best_score, 4)
+
+async def afind_near_duplicate(fingerprint, target_role, variant=""):
+    if fingerprint is None:
+        return None, None
+    buckets = await cache.aget_many(_band_keys(fingerprint, target_role, variant))
+    return find_near_duplicate(fingerprint, target_role, variant, buckets=buckets)
+
+def _merged_buckets(fingerprint, resume_hash, keys, existing):
+    limit = getattr(settings, 'NEAR_DUPLICATE_BUCKET_SIZE', 32)
+    merged = {}
+    for key in keys:
+        entries = [entry for entry in existing.get(key, []) if entry[1] != resume_hash]
+        # Newest first, so the bucket keeps the most recent analyses
+        merged[key] = [(fingerprint, resume_hash)] + entries[:limit - 1]
+    return merged
+
+def index_fingerprint(fingerprint, resume_hash, target_role, variant="", timeout=None):
+    # Read-modify-write without a lock: a concurrent writer can drop an
+    # entry, which only costs a future near-duplicate hit.
+    if fingerprint is None:
+        return
+    keys = _band_keys(fingerprint, target_role, variant)
+    cache.set_many(_merged_buckets(fingerprint, resume_hash, keys, cache.get_many(keys)), timeout)
+
+async def aindex_fingerprint(fingerprint, resume_hash, target_role, variant="", timeout=None):
+    if fingerprint is None:
+        return
+    keys = _band_keys(fingerprint, target_role, variant)
+    await cache.aset_many(_merged_buckets(fingerprint, resume_hash, keys, await cache.aget_many(keys)), timeout)
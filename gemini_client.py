@@ -0,0 +1,431 @@
+import asyncio
+import collections
+import json
+import logging
+import math
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+import httpx
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from . import async_http_client, http_client
+from .metrics import (
+    GEMINI_ATTEMPTS, GEMINI_PROMPT_BYTES, GEMINI_QUEUE_SECONDS, GEMINI_REQUEST_SECONDS, GEMINI_RESPONSE_BYTES,
+    record_gemini_usage
+)
+from .pipeline import check_cancelled
+from .rate_limiting import consume_token
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+DEFAULT_MODELS = ["gemini-2.5-flash", "gemini-1.5-flash"]
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+class GeminiError(Exception):
+    pass
+
+class CircuitBreaker:
+    """
+    Per-model breaker: after `failure_threshold` consecutive failures the
+    model is skipped for `reset_timeout` seconds, then a single trial call
+    is let through to decide whether to close again.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(model):
+    with _breakers_lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker(
+                failure_threshold=getattr(settings, 'GEMINI_BREAKER_THRESHOLD', 3),
+                reset_timeout=getattr(settings, 'GEMINI_BREAKER_RESET_SECONDS', 60)
+            )
+        return _breakers[model]
+
+class SlotPool:
+    """
+    Counting semaphore shared by threads and asyncio tasks. A release hands
+    the slot straight to the longest waiter and wakes it, so nothing queued
+    for a slot polls.
+    """
+
+    def __init__(self, size):
+        self._free = size
+        self._lock = threading.Lock()
+        # Callables that wake a waiter and return False if it is gone
+        self._waiters = collections.deque()
+
+    def _take_or_queue(self, waiter):
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def _abandon(self, waiter):
+        """Leaves the queue; True if a release handed this waiter the slot first."""
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                return False
+            return True
+
+    def acquire(self, timeout):
+        event = threading.Event()
+
+        def waiter():
+            event.set()
+            return True
+
+        if self._take_or_queue(waiter) or event.wait(timeout):
+            return True
+        return self._abandon(waiter)
+
+    async def aacquire(self, timeout):
+        loop = asyncio.get_running_loop()
+        handed = loop.create_future()
+
+        def deliver():
+            if not handed.done():
+                handed.set_result(True)
+
+        def waiter():
+            try:
+                loop.call_soon_threadsafe(deliver)
+            except RuntimeError:
+                # The waiter's loop has closed; pass the slot on
+                return False
+            return True
+
+        if self._take_or_queue(waiter):
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(handed), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._abandon(waiter)
+        except asyncio.CancelledError:
+            if self._abandon(waiter):
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                if self._waiters.popleft()():
+                    return
+            self._free += 1
+
+class LLMGovernor:
+    """
+    Caps outbound Gemini traffic: at most `max_concurrency` calls in flight
+    per process and `max_qps` started per second (a token bucket in the
+    default cache). Callers queue for a slot instead of being sent into a
+    429, and a 429 pauses every caller of that model until its Retry-After
+    has passed. The QPS cap and cooldowns span workers only when the cache
+    is shared (REDIS_URL); with the LocMem default each process gets its own.
+    Sync and async callers share the same slots.
+    """
+
+    def __init__(self, max_concurrency=8, max_qps=10, queue_timeout=30):
+        self.max_qps = max_qps
+        self.queue_timeout = queue_timeout
+        self._slots = SlotPool(max_concurrency)
+
+    def cool_down(self, model, seconds):
+        if seconds > 0:
+            cache.set(f"llm_cooldown_{model}", time.time() + seconds, math.ceil(seconds) + 1)
+
+    def _wait_time(self, model, lock_wait=0.05):
+        """Seconds until a call to `model` may start; 0 takes a QPS token."""
+        cooldown_until = cache.get(f"llm_cooldown_{model}")
+        if cooldown_until and cooldown_until > time.time():
+            return cooldown_until - time.time()
+        if not self.max_qps:
+            return 0
+        allowed, retry_after = consume_token(
+            "llm_qps", self.max_qps, max(1, int(self.max_qps)), lock_wait=lock_wait
+        )
+        return 0 if allowed else retry_after
+
+    def _timed_out(self, started):
+        GEMINI_QUEUE_SECONDS.observe(time.monotonic() - started, outcome="timeout")
+        return GeminiError(f"Timed out after {self.queue_timeout}s waiting for a Gemini slot")
+
+    @contextmanager
+    def slot(self, model):
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        if not self._slots.acquire(self.queue_timeout):
+            raise self._timed_out(started)
+        try:
+            while (wait := self._wait_time(model)) > 0:
+                if time.monotonic() + wait > deadline:
+                    raise self._timed_out(started)
+                time.sleep(wait)
+            GEMINI_QUEUE_SECONDS.observe(time.monotonic() - started, outcome="ok")
+            yield
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def aslot(self, model):
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        if not await self._slots.aacquire(self.queue_timeout):
+            raise self._timed_out(started)
+        try:
+            # A couple of cache reads, done on the loop rather than a thread
+            # hop; never waits on the bucket lock, so the loop isn't stalled
+            while (wait := self._wait_time(model, lock_wait=0)) > 0:
+                if time.monotonic() + wait > deadline:
+                    raise self._timed_out(started)
+                await asyncio.sleep(wait)
+            GEMINI_QUEUE_SECONDS.observe(time.monotonic() - started, outcome="ok")
+            yield
+        finally:
+            self._slots.release()
+
+_governor = None
+_governor_lock = threading.Lock()
+
+def get_llm_governor():
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = LLMGovernor(
+                    max_concurrency=getattr(settings, 'GEMINI_MAX_CONCURRENCY', 8),
+                    max_qps=getattr(settings, 'GEMINI_MAX_QPS', 10),
+                    queue_timeout=getattr(settings, 'GEMINI_QUEUE_TIMEOUT', 30)
+                )
+    return _governor
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - timezone.now()).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def parse_json_object(content):
+    start = content.find("{")
+    end = content.rfind("}")
+    return json.loads(content[start:end+1])
+
+class GeminiClient:
+    def __init__(self, models=None, api_key=None, max_attempts=None, base_delay=None, max_delay=None, timeout=None):
+        self.models = models or getattr(settings, 'GEMINI_MODELS', None) or DEFAULT_MODELS
+        self.api_key = api_key or getattr(settings, 'GEMINI_API_KEY', None)
+        self.max_attempts = max_attempts or getattr(settings, 'GEMINI_MAX_ATTEMPTS', 3)
+        self.base_delay = base_delay if base_delay is not None else getattr(settings, 'GEMINI_BACKOFF_BASE', 0.5)
+        self.max_delay = max_delay if max_delay is not None else getattr(settings, 'GEMINI_BACKOFF_MAX', 8.0)
+        self.timeout = timeout or getattr(settings, 'GEMINI_TIMEOUT', 30)
+
+    def model_url(self, model):
+        base = getattr(settings, 'GEMINI_API_BASE', None) or DEFAULT_GEMINI_API_BASE
+        return f"{base.rstrip('/')}/models/{model}:generateContent"
+
+    def backoff_delay(self, attempt, response=None):
+        retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def worst_case_seconds(self):
+        """Upper bound on one generate() call: every model and attempt queued, timed out and backed off."""
+        queue_timeout = getattr(settings, 'GEMINI_QUEUE_TIMEOUT', 30)
+        return len(self.models) * self.max_attempts * (queue_timeout + self.timeout + self.max_delay)
+
+    def _handle_response(self, model, breaker, attempt, r):
+        """
+        Classifies one HTTP response: ("ok", text), ("retry", delay) or
+        ("next", None) to move on to the next model.
+        """
+        if r.status_code == 200:
+            try:
+                body = r.json()
+                # Blocked replies are still billed
+                record_gemini_usage(model, body)
+                text = body['candidates'][0]['content']['parts'][0]['text'].strip()
+            except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+                # e.g. a safety-blocked reply with no parts; another model may answer
+                logger.error(f"Malformed response from {model}: {e}")
+                breaker.record_failure()
+                return "next", None
+            breaker.record_success()
+            return "ok", text
+        if r.status_code in RETRYABLE_STATUS_CODES:
+            delay = self.backoff_delay(attempt, r)
+            if r.status_code == 429:
+                # The quota is shared, so hold back every caller, not just this one
+                get_llm_governor().cool_down(model, delay)
+            if attempt + 1 < self.max_attempts:
+                logger.warning(f"API Error {r.status_code} on {model}, retrying in {delay:.2f}s...")
+                return "retry", delay
+            breaker.record_failure()
+        else:
+            # The model answered, so a client error says nothing about its health
+            breaker.record_success()
+            logger.error(f"API Error {r.status_code} on {model}: {r.text}")
+        return "next", None
+
+    def _observe_attempt(self, model, started, response=None):
+        GEMINI_REQUEST_SECONDS.observe(
+            time.perf_counter() - started, model=model, status=response.status_code if response is not None else "error"
+        )
+        if response is not None:
+            GEMINI_RESPONSE_BYTES.observe(len(response.content), model=model)
+
+    def _available_models(self):
+        for model in self.models:
+            breaker = get_circuit_breaker(model)
+            if breaker.allow():
+                yield model, breaker
+            else:
+                logger.warning(f"Circuit open for {model}, skipping")
+
+    def generate(self, prompt, timeout=None):
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        prompt_bytes = len(prompt.encode('utf-8'))
+        for model, breaker in self._available_models():
+            GEMINI_PROMPT_BYTES.observe(prompt_bytes, model=model)
+            attempts = 0
+            try:
+                for attempt in range(self.max_attempts):
+                    check_cancelled()
+                    attempts += 1
+                    try:
+                        with get_llm_governor().slot(model):
+                            started = time.perf_counter()
+                            r = http_client.post(
+                                f"{self.model_url(model)}?key={self.api_key}",
+                                json=payload,
+                                timeout=timeout or self.timeout
+                            )
+                    except requests.RequestException as e:
+                        self._observe_attempt(model, started)
+                        logger.error(f"Connection error on {model}: {e}")
+                        breaker.record_failure()
+                        break
+                    self._observe_attempt(model, started, r)
+
+                    outcome, value = self._handle_response(model, breaker, attempt, r)
+                    if outcome == "ok":
+                        return value
+                    if outcome == "retry":
+                        time.sleep(value)
+                        continue
+                    break
+            finally:
+                GEMINI_ATTEMPTS.observe(attempts, model=model)
+        raise GeminiError("All Gemini models failed or are unavailable")
+
+    def generate_json(self, prompt, timeout=None):
+        return parse_json_object(self.generate(prompt, timeout=timeout))
+
+class AsyncGeminiClient(GeminiClient):
+    """Same retry, backoff and circuit-breaker policy, on the asyncio HTTP client."""
+
+    async def agenerate(self, prompt, timeout=None):
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        prompt_bytes = len(prompt.encode('utf-8'))
+        for model, breaker in self._available_models():
+            GEMINI_PROMPT_BYTES.observe(prompt_bytes, model=model)
+            attempts = 0
+            try:
+                for attempt in range(self.max_attempts):
+                    check_cancelled()
+                    attempts += 1
+                    try:
+                        async with get_llm_governor().aslot(model):
+                            started = time.perf_counter()
+                            r = await async_http_client.post(
+                                f"{self.model_url(model)}?key={self.api_key}",
+                                json=payload,
+                                timeout=timeout or self.timeout
+                            )
+                    except (httpx.HTTPError, requests.RequestException) as e:
+                        self._observe_attempt(model, started)
+                        logger.error(f"Connection error on {model}: {e}")
+                        breaker.record_failure()
+                        break
+                    self._observe_attempt(model, started, r)
+
+                    outcome, value = self._handle_response(model, breaker, attempt, r)
+                    if outcome == "ok":
+                        return value
+                    if outcome == "retry":
+                        await asyncio.sleep(value)
+                        continue
+                    break
+            finally:
+                GEMINI_ATTEMPTS.observe(attempts, model=model)
+        raise GeminiError("All Gemini models failed or are unavailable")
+
+    async def agenerate_json(self, prompt, timeout=None):
+        return parse_json_object(await self.agenerate(prompt, timeout=timeout))
+
+_client = None
+
+def get_gemini_client():
+    global _client
+    if _client is None:
+        _client = GeminiClient()
+    return _client
+
+_async_client = None
+
+def get_async_gemini_client():
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncGeminiClient()
+    return _async_client
@@ -0,0 +1,70 @@
+import logging
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+_host_semaphores = {}
+_host_lock = threading.Lock()
+
+class HostConcurrencyLimitExceeded(requests.exceptions.RequestException):
+    pass
+
+def get_session():
+    """
+    Process-wide keep-alive session shared by every outbound call to Gemini
+    and Adzuna, so TLS connections are reused instead of renegotiated.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=getattr(settings, 'HTTP_POOL_CONNECTIONS', 10),
+                    pool_maxsize=getattr(settings, 'HTTP_POOL_MAXSIZE', 20),
+                    pool_block=False
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+def _host_semaphore(url):
+    host = urlsplit(url).netloc
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        with _host_lock:
+            semaphore = _host_semaphores.setdefault(
+                host, threading.BoundedSemaphore(getattr(settings, 'HTTP_PER_HOST_LIMIT', 16))
+            )
+    return semaphore
+
+def resolve_timeout(timeout):
+    connect_timeout = getattr(settings, 'HTTP_CONNECT_TIMEOUT', 5)
+    if timeout is None:
+        return (connect_timeout, getattr(settings, 'HTTP_READ_TIMEOUT', 30))
+    if isinstance(timeout, (int, float)):
+        return (min(connect_timeout, timeout), timeout)
+    return timeout
+
+def request(method, url, timeout=None, **kwargs):
+    semaphore = _host_semaphore(url)
+    if not semaphore.acquire(timeout=getattr(settings, 'HTTP_QUEUE_TIMEOUT', 30)):
+        logger.warning(f"Concurrency limit reached for {urlsplit(url).netloc}")
+        raise HostConcurrencyLimitExceeded(f"Too many concurrent requests to {urlsplit(url).netloc}")
+    try:
+        return get_session().request(method, url, timeout=resolve_timeout(timeout), **kwargs)
+    finally:
+        semaphore.release()
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
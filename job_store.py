@@ -0,0 +1,141 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from jobs.adzuna_service import fetch_job_listings
+from .locks import acquire_advisory_lock, advisory_lock_held, release_advisory_lock
+from .metrics import CACHE_REQUESTS
+from .models import JobListingSnapshot, RoleMarketBenchmark, normalize_role_key
+
+logger = logging.getLogger(__name__)
+
+def _normalize(role, location):
+    return role.strip().title(), location.strip().title()
+
+def _lock_key(role, location):
+    return f"job_refresh_lock_{role.lower().replace(' ', '_')}_{location.lower().replace(' ', '_')}"
+
+def _is_fresh(snapshot):
+    ttl = getattr(settings, 'JOB_STORE_TTL', 60 * 60 * 6)
+    return snapshot.fetched_at is not None and snapshot.fetched_at > timezone.now() - timezone.timedelta(seconds=ttl)
+
+def refresh_job_listings(role, location="India"):
+    """
+    Pulls listings for (role, location) from Adzuna into the local store.
+    Single-flight across workers through an advisory lock in the database;
+    on failure the previous listings are kept and the lock is left to
+    expire, which backs off retries during outages.
+    Returns the snapshot, or None if another refresh holds the lock.
+    """
+    role, location = _normalize(role, location)
+    key = _lock_key(role, location)
+    token = acquire_advisory_lock(key, getattr(settings, 'JOB_STORE_FAILURE_BACKOFF', 300))
+    if token is None:
+        return None
+
+    listings = fetch_job_listings(role, location, getattr(settings, 'JOB_STORE_RESULTS_PER_FETCH', 50))
+    if listings is None:
+        snapshot, _ = JobListingSnapshot.objects.update_or_create(
+            role=role, location=location, defaults={"last_error": "Adzuna unavailable"}
+        )
+        return snapshot
+
+    # update_or_create re-reads on an IntegrityError, so a row created
+    # concurrently (e.g. after a lease expired) is updated, not duplicated
+    snapshot, _ = JobListingSnapshot.objects.update_or_create(
+        role=role, location=location,
+        defaults={"listings": listings, "fetched_at": timezone.now(), "last_error": ""}
+    )
+    release_advisory_lock(key, token)
+    return snapshot
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _refresh_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'JOB_STORE_REFRESH_WORKERS', 2),
+                    thread_name_prefix="job-refresh"
+                )
+    return _executor
+
+def _refresh_in_background(role, location):
+    try:
+        refresh_job_listings(role, location)
+    except Exception as e:
+        logger.error(f"Job listing refresh for {role} @ {location} failed: {e}")
+    finally:
+        close_old_connections()
+
+def is_known_job_role(role, location="India"):
+    """
+    Whether public job searches may read (role, location): it already has a
+    snapshot, or the role is benchmarked and the location is one of
+    JOB_STORE_LOCATIONS. Anything else would create a snapshot row and spend
+    Adzuna quota for an arbitrary string.
+    """
+    role, location = _normalize(role, location)
+    if JobListingSnapshot.objects.filter(role=role, location=location).exists():
+        return True
+    locations = {l.strip().title() for l in getattr(settings, 'JOB_STORE_LOCATIONS', ["India"])}
+    return location in locations and RoleMarketBenchmark.objects.filter(role_key=normalize_role_key(role)).exists()
+
+def get_job_snapshot(role, location="India"):
+    """
+    Serves listings from the local store and never waits on Adzuna: stale
+    snapshots trigger a background refresh and are served as-is, and a role
+    with nothing fetched yet schedules its first fetch and returns None at
+    once. Callers pick the listings up on a later request.
+    """
+    role, location = _normalize(role, location)
+    snapshot = JobListingSnapshot.objects.filter(role=role, location=location).first()
+    if snapshot and _is_fresh(snapshot):
+        CACHE_REQUESTS.inc(tier="job_store", result="fresh")
+        return snapshot
+    CACHE_REQUESTS.inc(tier="job_store", result="stale" if snapshot and snapshot.fetched_at else "miss")
+
+    if not advisory_lock_held(_lock_key(role, location)):
+        _refresh_executor().submit(_refresh_in_background, role, location)
+    return snapshot if snapshot and snapshot.fetched_at else None
+
+def get_live_jobs(role, location="India", limit=5):
+    snapshot = get_job_snapshot(role, location)
+    return snapshot.listings[:limit] if snapshot else []
+
+async def aget_live_jobs(role, location="India", limit=5):
+    return await sync_to_async(get_live_jobs, thread_sensitive=False)(role, location, limit)
+
+def search_job_listings(role, location="India", query=None, min_salary=None, page=1, page_size=10):
+    """Filters and paginates a stored snapshot locally."""
+    snapshot = get_job_snapshot(role, location)
+    listings = snapshot.listings if snapshot else []
+
+    if query:
+        needle = query.lower()
+        listings = [
+            job for job in listings
+            if needle in f"{job.get('title', '')} {job.get('company', '')} {job.get('description', '')}".lower()
+        ]
+    if min_salary is not None:
+        listings = [job for job in listings if (job.get('salary_max') or job.get('salary_min') or 0) >= min_salary]
+
+    start = (page - 1) * page_size
+    return {
+        "role": snapshot.role if snapshot else role.strip().title(),
+        "location": snapshot.location if snapshot else location.strip().title(),
+        "fetched_at": snapshot.fetched_at if snapshot else None,
+        "stale": not (snapshot and _is_fresh(snapshot)),
+        # Nothing fetched yet; a refresh is under way, so ask again shortly
+        "pending": snapshot is None,
+        "count": len(listings),
+        "page": page,
+        "page_size": page_size,
+        "results": listings[start:start + page_size]
+    }
@@ -1,14 +1,34 @@
 import json
 import os
-import requests
 import logging
-import hashlib
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
 from jsonschema import validate, ValidationError
 from django.conf import settings
-from .scoring import calculate_deterministic_score, calculate_confidence_score, get_or_create_role_profile, get_market_benchmark
+from .gemini_client import get_gemini_client, get_async_gemini_client
+from .scoring import (
+    calculate_deterministic_score, calculate_confidence_score, get_market_benchmark,
+    aget_market_benchmark, get_stored_market_benchmark, get_stored_role_profile
+)
+from .pipeline import StagePipeline, stage_timings_enabled
+from .models import RoleSkill
+from .embeddings import embed_text
+from .prompt_compaction import compact_for_fit, compact_for_growth
+from .skill_extractor import extract_skills, skill_key
+from .stage_cache import cached_stage, stage_cache_key, astage_cache_key, get_stage_result, aget_stage_result, set_stage_result
+from .dashboard_renderer import render_career_dashboard, merge_dashboard_narrative, get_salary_insight
+from .job_store import get_live_jobs, aget_live_jobs
 
 logger = logging.getLogger(__name__)
 
+# llm: full resume text to Gemini; prefilter: only locally extracted skills
+# to Gemini; fast: deterministic local scoring against stored role data,
+# with no LLM call at all (unprepared roles raise RoleNotPrepared)
+FIT_MODES = ("llm", "prefilter", "fast")
+
 RESUME_ANALYSIS_SCHEMA = {
     "type": "object",
     "properties": {
@@ -32,26 +52,37 @@ RESUME_ANALYSIS_SCHEMA = {
     ]
 }
 
-def generate_resume_embedding(resume_text):
-    return [ord(c) / 255.0 for c in hashlib.md5(resume_text.encode()).hexdigest()[:16]]
+MULTI_ROLE_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "roles": {
+            "type": "array",
+            "items": {
+                **RESUME_ANALYSIS_SCHEMA,
+                "properties": {**RESUME_ANALYSIS_SCHEMA["properties"], "role": {"type": "string"}},
+                "required": ["role"] + RESUME_ANALYSIS_SCHEMA["required"]
+            }
+        }
+    },
+    "required": ["roles"]
+}
 
-import time
+def format_benchmark(benchmark):
+    # Compact separators and no version field: only tokens the model uses
+    return json.dumps({k: v for k, v in benchmark.items() if k != 'version'}, separators=(",", ":"))
 
-def evaluate_fit_with_guardrails(resume_text, target_role, benchmark):
-    api_key = getattr(settings, 'GEMINI_API_KEY', None)
-    urls = [
-        "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent",
-        "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
-    ]
-    
-    prompt = f"""
+def generate_resume_embedding(resume_text):
+    return embed_text(resume_text)
+
+def build_fit_prompt(resume_text, target_role, benchmark):
+    return f"""
     You are an AI Career Fit Evaluator. 
     
     Candidate Resume: 
     {resume_text} 
     
     Role Requirements (Market Benchmark): 
-    {json.dumps(benchmark)}
+    {format_benchmark(benchmark)}
     
     Tasks: 
     1. Evaluate skill alignment realistically. 
@@ -79,53 +110,271 @@ def evaluate_fit_with_guardrails(resume_text, target_role, benchmark):
       "roadmap": {{"short_term": ["Action 1"], "long_term": ["Action 2"]}}
     }}
     """
+
+@cached_stage("fit", version="fit-v2")
+def evaluate_fit_with_guardrails(resume_text, target_role, benchmark):
+    try:
+        result = get_gemini_client().generate_json(build_fit_prompt(resume_text, target_role, benchmark))
+        validate(instance=result, schema=RESUME_ANALYSIS_SCHEMA)
+        return result
+    except Exception as e:
+        logger.error(f"Fit evaluation failed: {e}")
+        return None
+
+@cached_stage("fit", version="fit-v2")
+async def aevaluate_fit_with_guardrails(resume_text, target_role, benchmark):
+    try:
+        result = await get_async_gemini_client().agenerate_json(build_fit_prompt(resume_text, target_role, benchmark))
+        validate(instance=result, schema=RESUME_ANALYSIS_SCHEMA)
+        return result
+    except Exception as e:
+        logger.error(f"Fit evaluation failed: {e}")
+        return None
+
+def resolve_fit_mode(fit_mode=None):
+    mode = fit_mode or getattr(settings, 'FIT_MODE', 'llm')
+    if mode not in FIT_MODES:
+        raise ValueError(f"Unknown fit mode: {mode}")
+    return mode
+
+def build_prefiltered_fit_prompt(candidate_skills, target_role, benchmark):
+    return f"""
+    You are an AI Career Fit Evaluator. 
     
-    response = None
-    for url in urls:
-        for attempt in range(2):
-            try:
-                # Append key to URL
-                api_url = f"{url}?key={api_key}"
-                # Reduced timeout to 30s to stay within Gunicorn limits
-                r = requests.post(api_url, json={"contents": [{"parts": [{"text": prompt}]}]}, timeout=30)
-                if r.status_code == 200:
-                    response = r
-                    break
-                elif r.status_code == 429:
-                    logger.warning(f"Rate limited on {url}, retrying...")
-                    time.sleep(2)
-                    continue
-                else:
-                    logger.error(f"API Error {r.status_code} on {url}: {r.text}")
-                    break
-            except Exception as e:
-                logger.error(f"Connection error on {url}: {e}")
-                break
-        if response: break
+    Candidate Skills (pre-extracted from the resume): 
+    {json.dumps(candidate_skills)} 
+    
+    Role Requirements (Market Benchmark): 
+    {format_benchmark(benchmark)}
+    
+    Tasks: 
+    1. Evaluate skill alignment realistically for the role "{target_role}". 
+    2. Treat equivalent technologies as matches (e.g. Postgres for SQL databases). 
+    3. Assign a match percentage (0-100%). 
+    4. Give 2-line professional reasoning. 
+    
+    Scoring Rules:
+    - 90%+ only if candidate satisfies most advanced skills
+    - 70–85% for strong mid-level alignment
+    - 50–70% for partial alignment
+    - Below 50% if core gaps exist
+    - Never give 95%+ unless nearly perfect match
+    
+    Return output strictly in JSON format. 
+    IMPORTANT: "extracted_skills", "matched_skills", and "missing_skills" MUST be arrays of simple strings, NOT objects.
+    
+    {{ 
+      "extracted_skills": ["Skill 1", "Skill 2"],
+      "matched_skills": ["Skill 1"],
+      "missing_skills": ["Skill 3"],
+      "match_percentage": 0,
+      "readiness_score": 0,
+      "reason": "",
+      "roadmap": {{"short_term": ["Action 1"], "long_term": ["Action 2"]}}
+    }}
+    """
 
-    if not response:
+@cached_stage("fit", version="fit-prefilter-v2")
+def evaluate_prefiltered_fit(candidate_skills, target_role, benchmark):
+    try:
+        result = get_gemini_client().generate_json(build_prefiltered_fit_prompt(candidate_skills, target_role, benchmark))
+        validate(instance=result, schema=RESUME_ANALYSIS_SCHEMA)
+        return result
+    except Exception as e:
+        logger.error(f"Prefiltered fit evaluation failed: {e}")
         return None
-        
+
+@cached_stage("fit", version="fit-prefilter-v2")
+async def aevaluate_prefiltered_fit(candidate_skills, target_role, benchmark):
     try:
-        data = response.json()
-        content = data['candidates'][0]['content']['parts'][0]['text'].strip()
-        start = content.find("{")
-        end = content.rfind("}")
-        result = json.loads(content[start:end+1])
+        result = await get_async_gemini_client().agenerate_json(build_prefiltered_fit_prompt(candidate_skills, target_role, benchmark))
         validate(instance=result, schema=RESUME_ANALYSIS_SCHEMA)
         return result
     except Exception as e:
-        logger.error(f"Fit evaluation parsing failed: {e}")
+        logger.error(f"Prefiltered fit evaluation failed: {e}")
         return None
 
-def simulate_growth_with_rules(role, current_score, missing_skills, profile_summary):
-    api_key = getattr(settings, 'GEMINI_API_KEY', None)
-    urls = [
-        "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent",
-        "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
-    ]
+def evaluate_fit_deterministic(resume_text, target_role, benchmark, role_profile):
+    """
+    Fast-mode fit: local skill extraction scored against the role profile
+    by calculate_deterministic_score. Same shape as the LLM fit result.
+    """
+    extracted = extract_skills(resume_text)
+    if role_profile is None or not role_profile.required_skills:
+        # No locked profile yet; score against the benchmark instead
+        role_profile = RoleSkill(
+            role_name=target_role,
+            required_skills=benchmark.get('core_skills', []) + benchmark.get('advanced_skills', [])
+        )
+    match_percentage, matched = calculate_deterministic_score(extracted, role_profile)
+    matched_keys = {skill_key(s) for s in matched}
+    missing = [s for s in role_profile.required_skills if skill_key(s) not in matched_keys]
+
+    extracted_keys = {skill_key(s) for s in extracted}
+    core = benchmark.get('core_skills', [])
+    core_missing = [s for s in core if skill_key(s) not in extracted_keys]
+    advanced_missing = [s for s in benchmark.get('advanced_skills', []) if skill_key(s) not in extracted_keys]
+    readiness_score = round((len(core) - len(core_missing)) / len(core) * 100, 2) if core else match_percentage
+
+    return {
+        "extracted_skills": extracted,
+        "matched_skills": matched,
+        "missing_skills": missing,
+        "match_percentage": match_percentage,
+        "readiness_score": readiness_score,
+        "reason": f"Deterministic match: {len(matched)} of {len(role_profile.required_skills)} profile skills found on the resume.",
+        "roadmap": {
+            "short_term": [f"Build hands-on experience with {s}" for s in (core_missing or missing)[:3]],
+            "long_term": [f"Develop depth in {s}" for s in advanced_missing[:3]]
+        }
+    }
+
+def build_multi_role_fit_prompt(resume_text, benchmarks):
+    return f"""
+    You are an AI Career Fit Evaluator. 
+    
+    Candidate Resume: 
+    {resume_text} 
+    
+    Evaluate the candidate separately against EACH of these roles.
+    Role Requirements (Market Benchmarks, keyed by role): 
+    {json.dumps({role: json.loads(format_benchmark(b)) for role, b in benchmarks.items()}, separators=(",", ":"))}
+    
+    Tasks (for every role): 
+    1. Evaluate skill alignment realistically. 
+    2. Consider depth, not just keyword matching. 
+    3. Assign a match percentage (0-100%). 
+    4. Give 2-line professional reasoning. 
     
-    prompt = f"""
+    Scoring Rules:
+    - 90%+ only if candidate satisfies most advanced skills
+    - 70–85% for strong mid-level alignment
+    - 50–70% for partial alignment
+    - Below 50% if core gaps exist
+    - Never give 95%+ unless nearly perfect match
+    
+    Return output strictly in JSON format, with one entry per role using the exact role name given. 
+    IMPORTANT: "extracted_skills", "matched_skills", and "missing_skills" MUST be arrays of simple strings, NOT objects.
+    
+    {{ 
+      "roles": [
+        {{ 
+          "role": "Role name",
+          "extracted_skills": ["Skill 1", "Skill 2"],
+          "matched_skills": ["Skill 1"],
+          "missing_skills": ["Skill 3"],
+          "match_percentage": 0,
+          "readiness_score": 0,
+          "reason": "",
+          "roadmap": {{"short_term": ["Action 1"], "long_term": ["Action 2"]}}
+        }}
+      ]
+    }}
+    """
+
+def _fit_cache_key(resume_text, target_role, benchmark):
+    # Same key evaluate_fit_with_guardrails uses, so single-role analyses
+    # of this resume reuse what the multi-role call produced.
+    return stage_cache_key(
+        evaluate_fit_with_guardrails.stage, evaluate_fit_with_guardrails.version,
+        (resume_text, target_role, benchmark), {}
+    )
+
+def evaluate_fit_for_roles(resume_text, benchmarks):
+    """
+    Evaluates fit for several roles in one schema-validated Gemini call and
+    fans the per-role results out into the regular "fit" stage cache.
+    `benchmarks` maps role -> benchmark. Returns (fits, llm_calls) where
+    `fits` maps role -> fit data; roles the model omitted are absent.
+    """
+    fits = {}
+    uncached = {}
+    for role, benchmark in benchmarks.items():
+        key = _fit_cache_key(resume_text, role, benchmark)
+        cached = get_stage_result(key)
+        if cached is not None:
+            fits[role] = cached
+        else:
+            uncached[role] = (benchmark, key)
+
+    if not uncached:
+        return fits, 0
+
+    try:
+        result = get_gemini_client().generate_json(
+            build_multi_role_fit_prompt(resume_text, {role: benchmark for role, (benchmark, _) in uncached.items()})
+        )
+        validate(instance=result, schema=MULTI_ROLE_ANALYSIS_SCHEMA)
+    except Exception as e:
+        logger.error(f"Multi-role fit evaluation failed: {e}")
+        return fits, 1
+
+    by_name = {entry['role'].strip().lower(): entry for entry in result['roles']}
+    matched = {role: by_name.get(role.strip().lower()) for role in uncached}
+    # Order is only trusted when the model renamed every role; with any name
+    # match, a positional guess could hand one role another role's fit
+    positional = not any(matched.values()) and len(result['roles']) == len(uncached)
+    for position, (role, (benchmark, key)) in enumerate(uncached.items()):
+        entry = matched[role]
+        if entry is not None:
+            fit_data = {k: v for k, v in entry.items() if k != 'role'}
+            set_stage_result(evaluate_fit_with_guardrails.stage, key, fit_data)
+            fits[role] = fit_data
+        elif positional:
+            # Answered for this request only; the shared fit cache keeps
+            # name-matched results alone
+            fits[role] = {k: v for k, v in result['roles'][position].items() if k != 'role'}
+        else:
+            logger.warning(f"Multi-role fit response omitted role '{role}'")
+    return fits, 1
+
+def analyze_resume_for_roles(resume_text, target_roles):
+    """
+    "Which role suits me" flow: benchmarks are resolved concurrently, then
+    every role is scored by a single LLM call. Results are ranked by match.
+    """
+    pipeline = StagePipeline(name=f"multi-role[{len(target_roles)}]")
+    for role in target_roles:
+        pipeline.add_stage(f"benchmark:{role}", functools.partial(get_market_benchmark, role), required=False)
+    run = pipeline.run()
+
+    benchmarks = {role: run.results[f"benchmark:{role}"] for role in target_roles if run.results[f"benchmark:{role}"]}
+    if not benchmarks:
+        raise ValueError("Could not establish market benchmark for any role")
+
+    compaction = compact_for_fit(resume_text)
+    fit_started = time.perf_counter()
+    fits, llm_calls = evaluate_fit_for_roles(compaction["text"], benchmarks)
+    fit_ms = round((time.perf_counter() - fit_started) * 1000, 1)
+    if not fits:
+        raise ValueError("Failed to evaluate candidate fit")
+
+    roles = []
+    for role in target_roles:
+        fit_data = fits.get(role)
+        if fit_data is None:
+            roles.append({"target_role": role, "error": "Evaluation unavailable"})
+            continue
+        roles.append({
+            "target_role": role,
+            **fit_data,
+            "confidence_score": calculate_confidence_score(fit_data['match_percentage']),
+            "role_profile_version": benchmarks[role].get('version', 'v1.0')
+        })
+    roles.sort(key=lambda entry: entry.get('match_percentage', -1), reverse=True)
+
+    result = {
+        "roles": roles,
+        "best_role": roles[0]['target_role'] if 'match_percentage' in roles[0] else None,
+        "llm_calls": llm_calls,
+        "prompt_compaction": compaction_report({"fit": compaction})
+    }
+    if stage_timings_enabled():
+        result["stage_timings"] = {**run.timings, "fit": fit_ms, "total": round(run.total_ms + fit_ms, 1)}
+    return result
+
+def build_growth_prompt(role, current_score, missing_skills, profile_summary):
+    return f"""
     You are an AI Career Growth Simulator. 
     
     Given: 
@@ -153,60 +402,27 @@ def simulate_growth_with_rules(role, current_score, missing_skills, profile_summ
       "future_match_percentage": 0 
     }}
     """
-    
-    response = None
-    for url in urls:
-        for attempt in range(2):
-            try:
-                # Append key to URL
-                api_url = f"{url}?key={api_key}"
-                # Reduced timeout to 30s to stay within Gunicorn limits
-                r = requests.post(api_url, json={"contents": [{"parts": [{"text": prompt}]}]}, timeout=30)
-                if r.status_code == 200:
-                    response = r
-                    break
-                elif r.status_code == 429:
-                    logger.warning(f"Rate limited on {url}, retrying...")
-                    time.sleep(2)
-                    continue
-                else:
-                    logger.error(f"API Error {r.status_code} on {url}: {r.text}")
-                    break
-            except Exception as e:
-                logger.error(f"Connection error on {url}: {e}")
-                break
-        if response: break
 
-    if not response:
+@cached_stage("growth", version="growth-v1")
+def simulate_growth_with_rules(role, current_score, missing_skills, profile_summary):
+    try:
+        return get_gemini_client().generate_json(build_growth_prompt(role, current_score, missing_skills, profile_summary))
+    except Exception as e:
+        logger.error(f"Growth simulation failed: {e}")
         return None
-        
+
+@cached_stage("growth", version="growth-v1")
+async def asimulate_growth_with_rules(role, current_score, missing_skills, profile_summary):
     try:
-        data = response.json()
-        content = data['candidates'][0]['content']['parts'][0]['text'].strip()
-        start = content.find("{")
-        end = content.rfind("}")
-        return json.loads(content[start:end+1])
+        return await get_async_gemini_client().agenerate_json(build_growth_prompt(role, current_score, missing_skills, profile_summary))
     except Exception as e:
-        logger.error(f"Growth simulation parsing failed: {e}")
+        logger.error(f"Growth simulation failed: {e}")
         return None
 
-def generate_career_dashboard_summary(target_role, fit_data, growth_data):
-    api_key = getattr(settings, 'GEMINI_API_KEY', None)
-    urls = [
-        "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent",
-        "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
-    ]
-    
-    # Static salary mapping for demo (Tier-1 India)
-    salary_tiers = {
-        "Data Analyst": "₹8L - ₹18L",
-        "Business Analyst": "₹10L - ₹22L",
-        "Backend Developer": "₹12L - ₹35L",
-        "DevOps Engineer": "₹14L - ₹40L"
-    }
-    salary_range = salary_tiers.get(target_role, "₹10L - ₹25L")
+def build_dashboard_prompt(target_role, fit_data, growth_data):
+    salary_range = get_salary_insight(target_role)
 
-    prompt = f"""
+    return f"""
     You are an AI Career Coach. 
     Generate an executive-level Career Intelligence Dashboard summary.
     
@@ -232,71 +448,215 @@ def generate_career_dashboard_summary(target_role, fit_data, growth_data):
       "growth_roadmap": ["Action 1", "Action 2"]
     }}
     """
-    
-    response = None
-    for url in urls:
-        for attempt in range(2):
-            try:
-                # Append key to URL
-                api_url = f"{url}?key={api_key}"
-                # Reduced timeout to 30s to stay within Gunicorn limits
-                r = requests.post(api_url, json={"contents": [{"parts": [{"text": prompt}]}]}, timeout=30)
-                if r.status_code == 200:
-                    response = r
-                    break
-                elif r.status_code == 429:
-                    logger.warning(f"Rate limited on {url}, retrying...")
-                    time.sleep(2)
-                    continue
-                else:
-                    logger.error(f"API Error {r.status_code} on {url}: {r.text}")
-                    break
-            except Exception as e:
-                logger.error(f"Connection error on {url}: {e}")
-                break
-        if response: break
 
-    if not response:
-        return None
-        
+@cached_stage("dashboard", version="dashboard-v1")
+def generate_career_dashboard_summary(target_role, fit_data, growth_data):
     try:
-        data = response.json()
-        content = data['candidates'][0]['content']['parts'][0]['text'].strip()
-        start = content.find("{")
-        end = content.rfind("}")
-        return json.loads(content[start:end+1])
+        return get_gemini_client().generate_json(build_dashboard_prompt(target_role, fit_data, growth_data))
     except Exception as e:
-        logger.error(f"Dashboard summary parsing failed: {e}")
+        logger.error(f"Dashboard summary failed: {e}")
         return None
 
-def analyze_resume_with_llm(resume_text, target_role):
-    benchmark = get_market_benchmark(target_role)
-    if not benchmark:
-        raise ValueError("Could not establish market benchmark for role")
+def _dashboard_narrative_args(target_role, fit_data, growth_data):
+    # Positional, exactly as generate_career_dashboard_summary is called
+    return (
+        generate_career_dashboard_summary.stage, generate_career_dashboard_summary.version,
+        (target_role, fit_data, growth_data), {}
+    )
 
-    fit_data = evaluate_fit_with_guardrails(resume_text, target_role, benchmark)
-    if not fit_data:
-        raise ValueError("Failed to evaluate candidate fit")
-        
-    growth_data = simulate_growth_with_rules(
-        target_role, 
-        fit_data['match_percentage'], 
-        fit_data['missing_skills'], 
-        resume_text[:1000]
+def peek_dashboard_narrative(target_role, fit_data, growth_data):
+    return get_stage_result(stage_cache_key(*_dashboard_narrative_args(target_role, fit_data, growth_data)))
+
+async def apeek_dashboard_narrative(target_role, fit_data, growth_data):
+    return await aget_stage_result(await astage_cache_key(*_dashboard_narrative_args(target_role, fit_data, growth_data)))
+
+_enrichment_executor = None
+_enrichment_lock = threading.Lock()
+
+def _get_enrichment_executor():
+    global _enrichment_executor
+    if _enrichment_executor is None:
+        with _enrichment_lock:
+            if _enrichment_executor is None:
+                _enrichment_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'DASHBOARD_ENRICHMENT_WORKERS', 2),
+                    thread_name_prefix="dashboard-narrative"
+                )
+    return _enrichment_executor
+
+def schedule_dashboard_enrichment(target_role, fit_data, growth_data, on_complete=None):
+    """
+    Generates the LLM executive summary off the request path. The result
+    lands in the dashboard stage cache (so later requests merge it in
+    synchronously) and is handed to `on_complete` if given.
+    """
+    def enrich():
+        narrative = generate_career_dashboard_summary(target_role, fit_data, growth_data)
+        if narrative and on_complete:
+            try:
+                on_complete(narrative)
+            except Exception as e:
+                logger.error(f"Dashboard narrative callback failed: {e}")
+
+    _get_enrichment_executor().submit(enrich)
+
+def dashboard_enrichment_enabled():
+    return getattr(settings, 'DASHBOARD_LLM_ENRICHMENT', False)
+
+def compact_resume_for_prompts(resume_text):
+    compaction = {"fit": compact_for_fit(resume_text), "growth": compact_for_growth(resume_text)}
+    logger.info(
+        f"Prompt compaction saved {compaction['fit']['tokens_saved']} fit / "
+        f"{compaction['growth']['tokens_saved']} growth tokens"
     )
-    
-    if not growth_data:
-        raise ValueError("Failed to simulate growth trajectory")
-        
-    dashboard_summary = generate_career_dashboard_summary(target_role, fit_data, growth_data)
+    return compaction
+
+def analyze_resume_with_llm(resume_text, target_role, on_stage_complete=None, fit_mode=None, on_dashboard_narrative=None):
+    fit_mode = resolve_fit_mode(fit_mode)
+
+    def benchmark_stage():
+        if fit_mode == "fast":
+            # Fast mode never generates role data; see get_stored_market_benchmark
+            return get_stored_market_benchmark(target_role)
+        benchmark = get_market_benchmark(target_role)
+        if not benchmark:
+            raise ValueError("Could not establish market benchmark for role")
+        return benchmark
+
+    def fit_stage(benchmark, compaction=None, profile=None):
+        if fit_mode == "fast":
+            return evaluate_fit_deterministic(resume_text, target_role, benchmark, profile)
+        if fit_mode == "prefilter":
+            fit_data = evaluate_prefiltered_fit(extract_skills(resume_text), target_role, benchmark)
+        else:
+            fit_data = evaluate_fit_with_guardrails(compaction["fit"]["text"], target_role, benchmark)
+        if not fit_data:
+            raise ValueError("Failed to evaluate candidate fit")
+        return fit_data
+
+    def growth_stage(fit, compaction):
+        growth_data = simulate_growth_with_rules(
+            target_role, 
+            fit['match_percentage'], 
+            fit['missing_skills'], 
+            compaction["growth"]["text"]
+        )
+        if not growth_data:
+            raise ValueError("Failed to simulate growth trajectory")
+        return growth_data
+
+    def dashboard_stage(fit, growth):
+        dashboard = render_career_dashboard(target_role, fit, growth)
+        if not dashboard_enrichment_enabled():
+            return dashboard
+        narrative = peek_dashboard_narrative(target_role, fit, growth)
+        if narrative is None:
+            schedule_dashboard_enrichment(target_role, fit, growth, on_dashboard_narrative)
+        return merge_dashboard_narrative(dashboard, narrative)
+
+    # Live jobs and the embedding do not depend on any LLM output, so they
+    # overlap with the benchmark -> fit -> growth chain. The dashboard is
+    # rendered locally; its LLM narrative (if enabled) arrives later via
+    # on_dashboard_narrative.
+    pipeline = StagePipeline(name=f"analysis[{target_role}]")
+    pipeline.add_stage("benchmark", benchmark_stage)
+    pipeline.add_stage("embedding", lambda: generate_resume_embedding(resume_text), required=False)
+    if fit_mode == "fast":
+        # Deterministic match on stored role data only: no LLM stages and
+        # no external calls, so no benchmark or profile is generated here
+        pipeline.add_stage("profile", lambda: get_stored_role_profile(target_role), required=False)
+        pipeline.add_stage("fit", fit_stage, depends_on=["benchmark", "profile"])
+    else:
+        pipeline.add_stage("live_jobs", lambda: get_live_jobs(target_role), required=False)
+        pipeline.add_stage("compaction", lambda: compact_resume_for_prompts(resume_text))
+        pipeline.add_stage("fit", fit_stage, depends_on=["benchmark", "compaction"])
+        pipeline.add_stage("growth", growth_stage, depends_on=["fit", "compaction"])
+        pipeline.add_stage("dashboard", dashboard_stage, depends_on=["fit", "growth"], required=False)
+    run = pipeline.run(on_stage_complete=on_stage_complete)
+
+    return _build_final_result(run)
+
+async def aanalyze_resume_with_llm(resume_text, target_role, on_stage_complete=None, fit_mode=None, on_dashboard_narrative=None):
+    fit_mode = resolve_fit_mode(fit_mode)
+
+    async def benchmark_stage():
+        if fit_mode == "fast":
+            return await sync_to_async(get_stored_market_benchmark, thread_sensitive=False)(target_role)
+        benchmark = await aget_market_benchmark(target_role)
+        if not benchmark:
+            raise ValueError("Could not establish market benchmark for role")
+        return benchmark
+
+    async def fit_stage(benchmark, compaction=None, profile=None):
+        if fit_mode == "fast":
+            return await sync_to_async(evaluate_fit_deterministic, thread_sensitive=False)(
+                resume_text, target_role, benchmark, profile
+            )
+        if fit_mode == "prefilter":
+            candidate_skills = await sync_to_async(extract_skills, thread_sensitive=False)(resume_text)
+            fit_data = await aevaluate_prefiltered_fit(candidate_skills, target_role, benchmark)
+        else:
+            fit_data = await aevaluate_fit_with_guardrails(compaction["fit"]["text"], target_role, benchmark)
+        if not fit_data:
+            raise ValueError("Failed to evaluate candidate fit")
+        return fit_data
+
+    async def growth_stage(fit, compaction):
+        growth_data = await asimulate_growth_with_rules(
+            target_role, 
+            fit['match_percentage'], 
+            fit['missing_skills'], 
+            compaction["growth"]["text"]
+        )
+        if not growth_data:
+            raise ValueError("Failed to simulate growth trajectory")
+        return growth_data
+
+    async def dashboard_stage(fit, growth):
+        dashboard = render_career_dashboard(target_role, fit, growth)
+        if not dashboard_enrichment_enabled():
+            return dashboard
+        narrative = await apeek_dashboard_narrative(target_role, fit, growth)
+        if narrative is None:
+            schedule_dashboard_enrichment(target_role, fit, growth, on_dashboard_narrative)
+        return merge_dashboard_narrative(dashboard, narrative)
+
+    pipeline = StagePipeline(name=f"analysis[{target_role}]")
+    pipeline.add_stage("benchmark", benchmark_stage)
+    pipeline.add_stage("embedding", lambda: generate_resume_embedding(resume_text), required=False)
+    if fit_mode == "fast":
+        pipeline.add_stage(
+            "profile", lambda: sync_to_async(get_stored_role_profile, thread_sensitive=False)(target_role), required=False
+        )
+        pipeline.add_stage("fit", fit_stage, depends_on=["benchmark", "profile"])
+    else:
+        pipeline.add_stage("live_jobs", lambda: aget_live_jobs(target_role), required=False)
+        pipeline.add_stage("compaction", lambda: compact_resume_for_prompts(resume_text))
+        pipeline.add_stage("fit", fit_stage, depends_on=["benchmark", "compaction"])
+        pipeline.add_stage("growth", growth_stage, depends_on=["fit", "compaction"])
+        pipeline.add_stage("dashboard", dashboard_stage, depends_on=["fit", "growth"], required=False)
+    run = await pipeline.arun(on_stage_complete=on_stage_complete)
+    return _build_final_result(run)
+
+def _build_final_result(run):
+    benchmark = run.results["benchmark"]
+    fit_data = run.results["fit"]
     
     final_result = {
         **fit_data,
-        "improvement_plan": growth_data,
-        "dashboard_summary": dashboard_summary,
+        "improvement_plan": run.results.get("growth"),
+        "dashboard_summary": run.results.get("dashboard"),
+        "live_jobs": run.results.get("live_jobs") or [],
         "confidence_score": calculate_confidence_score(fit_data['match_percentage']),
-        "resume_embedding": generate_resume_embedding(resume_text),
-        "role_profile_version": benchmark.get('version', 'v1.0')
+        "resume_embedding": run.results["embedding"],
+        "role_profile_version": benchmark.get('version', 'v1.0'),
+        "prompt_compaction": compaction_report(run.results.get("compaction")),
+        "stage_timings": run.stage_timings()
     }
     
     return final_result
+
+def compaction_report(compaction):
+    if not compaction:
+        return None
+    return {prompt: {k: v for k, v in stats.items() if k != 'text'} for prompt, stats in compaction.items()}
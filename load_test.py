@@ -0,0 +1,152 @@
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import fitz
+import requests
+
+SKILL_POOL = [
+    "Python", "SQL", "Excel", "Tableau", "Power BI", "Statistics", "Pandas", "NumPy", "Machine Learning",
+    "Django", "Flask", "REST APIs", "PostgreSQL", "Docker", "Kubernetes", "AWS", "Terraform", "Linux",
+    "Git", "CI/CD", "Java", "Spring Boot", "React", "JavaScript", "Communication", "Stakeholder Management"
+]
+TITLES = ["Data Analyst", "Backend Developer", "DevOps Engineer", "Business Analyst", "Software Engineer"]
+COMPANIES = ["Acme Analytics", "Nimbus Systems", "Bluefin Labs", "Orbit Retail", "Kestrel Finance"]
+ACTIONS = [
+    "Built", "Automated", "Designed", "Migrated", "Optimised", "Maintained", "Led", "Delivered"
+]
+OBJECTS = [
+    "a reporting pipeline", "weekly KPI dashboards", "a REST service", "the deployment workflow",
+    "data quality checks", "an ETL job", "monitoring and alerting", "customer churn analysis"
+]
+
+def synthetic_resume_text(seed):
+    rng = random.Random(seed)
+    skills = rng.sample(SKILL_POOL, rng.randint(6, 12))
+    lines = [
+        f"Candidate {seed}",
+        f"candidate{seed}@example.com | +91 98{seed:08d}"[:60],
+        "",
+        "Summary",
+        f"{rng.choice(TITLES)} with {rng.randint(1, 8)} years of experience in {', '.join(skills[:3])}.",
+        "",
+        "Skills",
+        ", ".join(skills),
+        "",
+        "Experience",
+    ]
+    for _ in range(rng.randint(2, 3)):
+        lines.append(f"{rng.choice(TITLES)}, {rng.choice(COMPANIES)} ({rng.randint(2015, 2021)} - {rng.randint(2022, 2025)})")
+        for _ in range(rng.randint(3, 5)):
+            lines.append(f"- {rng.choice(ACTIONS)} {rng.choice(OBJECTS)} using {rng.choice(skills)}.")
+    lines += ["", "Projects"]
+    for _ in range(rng.randint(1, 3)):
+        lines.append(f"- {rng.choice(ACTIONS)} {rng.choice(OBJECTS)} with {rng.choice(skills)} and {rng.choice(skills)}.")
+    lines += ["", "Education", f"B.Tech, Computer Science, {rng.randint(2012, 2022)}"]
+    return "\n".join(lines)
+
+def synthetic_resume_pdf(seed):
+    """A one-page text PDF whose content is deterministic for `seed`."""
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_textbox(fitz.Rect(50, 50, 560, 800), synthetic_resume_text(seed), fontsize=9)
+    data = document.tobytes()
+    document.close()
+    return data
+
+def build_corpus(size, seed=0):
+    return [(f"resume_{seed + i}.pdf", synthetic_resume_pdf(seed + i)) for i in range(size)]
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+def _summarize(values):
+    return {
+        "count": len(values),
+        "mean": round(statistics.fmean(values), 1) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+def run_load_test(base_url, corpus, target_role, total_requests, concurrency, fit_mode=None, timeout=120):
+    """
+    Posts the corpus round-robin to /api/analyze-resume/ from `concurrency`
+    threads. Returns a report with throughput, latency percentiles (ms),
+    status counts and per-stage timings taken from the responses.
+    """
+    url = f"{base_url.rstrip('/')}/api/analyze-resume/"
+    latencies = []
+    statuses = {}
+    stages = {}
+    errors = []
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one_request(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        name, pdf = corpus[i % len(corpus)]
+        data = {"target_role": target_role}
+        if fit_mode:
+            data["fit_mode"] = fit_mode
+
+        started = time.perf_counter()
+        try:
+            response = session.post(url, data=data, files={"resume_file": (name, pdf, "application/pdf")}, timeout=timeout)
+            status, body = response.status_code, response.json() if response.content else {}
+        except (requests.RequestException, ValueError) as e:
+            status, body = "error", {}
+            with lock:
+                errors.append(str(e))
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+            if status in (200, 201):
+                latencies.append(elapsed_ms)
+            # Cache hits (200) carry the timings of the run that produced them
+            if status == 201:
+                for stage, ms in (body.get("stage_timings") or {}).items():
+                    stages.setdefault(stage, []).append(ms)
+
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(total_requests)))
+    wall_seconds = time.perf_counter() - wall_started
+
+    successes = statuses.get(200, 0) + statuses.get(201, 0)
+    return {
+        "url": url,
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "corpus_size": len(corpus),
+        "wall_seconds": round(wall_seconds, 2),
+        "requests_per_second": round(successes / wall_seconds, 2) if wall_seconds else None,
+        "status_counts": {str(k): v for k, v in sorted(statuses.items(), key=lambda item: str(item[0]))},
+        "latency_ms": _summarize(latencies),
+        "stage_ms": {stage: _summarize(values) for stage, values in sorted(stages.items())},
+        "errors": errors[:10],
+    }
+
+def format_report(report):
+    lines = [
+        f"{report['requests']} requests to {report['url']} at concurrency {report['concurrency']} "
+        f"({report['corpus_size']} distinct resumes) in {report['wall_seconds']}s",
+        f"Throughput: {report['requests_per_second']} req/s   Status: {report['status_counts']}",
+    ]
+    latency = report['latency_ms']
+    lines.append(f"Latency ms: p50={latency['p50']} p95={latency['p95']} p99={latency['p99']} mean={latency['mean']}")
+    if report['stage_ms']:
+        lines.append(f"{'stage':<16}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for stage, summary in report['stage_ms'].items():
+            lines.append(f"{stage:<16}{summary['count']:>7}{summary['p50']:>10}{summary['p95']:>10}{summary['p99']:>10}")
+    for error in report['errors']:
+        lines.append(f"error: {error}")
+    return "\n".join(lines)
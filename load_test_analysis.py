@@ -0,0 +1,31 @@
+import json
+from django.core.management.base import BaseCommand
+from resume.load_test import build_corpus, format_report, run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives /api/analyze-resume/ with synthetic PDFs and reports req/s, latency percentiles and "
+        "per-stage timings (run the app with EXPOSE_STAGE_TIMINGS=True for the latter)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default="http://127.0.0.1:8000", help="Base URL of the running app")
+        parser.add_argument('--role', default="Data Analyst")
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--corpus-size', type=int, default=50, help="Distinct resumes; fewer than --requests exercises the cache")
+        parser.add_argument('--seed', type=int, default=0, help="Change to bypass results cached by an earlier run")
+        parser.add_argument('--fit-mode', choices=["llm", "prefilter", "fast"])
+        parser.add_argument('--json', dest='json_path', help="Also write the report to this file")
+
+    def handle(self, *args, **options):
+        corpus = build_corpus(options['corpus_size'], seed=options['seed'])
+        report = run_load_test(
+            options['url'], corpus, options['role'], options['requests'], options['concurrency'],
+            fit_mode=options['fit_mode']
+        )
+        self.stdout.write(format_report(report))
+        if options['json_path']:
+            with open(options['json_path'], "w") as f:
+                json.dump(report, f, indent=2)
@@ -0,0 +1,29 @@
+import uuid
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import AdvisoryLock
+
+def acquire_advisory_lock(key, ttl):
+    """
+    Takes the named lock for `ttl` seconds. Returns a token to release it
+    with, or None if another process holds it. Backed by a unique row in
+    the database, so it holds across workers whatever the cache backend is.
+    """
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    expires_at = now + timezone.timedelta(seconds=ttl)
+    # Take over a lease its holder never released (e.g. the process died)
+    if AdvisoryLock.objects.filter(key=key, expires_at__lte=now).update(token=token, expires_at=expires_at):
+        return token
+    try:
+        with transaction.atomic():
+            AdvisoryLock.objects.create(key=key, token=token, expires_at=expires_at)
+    except IntegrityError:
+        return None
+    return token
+
+def release_advisory_lock(key, token):
+    AdvisoryLock.objects.filter(key=key, token=token).delete()
+
+def advisory_lock_held(key):
+    return AdvisoryLock.objects.filter(key=key, expires_at__gt=timezone.now()).exists()
@@ -0,0 +1,256 @@
+import hmac
+import ipaddress
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseNotFound
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 25, 50, 100)
+
+_registry = []
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+class Histogram:
+    """
+    Prometheus-style histogram. Buckets are fixed up front, so observe() is
+    a bisect and two additions under a lock.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts plus +Inf, then the running sum
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', bound))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {round(total, 6)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+REQUEST_SECONDS = Histogram(
+    "resume_http_request_seconds", "Time to build the HTTP response, by view", ("view", "method", "status")
+)
+REQUEST_DB_SECONDS = Histogram(
+    "resume_http_request_db_seconds", "Database time spent on the request thread, by view", ("view",)
+)
+REQUEST_DB_QUERIES = Histogram(
+    "resume_http_request_db_queries", "Queries run on the request thread, by view", ("view",), COUNT_BUCKETS
+)
+PDF_PARSE_SECONDS = Histogram("resume_pdf_parse_seconds", "PDF text extraction time on extraction-cache misses")
+CACHE_REQUESTS = Counter("resume_cache_requests_total", "Cache lookups by tier and result", ("tier", "result"))
+PIPELINE_STAGE_SECONDS = Histogram(
+    "resume_pipeline_stage_seconds", "Analysis pipeline stage duration", ("stage", "outcome")
+)
+GEMINI_REQUEST_SECONDS = Histogram(
+    "resume_gemini_request_seconds", "Latency of each Gemini HTTP attempt", ("model", "status")
+)
+GEMINI_ATTEMPTS = Histogram(
+    "resume_gemini_attempts", "HTTP attempts per Gemini call and model", ("model",), COUNT_BUCKETS
+)
+GEMINI_PROMPT_BYTES = Histogram("resume_gemini_prompt_bytes", "Prompt size sent to Gemini", ("model",), SIZE_BUCKETS)
+GEMINI_RESPONSE_BYTES = Histogram(
+    "resume_gemini_response_bytes", "Response body size received from Gemini", ("model",), SIZE_BUCKETS
+)
+GEMINI_TOKENS = Counter("resume_gemini_tokens_total", "Tokens reported in Gemini usageMetadata", ("model", "kind"))
+ADZUNA_REQUEST_SECONDS = Histogram("resume_adzuna_request_seconds", "Latency of Adzuna job searches", ("status",))
+GEMINI_QUEUE_SECONDS = Histogram(
+    "resume_gemini_queue_seconds", "Time Gemini calls waited on the LLM governor", ("outcome",)
+)
+RATE_LIMITED_REQUESTS = Counter("resume_rate_limited_requests_total", "Requests rejected by the rate limiter", ("scope",))
+
+def metrics_enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+def metrics_access_allowed(request):
+    """
+    A scraper sending "Authorization: Bearer <METRICS_TOKEN>", or one
+    connecting from METRICS_ALLOWED_NETWORKS. With neither configured the
+    metrics are not served at all.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and hmac.compare_digest(
+        request.headers.get('Authorization', '').encode('utf-8'), f"Bearer {token}".encode('utf-8')
+    ):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in getattr(settings, 'METRICS_ALLOWED_NETWORKS', [])
+    )
+
+def metrics_response(request):
+    if not metrics_access_allowed(request):
+        # Indistinguishable from any other unknown path
+        return HttpResponseNotFound()
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _is_metrics_path(request):
+    return request.path.rstrip('/') == getattr(settings, 'METRICS_PATH', '/internal/metrics').rstrip('/')
+
+def record_gemini_usage(model, body):
+    usage = body.get("usageMetadata") if isinstance(body, dict) else None
+    if not usage:
+        return
+    for kind, field in (("prompt", "promptTokenCount"), ("response", "candidatesTokenCount")):
+        if usage.get(field):
+            GEMINI_TOKENS.inc(usage[field], model=model, kind=kind)
+
+def render_metrics():
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+class _QueryTimer:
+    def __init__(self):
+        self.seconds = 0.0
+        self.queries = 0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.seconds += seconds
+            self.queries += 1
+
+# The timer of the request being served. Context variables follow the
+# request into sync_to_async threads, so async views are measured too;
+# pipeline executor threads don't inherit it and aren't counted.
+_request_timer = ContextVar("request_db_timer", default=None)
+
+def _time_query(execute, sql, params, many, context):
+    timer = _request_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.add(time.perf_counter() - started)
+
+def _install_query_timer(sender, connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+connection_created.connect(_install_query_timer)
+
+class MetricsMiddleware:
+    """
+    Records response time and request DB time per view, for both WSGI and
+    ASGI: being async-capable, it doesn't force native async views back
+    onto a thread. Metrics are per process; scrape every worker. Streaming
+    responses are timed up to the point the response object is returned,
+    not until the body is sent. Also serves the metrics at METRICS_PATH,
+    outside the public API's URLs, to allowed scrapers only.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not metrics_enabled():
+            return self.get_response(request)
+        if _is_metrics_path(request):
+            return metrics_response(request)
+
+        timer = _QueryTimer()
+        reset = _request_timer.set(timer)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_timer.reset(reset)
+        self._observe(request, response, time.perf_counter() - started, timer)
+        return response
+
+    async def __acall__(self, request):
+        if not metrics_enabled():
+            return await self.get_response(request)
+        if _is_metrics_path(request):
+            return metrics_response(request)
+
+        timer = _QueryTimer()
+        reset = _request_timer.set(timer)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_timer.reset(reset)
+        self._observe(request, response, time.perf_counter() - started, timer)
+        return response
+
+    def _observe(self, request, response, elapsed, timer):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else "unmatched"
+        REQUEST_SECONDS.observe(elapsed, view=view, method=request.method, status=response.status_code)
+        REQUEST_DB_SECONDS.observe(timer.seconds, view=view)
+        REQUEST_DB_QUERIES.observe(timer.queries, view=view)
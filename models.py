@@ -1,7 +1,30 @@
+import uuid
 from django.db import models
 
+def normalize_role_key(role_name):
+    """Case- and whitespace-insensitive lookup key: "DevOps  engineer" -> "devops engineer"."""
+    return " ".join(role_name.split()).casefold()
+
+def legacy_role_key(role_name, pk, max_length):
+    # "<key>#<pk>", given by migration 0010 to rows that only differed from
+    # another by case or spacing
+    suffix = f"#{pk}"
+    return f"{normalize_role_key(role_name)[:max_length - len(suffix)]}{suffix}"
+
+def stored_role_key(instance, role_name):
+    """
+    role_key to save for `role_name`. A legacy case-duplicate keeps its
+    suffixed key while its name is unchanged, so re-saving it can't collide
+    with the row that owns the plain key.
+    """
+    max_length = instance._meta.get_field('role_key').max_length
+    if instance.pk is not None and instance.role_key == legacy_role_key(role_name, instance.pk, max_length):
+        return instance.role_key
+    return normalize_role_key(role_name)
+
 class RoleMarketBenchmark(models.Model):
     role = models.CharField(max_length=100, unique=True)
+    role_key = models.CharField(max_length=100, unique=True, editable=False)
     core_skills = models.JSONField()
     advanced_skills = models.JSONField()
     experience_expectation = models.TextField()
@@ -11,12 +34,19 @@ class RoleMarketBenchmark(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        self.role_key = stored_role_key(self, self.role)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.role} ({self.version})"
 
 class ResumeAnalysis(models.Model):
+    # Assigned before the row is written, so responses can reference it
+    public_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     resume_file = models.FileField(upload_to='resumes/')
     target_role = models.CharField(max_length=255)
+    role_key = models.CharField(max_length=255, default="", editable=False)
     extracted_skills = models.JSONField(default=list)
     matched_skills = models.JSONField(default=list)
     missing_skills = models.JSONField(default=list)
@@ -24,24 +54,40 @@ class ResumeAnalysis(models.Model):
     readiness_score = models.FloatField()
     roadmap = models.JSONField(default=dict)
     confidence_score = models.FloatField(default=0.0)
-    resume_embedding = models.JSONField(null=True, blank=True)
+    # float32 vector from embeddings.embed_text, stored as raw bytes
+    resume_vector = models.BinaryField(null=True, blank=True, editable=False)
     role_profile_version = models.IntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name_plural = "Resume Analyses"
+        indexes = [
+            # Per-role history, newest first
+            models.Index(fields=['role_key', '-created_at'], name='analysis_role_recent_idx'),
+            # Prewarm's "most requested roles in the last N days" window
+            models.Index(fields=['created_at', 'role_key'], name='analysis_created_role_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.role_key = normalize_role_key(self.target_role)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.target_role} - {self.created_at}"
 
 class RoleSkill(models.Model):
     role_name = models.CharField(max_length=255, unique=True)
+    role_key = models.CharField(max_length=255, unique=True, editable=False)
     required_skills = models.JSONField(default=list)
     version = models.IntegerField(default=1)
     is_locked = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        self.role_key = stored_role_key(self, self.role_name)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.role_name} (v{self.version})"
 
@@ -51,3 +97,63 @@ class CandidateAnalysis(models.Model):
     improvement_plan = models.JSONField()
     dashboard_summary = models.JSONField()
     created_at = models.DateTimeField(auto_now_add=True)
+
+class AnalysisJob(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    resume_file = models.FileField(upload_to='resumes/')
+    target_role = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    progress = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # Oldest pending job first when a worker claims work
+            models.Index(fields=['status', 'created_at'], name='analysisjob_claim_idx'),
+            # Reaping jobs stuck in "running"
+            models.Index(fields=['status', 'started_at'], name='analysisjob_stale_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.target_role} [{self.status}]"
+
+class JobListingSnapshot(models.Model):
+    role = models.CharField(max_length=255)
+    location = models.CharField(max_length=255)
+    listings = models.JSONField(default=list)
+    fetched_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('role', 'location')
+
+    def __str__(self):
+        return f"{self.role} @ {self.location} ({len(self.listings)} jobs)"
+
+class AdvisoryLock(models.Model):
+    """A lease row that serializes work across processes (see locks.py)."""
+    key = models.CharField(max_length=255, unique=True)
+    token = models.CharField(max_length=32)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.key} (until {self.expires_at})"
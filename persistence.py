@@ -0,0 +1,179 @@
+import atexit
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+from .embeddings import get_vector_index, vector_from_bytes
+from .models import ResumeAnalysis, normalize_role_key
+
+logger = logging.getLogger(__name__)
+
+RESUME_UPLOAD_DIR = "resumes"
+
+def _read_bytes(resume_file):
+    if hasattr(resume_file, 'seek'):
+        resume_file.seek(0)
+    data = b"".join(resume_file.chunks()) if hasattr(resume_file, 'chunks') else resume_file.read()
+    if hasattr(resume_file, 'seek'):
+        resume_file.seek(0)
+    return data
+
+def prepare_resume_file(resume_file):
+    """
+    Returns (storage name, bytes to write or None). Names are derived from a
+    SHA-256 of the content, so the same PDF uploaded twice is stored once.
+    Files that already live in storage (e.g. an AnalysisJob upload) are
+    referenced as they are.
+    """
+    if isinstance(resume_file, FieldFile) and resume_file.name and resume_file._committed:
+        return resume_file.name, None
+    data = _read_bytes(resume_file)
+    extension = os.path.splitext(getattr(resume_file, 'name', '') or '')[1].lower() or ".pdf"
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{RESUME_UPLOAD_DIR}/{digest[:2]}/{digest}{extension}", data
+
+def _store_file(name, data):
+    """
+    Writes `data` under its content address and returns the name it is
+    stored under. If another worker is creating the same file at that
+    moment, save() picks a suffixed name; that copy is kept and returned,
+    since the other write may not have finished yet.
+    """
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, ContentFile(data))
+
+def build_analysis(resume_file, **fields):
+    """
+    An unsaved ResumeAnalysis with its content-addressed file name set, plus
+    the file bytes still to be written. Its public_id and created_at are
+    final, so the response can be built before the row exists.
+    """
+    name, data = prepare_resume_file(resume_file)
+    analysis = ResumeAnalysis(**fields)
+    # bulk_create skips save(), which would otherwise set the key
+    analysis.role_key = normalize_role_key(analysis.target_role)
+    analysis.resume_file.name = name
+    analysis.created_at = timezone.now()
+    return analysis, data
+
+class AnalysisWriter:
+    """
+    Write-behind buffer for analyses: a background thread writes files and
+    inserts rows with bulk_create once `batch_size` are queued or every
+    `interval` seconds, so requests never wait on disk or SQLite. The buffer
+    is in memory only: a crash or kill loses whatever was not flushed yet,
+    which is why write-behind is opt-in (ANALYSIS_WRITE_BEHIND).
+    """
+
+    def __init__(self, batch_size=50, interval=0.5):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.Queue()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def submit(self, analysis, file_data=None):
+        self._queue.put((analysis, file_data))
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._thread_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="analysis-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Analysis write-behind flush failed: {e}")
+            finally:
+                close_old_connections()
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        """Writes everything queued so far. Safe to call from any thread."""
+        with self._flush_lock:
+            while batch := self._drain():
+                self.write(batch)
+
+    def write(self, batch):
+        for analysis, file_data in batch:
+            if file_data is not None:
+                try:
+                    analysis.resume_file.name = _store_file(analysis.resume_file.name, file_data)
+                except Exception as e:
+                    logger.error(f"Failed to store resume file {analysis.resume_file.name}: {e}")
+
+        analyses = [analysis for analysis, _ in batch]
+        try:
+            ResumeAnalysis.objects.bulk_create(analyses, batch_size=self.batch_size)
+        except Exception as e:
+            # One bad row must not take the rest of the batch with it
+            logger.error(f"Bulk insert of {len(analyses)} analyses failed, retrying one by one: {e}")
+            for analysis in analyses:
+                try:
+                    analysis.save(force_insert=True)
+                except Exception as row_error:
+                    logger.error(f"Failed to persist analysis {analysis.public_id}: {row_error}")
+                    analysis.pk = None
+
+        index = get_vector_index()
+        for analysis in analyses:
+            vector = vector_from_bytes(analysis.resume_vector)
+            # Backends without RETURNING leave pk unset; the index's periodic
+            # refresh picks those rows up instead
+            if analysis.pk is not None and vector is not None:
+                index.add(analysis.pk, analysis.target_role, vector)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_analysis_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AnalysisWriter(
+                    batch_size=getattr(settings, 'ANALYSIS_WRITE_BATCH_SIZE', 50),
+                    interval=getattr(settings, 'ANALYSIS_WRITE_INTERVAL', 0.5)
+                )
+                # Don't lose the buffer on a clean shutdown
+                atexit.register(_writer.flush)
+    return _writer
+
+def save_analysis(analysis, file_data=None):
+    """
+    Writes the analysis and its file now, or queues them if write-behind is
+    enabled. Build the response afterwards: the stored file name can differ
+    from the content address after a concurrent identical upload.
+    """
+    writer = get_analysis_writer()
+    if getattr(settings, 'ANALYSIS_WRITE_BEHIND', False):
+        writer.submit(analysis, file_data)
+    else:
+        writer.write([(analysis, file_data)])
+
+def flush_pending_analyses():
+    get_analysis_writer().flush()
@@ -0,0 +1,188 @@
+import asyncio
+import contextvars
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.db import close_old_connections
+from .metrics import PIPELINE_STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Set while a stage runs to the event its pipeline run raises on failure
+_run_cancelled = contextvars.ContextVar("pipeline_run_cancelled", default=None)
+
+class PipelineCancelled(Exception):
+    pass
+
+def check_cancelled():
+    """
+    Raises PipelineCancelled if the pipeline run the caller belongs to has
+    already failed. Call it before external requests: a stage that is
+    already running can't be stopped, but it can stop spending quota.
+    """
+    cancelled = _run_cancelled.get()
+    if cancelled is not None and cancelled.is_set():
+        raise PipelineCancelled("Pipeline run failed; skipping further external calls")
+
+def stage_timings_enabled():
+    # Internal instrumentation; /metrics has the same numbers in aggregate
+    return getattr(settings, 'EXPOSE_STAGE_TIMINGS', False)
+
+def get_stage_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                max_workers = getattr(settings, 'PIPELINE_MAX_WORKERS', 16)
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline-stage")
+    return _executor
+
+class Stage:
+    def __init__(self, name, func, depends_on=(), required=True):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.required = required
+
+class PipelineRun:
+    def __init__(self, results, timings, total_ms):
+        self.results = results
+        self.timings = timings
+        self.total_ms = total_ms
+
+    def stage_timings(self):
+        return {**self.timings, "total": self.total_ms}
+
+class StagePipeline:
+    """
+    Runs a dependency graph of stages, starting every stage as soon as the
+    stages it depends on have finished. Each stage function is called with
+    the results of its dependencies as keyword arguments.
+    """
+
+    def __init__(self, name="pipeline"):
+        self.name = name
+        self.stages = {}
+
+    def add_stage(self, name, func, depends_on=(), required=True):
+        if name in self.stages:
+            raise ValueError(f"Duplicate pipeline stage: {name}")
+        for dep in depends_on:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = Stage(name, func, depends_on, required)
+        return self
+
+    def run(self, on_stage_complete=None):
+        executor = get_stage_executor()
+        started = time.perf_counter()
+        results = {}
+        timings = {}
+        pending = dict(self.stages)
+        running = {}
+        cancelled = threading.Event()
+
+        try:
+            while pending or running:
+                for stage in [s for s in pending.values() if all(d in results for d in s.depends_on)]:
+                    kwargs = {dep: results[dep] for dep in stage.depends_on}
+                    running[executor.submit(_execute_stage, stage, kwargs, cancelled)] = stage
+                    del pending[stage.name]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        value, elapsed_ms = future.result()
+                    except Exception as e:
+                        if stage.required:
+                            raise
+                        logger.error(f"Optional stage '{stage.name}' failed: {e}")
+                        value, elapsed_ms = None, None
+                    results[stage.name] = value
+                    timings[stage.name] = elapsed_ms
+                    if on_stage_complete:
+                        on_stage_complete(stage.name, value, elapsed_ms)
+        except BaseException:
+            # Queued stages never start; running ones see check_cancelled()
+            cancelled.set()
+            raise
+        finally:
+            for future in running:
+                future.cancel()
+
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"{self.name} finished in {total_ms}ms: {timings}")
+        return PipelineRun(results, timings, total_ms)
+
+    async def arun(self, on_stage_complete=None):
+        """
+        asyncio counterpart of run(): every stage becomes a task that awaits
+        its dependencies. Stage functions may be sync or async.
+        """
+        started = time.perf_counter()
+        results = {}
+        timings = {}
+        tasks = {}
+        cancelled = threading.Event()
+
+        async def execute(stage):
+            # Each task runs in its own copy of the context; sync_to_async
+            # carries it into worker threads
+            _run_cancelled.set(cancelled)
+            values = await asyncio.gather(*(tasks[dep] for dep in stage.depends_on))
+            stage_started = time.perf_counter()
+            try:
+                value = stage.func(**dict(zip(stage.depends_on, values)))
+                if inspect.isawaitable(value):
+                    value = await value
+                elapsed_ms = round((time.perf_counter() - stage_started) * 1000, 1)
+                PIPELINE_STAGE_SECONDS.observe(elapsed_ms / 1000, stage=stage.name, outcome="ok")
+            except Exception as e:
+                PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - stage_started, stage=stage.name, outcome="error")
+                if stage.required:
+                    raise
+                logger.error(f"Optional stage '{stage.name}' failed: {e}")
+                value, elapsed_ms = None, None
+            results[stage.name] = value
+            timings[stage.name] = elapsed_ms
+            if on_stage_complete:
+                on_stage_complete(stage.name, value, elapsed_ms)
+            return value
+
+        # Stages are registered after their dependencies, so insertion order
+        # guarantees every dependency task exists before its dependants.
+        for stage in self.stages.values():
+            tasks[stage.name] = asyncio.ensure_future(execute(stage))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            cancelled.set()
+            raise
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"{self.name} finished in {total_ms}ms: {timings}")
+        return PipelineRun(results, timings, total_ms)
+
+def _execute_stage(stage, kwargs, cancelled):
+    started = time.perf_counter()
+    outcome = "error"
+    token = _run_cancelled.set(cancelled)
+    try:
+        value = stage.func(**kwargs)
+        outcome = "ok"
+    finally:
+        _run_cancelled.reset(token)
+        PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage.name, outcome=outcome)
+        # Stage threads are pooled, so release any DB connection they opened
+        close_old_connections()
+    return value, round((time.perf_counter() - started) * 1000, 1)
@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, Max
+from django.utils import timezone
+from .models import ResumeAnalysis, RoleMarketBenchmark, RoleSkill, normalize_role_key
+from .scoring import BENCHMARK_MAX_AGE, refresh_market_benchmark, get_market_benchmark, get_or_create_role_profile
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """Spaces out task starts so at most `per_minute` begin in any minute."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def get_top_requested_roles(limit, since_days=30):
+    since = timezone.now() - timezone.timedelta(days=since_days)
+    # Grouped on the normalized key, so spelling variants count as one role
+    rows = (
+        ResumeAnalysis.objects.filter(created_at__gte=since)
+        .values('role_key')
+        .annotate(total=Count('id'), name=Max('target_role'))
+        .order_by('-total')[:limit]
+    )
+    counts = Counter()
+    names = {}
+    for row in rows:
+        counts[row['role_key']] += row['total']
+        names[row['role_key']] = row['name'].strip().title()
+    for role in getattr(settings, 'PREWARM_SEED_ROLES', []):
+        counts.setdefault(normalize_role_key(role), 0)
+        names.setdefault(normalize_role_key(role), role.strip().title())
+    return [names[key] for key, _ in counts.most_common(limit)]
+
+def get_roles_due(roles, lead_time):
+    """
+    A role is due when its benchmark is missing or will expire within
+    `lead_time`, or when its skill profile has not been generated yet.
+    """
+    refresh_before = timezone.now() - (BENCHMARK_MAX_AGE - lead_time)
+    keys = {role: normalize_role_key(role) for role in roles}
+    benchmarks = {b.role_key: b for b in RoleMarketBenchmark.objects.filter(role_key__in=keys.values())}
+    profiles = {p.role_key: p for p in RoleSkill.objects.filter(role_key__in=keys.values())}
+    due = []
+    for role in roles:
+        benchmark = benchmarks.get(keys[role])
+        profile = profiles.get(keys[role])
+        benchmark_due = benchmark is None or benchmark.updated_at <= refresh_before
+        profile_due = profile is None or not profile.is_locked or not profile.required_skills
+        if benchmark_due or profile_due:
+            due.append((role, benchmark_due, profile_due))
+    return due
+
+def prewarm_role(role, benchmark_due, profile_due):
+    try:
+        refreshed = True
+        if benchmark_due:
+            if RoleMarketBenchmark.objects.filter(role_key=normalize_role_key(role)).exists():
+                # None here also covers a refresh already running elsewhere
+                refreshed = refresh_market_benchmark(role) is not None
+            else:
+                refreshed = get_market_benchmark(role) is not None
+        if profile_due:
+            refreshed = bool(get_or_create_role_profile(role).required_skills) and refreshed
+        return refreshed
+    except Exception as e:
+        logger.error(f"Pre-warming failed for {role}: {e}")
+        return False
+    finally:
+        close_old_connections()
+
+def prewarm_roles(roles=None, top_n=None, lead_time=None, concurrency=None, per_minute=None):
+    top_n = top_n or getattr(settings, 'PREWARM_TOP_N', 20)
+    lead_time = lead_time or timezone.timedelta(hours=getattr(settings, 'PREWARM_LEAD_HOURS', 24))
+    concurrency = concurrency or getattr(settings, 'PREWARM_CONCURRENCY', 2)
+    per_minute = per_minute if per_minute is not None else getattr(settings, 'PREWARM_RATE_PER_MINUTE', 10)
+
+    roles = [r.strip().title() for r in roles] if roles else get_top_requested_roles(top_n)
+    due = get_roles_due(roles, lead_time)
+    if not due:
+        return {"checked": len(roles), "refreshed": 0, "failed": 0}
+
+    limiter = RateLimiter(per_minute)
+
+    def run(task):
+        limiter.wait()
+        return prewarm_role(*task)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="prewarm") as executor:
+        outcomes = list(executor.map(run, due))
+
+    summary = {"checked": len(roles), "refreshed": outcomes.count(True), "failed": outcomes.count(False)}
+    logger.info(f"Pre-warm pass finished: {summary}")
+    return summary
+
+def run_scheduler(interval, stop_event=None, **options):
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        try:
+            prewarm_roles(**options)
+        except Exception as e:
+            logger.error(f"Pre-warm pass failed: {e}")
+        stop_event.wait(interval)
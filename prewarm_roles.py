@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from resume.prewarm import prewarm_roles, run_scheduler
+
+
+class Command(BaseCommand):
+    help = "Refreshes market benchmarks and role profiles for the most requested roles before they expire."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--roles', nargs='*', help="Explicit roles to warm instead of the most requested ones")
+        parser.add_argument('--top', type=int, default=None, help="Number of most requested roles to consider")
+        parser.add_argument('--lead-hours', type=int, default=None, help="Refresh benchmarks expiring within this many hours")
+        parser.add_argument('--concurrency', type=int, default=None, help="Maximum concurrent generations")
+        parser.add_argument('--rate', type=int, default=None, help="Maximum generations started per minute")
+        parser.add_argument('--loop', action='store_true', help="Keep running, one pass every --interval seconds")
+        parser.add_argument('--interval', type=int, default=3600, help="Seconds between passes with --loop")
+
+    def handle(self, *args, **options):
+        prewarm_options = {
+            "roles": options['roles'],
+            "top_n": options['top'],
+            "lead_time": timezone.timedelta(hours=options['lead_hours']) if options['lead_hours'] else None,
+            "concurrency": options['concurrency'],
+            "per_minute": options['rate'],
+        }
+        if options['loop']:
+            self.stdout.write(f"Pre-warming every {options['interval']}s")
+            run_scheduler(options['interval'], **prewarm_options)
+            return
+
+        summary = prewarm_roles(**prewarm_options)
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {summary['checked']} roles, refreshed {summary['refreshed']}, failed {summary['failed']}"
+        ))
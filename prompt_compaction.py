@@ -0,0 +1,149 @@
+import math
+import re
+from collections import Counter
+from django.conf import settings
+
+# Rough chars-per-token ratio for English prose with Gemini/GPT tokenizers;
+# good enough for budgeting without shipping a tokenizer.
+CHARS_PER_TOKEN = 4
+
+SECTION_HEADINGS = {
+    "summary": ["summary", "professional summary", "profile", "objective", "career objective", "about me"],
+    "skills": ["skills", "technical skills", "key skills", "core competencies", "technologies", "tools", "tech stack"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "employment history", "work history", "internships", "internship"],
+    "projects": ["projects", "academic projects", "personal projects", "key projects"],
+    "certifications": ["certifications", "certificates", "licenses", "courses"],
+    "education": ["education", "academic background", "qualifications", "academics"],
+    "achievements": ["achievements", "awards", "honors", "accomplishments", "publications"],
+    "other": ["interests", "hobbies", "languages", "references", "declaration", "personal details", "extracurricular activities"],
+}
+
+# Lower number = kept first when the budget is tight. "other" (hobbies,
+# references, declarations...) never informs a fit decision and is dropped.
+SECTION_PRIORITY = {
+    "skills": 1, "experience": 2, "projects": 3, "summary": 4,
+    "certifications": 5, "education": 6, "achievements": 7, "header": 8,
+}
+
+_heading_index = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+")
+_PHONE = re.compile(r"\+?\d[\d\s().-]{8,}\d")
+_URL = re.compile(r"(https?://\S+|www\.\S+|linkedin\.com\S*|github\.com\S*)", re.IGNORECASE)
+_PAGE_NUMBER = re.compile(r"^\s*(page\s*)?\d+\s*((of|/)\s*\d+)?\s*$", re.IGNORECASE)
+_ADDRESS = re.compile(
+    r"\b(street|road|avenue|lane|nagar|colony|sector|apartment|flat no|pin\s*code|pincode)\b|,\s*\d{6}\b",
+    re.IGNORECASE
+)
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+def _strip_phone(text):
+    # Only digit runs long enough to be phone numbers, not "2019 - 2021"
+    return _PHONE.sub(lambda m: "" if sum(c.isdigit() for c in m.group()) >= 10 else m.group(), text)
+
+def _is_boilerplate(line, repeated):
+    stripped = line.strip()
+    if not stripped or _PAGE_NUMBER.match(stripped) or stripped in repeated:
+        return True
+    # Contact lines carry nothing the fit evaluation can use
+    without_contact = _URL.sub("", _EMAIL.sub("", _strip_phone(stripped)))
+    return len(without_contact.strip(" |,;:-•·")) < 3
+
+def _is_address(line):
+    return len(line) < 120 and bool(_ADDRESS.search(line))
+
+def _running_lines(pages):
+    # Lines at the top or bottom of most pages are headers/footers; a job
+    # title repeated mid-page is not.
+    if len(pages) < 2:
+        return set()
+    counts = Counter()
+    for page in pages:
+        lines = [line.strip() for line in page.splitlines() if line.strip()]
+        if len(lines) > 6:
+            counts.update(line for line in set(lines[:2] + lines[-2:]) if not _heading_for(line))
+    return {line for line, count in counts.items() if count >= max(2, len(pages) // 2 + 1)}
+
+def strip_boilerplate(text):
+    """
+    Drops page numbers, contact lines and running headers/footers. Pages are
+    expected to be separated by form feeds, as pdf_parser produces them.
+    """
+    pages = text.split("\f")
+    repeated = _running_lines(pages)
+    return [line.rstrip() for page in pages for line in page.splitlines() if not _is_boilerplate(line, repeated)]
+
+def _heading_for(line):
+    # Either a heading on its own line or an inline "Skills: Python, SQL"
+    candidate = line.strip().split(":", 1)[0].strip().lower()
+    if len(candidate.split()) > 4:
+        return None
+    return _heading_index.get(candidate)
+
+def detect_sections(lines):
+    """
+    Splits resume lines into [(section, lines)] in document order. Text
+    before the first recognised heading is the "header" section.
+    """
+    sections = [("header", [])]
+    for line in lines:
+        section = _heading_for(line)
+        if section:
+            sections.append((section, [line.strip()]))
+        else:
+            sections[-1][1].append(line.strip())
+    # Addresses are only looked for above the first heading, where contact
+    # blocks live; elsewhere "public sector" is content, not an address.
+    sections[0] = ("header", [line for line in sections[0][1] if not _is_address(line)])
+    return [(name, body) for name, body in sections if body]
+
+def compact_resume(text, max_tokens):
+    """
+    Fits the most relevant resume sections into `max_tokens`, keeping them in
+    document order. Returns the compacted text with token accounting.
+    """
+    original_tokens = estimate_tokens(text)
+    sections = detect_sections(strip_boilerplate(text))
+
+    budget = max_tokens
+    kept = {}
+    truncated = []
+    ranked = sorted(
+        (i for i in range(len(sections)) if sections[i][0] in SECTION_PRIORITY),
+        key=lambda i: SECTION_PRIORITY[sections[i][0]]
+    )
+    for i in ranked:
+        name, body = sections[i]
+        chosen = []
+        for line in body:
+            cost = estimate_tokens(line) + 1
+            if cost > budget:
+                break
+            chosen.append(line)
+            budget -= cost
+        if chosen:
+            kept[i] = chosen
+        if len(chosen) < len(body):
+            truncated.append(name)
+
+    compacted = "\n".join(line for i in sorted(kept) for line in kept[i])
+    if not compacted:
+        # Nothing recognisable survived; fall back to a plain prefix
+        compacted = text.strip()[:max_tokens * CHARS_PER_TOKEN]
+    compacted_tokens = estimate_tokens(compacted)
+    return {
+        "text": compacted,
+        "original_tokens": original_tokens,
+        "compacted_tokens": compacted_tokens,
+        "tokens_saved": max(original_tokens - compacted_tokens, 0),
+        "sections": list(dict.fromkeys(sections[i][0] for i in sorted(kept))),
+        "truncated_sections": list(dict.fromkeys(truncated))
+    }
+
+def compact_for_fit(text):
+    return compact_resume(text, getattr(settings, 'PROMPT_BUDGET_FIT_TOKENS', 1500))
+
+def compact_for_growth(text):
+    return compact_resume(text, getattr(settings, 'PROMPT_BUDGET_GROWTH_TOKENS', 400))
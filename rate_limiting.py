@@ -0,0 +1,87 @@
+import hashlib
+import math
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from .metrics import RATE_LIMITED_REQUESTS
+
+def _acquire_bucket_lock(lock_key, token, wait=0.05):
+    # Short mutex in the cache so two requests can't both spend the last token
+    deadline = time.monotonic() + wait
+    while not cache.add(lock_key, token, 1):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.002)
+    return True
+
+def consume_token(key, rate, burst, cost=1, lock_wait=0.05):
+    """
+    Token bucket in the default cache: holds up to `burst` tokens and refills
+    at `rate` tokens per second. Returns (allowed, retry_after_seconds).
+    Buckets are per process unless the cache is shared (REDIS_URL).
+    If the bucket's lock can't be taken within `lock_wait` seconds the
+    request is let through rather than stalled; a rate limiter must not
+    become the bottleneck. Pass lock_wait=0 from an event loop.
+    """
+    bucket_key = f"token_bucket_{key}"
+    lock_key = f"{bucket_key}_lock"
+    token = uuid.uuid4().hex
+    locked = _acquire_bucket_lock(lock_key, token, lock_wait)
+    try:
+        now = time.time()
+        tokens, updated_at = cache.get(bucket_key) or (burst, now)
+        tokens = min(burst, tokens + max(now - updated_at, 0) * rate)
+        if tokens >= cost:
+            tokens -= cost
+            allowed, retry_after = True, 0.0
+        else:
+            allowed, retry_after = False, (cost - tokens) / rate
+        # An idle bucket is full again after burst / rate seconds
+        cache.set(bucket_key, (tokens, now), math.ceil(burst / rate) + 1)
+        return allowed, retry_after
+    finally:
+        if locked and cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+def _api_key(request):
+    key = request.headers.get('X-API-Key', '').strip()
+    # Unknown keys get the anonymous per-IP limit, so rotating made-up keys
+    # can't be used to dodge it
+    return key if key and key in getattr(settings, 'RATE_LIMIT_API_KEYS', []) else None
+
+def _client_identity(request):
+    api_key = _api_key(request)
+    if api_key:
+        return "api_key", f"key_{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]}"
+    return "ip", f"ip_{request.META.get('REMOTE_ADDR')}"
+
+def client_bucket(request, scope="analysis"):
+    """Returns (metric scope, bucket key, rate, burst) for the caller."""
+    kind, identity = _client_identity(request)
+    if scope == "jobs":
+        # Cheap local reads, so a separate and roomier bucket than analyses
+        return (
+            "jobs", f"jobs_{identity}",
+            getattr(settings, 'RATE_LIMIT_JOBS_RATE', 1.0), getattr(settings, 'RATE_LIMIT_JOBS_BURST', 10)
+        )
+    if kind == "api_key":
+        return (
+            "api_key", identity,
+            getattr(settings, 'RATE_LIMIT_API_KEY_RATE', 2.0), getattr(settings, 'RATE_LIMIT_API_KEY_BURST', 20)
+        )
+    return (
+        "ip", identity,
+        getattr(settings, 'RATE_LIMIT_RATE', 0.2), getattr(settings, 'RATE_LIMIT_BURST', 3)
+    )
+
+def check_rate_limit(request, cost=1, scope="analysis"):
+    """Returns None if the request may proceed, else seconds until it may retry."""
+    if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+        return None
+    metric_scope, key, rate, burst = client_bucket(request, scope)
+    allowed, retry_after = consume_token(key, rate, burst, cost)
+    if allowed:
+        return None
+    RATE_LIMITED_REQUESTS.inc(scope=metric_scope)
+    return retry_after
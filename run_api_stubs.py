@@ -0,0 +1,41 @@
+import json
+from django.core.management.base import BaseCommand
+from resume.api_stubs import StubConfig, start_stub_server
+
+
+class Command(BaseCommand):
+    help = "Runs local stand-ins for the Gemini generateContent and Adzuna search APIs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default="127.0.0.1")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--gemini-latency', default="lognormal:0.8,0.4", help="fixed:S, uniform:A,B, normal:MEAN,SD or lognormal:MEDIAN,SIGMA")
+        parser.add_argument('--adzuna-latency', default="lognormal:0.3,0.5", help="Same format as --gemini-latency")
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Fraction of calls answered with 429")
+        parser.add_argument('--server-error-rate', type=float, default=0.0, help="Fraction of calls answered with 500/503")
+        parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with injected 429s")
+        parser.add_argument('--fixtures', help="JSON file overriding canned answers (keys: fit, growth, dashboard, role_profile, benchmark)")
+
+    def handle(self, *args, **options):
+        fixtures = None
+        if options['fixtures']:
+            with open(options['fixtures']) as f:
+                fixtures = json.load(f)
+        config = StubConfig(
+            gemini_latency=options['gemini_latency'],
+            adzuna_latency=options['adzuna_latency'],
+            rate_limit_rate=options['rate_limit_rate'],
+            server_error_rate=options['server_error_rate'],
+            retry_after=options['retry_after'],
+            fixtures=fixtures
+        )
+        server = start_stub_server(options['host'], options['port'], config, background=False)
+        base = f"http://{options['host']}:{options['port']}"
+        self.stdout.write(self.style.SUCCESS(f"API stubs listening on {base}"))
+        self.stdout.write(f"  GEMINI_API_BASE={base}/v1beta ADZUNA_API_BASE={base}/adzuna (call counts at {base}/__stats)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
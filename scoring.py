@@ -1,31 +1,247 @@
-import json
 import logging
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from .models import RoleSkill, RoleMarketBenchmark
+from .gemini_client import get_gemini_client
+from .caching import LRUCache
+from .locks import acquire_advisory_lock, advisory_lock_held, release_advisory_lock
+from .models import RoleSkill, RoleMarketBenchmark, normalize_role_key
+from .skill_extractor import invalidate_skill_matcher, skill_key
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
+BENCHMARK_MAX_AGE = timezone.timedelta(days=7)
+
+_role_data_cache = LRUCache(
+    max_entries=getattr(settings, 'ROLE_CACHE_MAX_ENTRIES', 512),
+    ttl=getattr(settings, 'ROLE_CACHE_TTL', 60 * 60)
+)
+
+def _role_version_key(kind, role_name_clean):
+    return f"role_data_version_{kind}_{role_name_clean.lower().replace(' ', '_')}"
+
+def get_role_data_version(kind, role_name_clean):
+    return cache.get(_role_version_key(kind, role_name_clean), 0)
+
+def bump_role_data_version(kind, role_name_clean):
+    """
+    Invalidates the in-process role data of every worker: L1 entries carry
+    the version stamp they were loaded under and are dropped on mismatch.
+    """
+    key = _role_version_key(kind, role_name_clean)
+    cache.add(key, 0, None)
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        version = 1
+        cache.set(key, version, None)
+    _role_data_cache.delete((kind, role_name_clean))
+    # New or changed skills must reach the local extractor's vocabulary
+    invalidate_skill_matcher()
+    return version
+
+def _get_cached_role_data(kind, role_name_clean):
+    entry = _role_data_cache.get((kind, role_name_clean))
+    if entry is None or entry["stamp"] != get_role_data_version(kind, role_name_clean):
+        return None
+    return entry
+
+def _set_cached_role_data(kind, role_name_clean, data, refreshed_at=None):
+    _role_data_cache.set((kind, role_name_clean), {
+        "data": data,
+        "refreshed_at": refreshed_at,
+        "stamp": get_role_data_version(kind, role_name_clean)
+    })
+
+def _serialize_benchmark(benchmark):
+    return {
+        "core_skills": benchmark.core_skills,
+        "advanced_skills": benchmark.advanced_skills,
+        "experience_expectation": benchmark.experience_expectation,
+        "project_expectation": benchmark.project_expectation,
+        "version": benchmark.version
+    }
+
+def _is_fresh(benchmark, now=None):
+    # updated_at, not created_at: a regenerated benchmark must count as fresh
+    return benchmark.updated_at > (now or timezone.now()) - BENCHMARK_MAX_AGE
+
+def _load_fresh_benchmark(role_name_clean):
+    entry = _get_cached_role_data("benchmark", role_name_clean)
+    if entry and entry["refreshed_at"] > timezone.now() - BENCHMARK_MAX_AGE:
+        return dict(entry["data"]), None
+
+    benchmark = RoleMarketBenchmark.objects.filter(role_key=normalize_role_key(role_name_clean)).first()
+    if benchmark and _is_fresh(benchmark):
+        data = _serialize_benchmark(benchmark)
+        _set_cached_role_data("benchmark", role_name_clean, data, benchmark.updated_at)
+        return dict(data), benchmark
+    return None, benchmark
+
 def get_market_benchmark(role_name):
+    """
+    Returns the role's benchmark, regenerating it at most once at a time per
+    role. While a stale row is being refreshed, callers get the stale value
+    (stale-while-revalidate); with no row at all they wait for the single
+    in-flight generation instead of starting their own, and get None if it
+    fails or outruns the wait. Only the lock holder ever calls Gemini.
+    """
     role_name_clean = role_name.strip().title()
-    benchmark = RoleMarketBenchmark.objects.filter(role=role_name_clean).first()
-    
-    one_week_ago = timezone.now() - timezone.timedelta(days=7)
-    
-    if benchmark and benchmark.created_at > one_week_ago:
-        return {
-            "core_skills": benchmark.core_skills,
-            "advanced_skills": benchmark.advanced_skills,
-            "experience_expectation": benchmark.experience_expectation,
-            "project_expectation": benchmark.project_expectation,
-            "version": benchmark.version
-        }
-    
-    api_key = getattr(settings, 'GEMINI_API_KEY', None)
-    # Using Gemini 2.5 Flash as requested
-    api_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
-    
+    data, benchmark = _load_fresh_benchmark(role_name_clean)
+    if data:
+        return data
+
+    if benchmark:
+        token = _acquire_refresh_lock(role_name_clean)
+        if token:
+            _refresh_executor().submit(_refresh_in_background, role_name_clean, token)
+        return _serialize_benchmark(benchmark)
+
+    token = _acquire_refresh_lock(role_name_clean)
+    if not token:
+        data, timed_out = _wait_for_benchmark(role_name_clean)
+        if data:
+            return data
+        if timed_out:
+            logger.warning(f"Timed out waiting for benchmark generation of {role_name_clean}")
+            return None
+        # The holder failed without writing a row; one waiter takes over
+        token = _acquire_refresh_lock(role_name_clean)
+        if not token:
+            logger.warning(f"Benchmark generation of {role_name_clean} failed and is being retried elsewhere")
+            return None
+    try:
+        return _regenerate_market_benchmark(role_name_clean)
+    finally:
+        _release_refresh_lock(role_name_clean, token)
+
+class RoleNotPrepared(ValueError):
+    """The role has no stored benchmark, and the caller must not generate one."""
+
+def get_stored_market_benchmark(role_name):
+    """
+    Fast-mode lookup: the role's benchmark from the L1 or the database,
+    stale or not, without ever calling Gemini. Raises RoleNotPrepared if
+    the role has never been benchmarked.
+    """
+    role_name_clean = role_name.strip().title()
+    entry = _get_cached_role_data("benchmark", role_name_clean)
+    if entry:
+        return dict(entry["data"])
+    benchmark = RoleMarketBenchmark.objects.filter(role_key=normalize_role_key(role_name_clean)).first()
+    if benchmark is None:
+        raise RoleNotPrepared(
+            f"Role '{role_name_clean}' is not prepared for fast mode yet; analyze it once with fit_mode=llm"
+        )
+    data = _serialize_benchmark(benchmark)
+    _set_cached_role_data("benchmark", role_name_clean, data, benchmark.updated_at)
+    return dict(data)
+
+def get_stored_role_profile(role_name):
+    """Fast-mode lookup of a locked role profile; None rather than generating one."""
+    role_name_clean = role_name.strip().title()
+    entry = _get_cached_role_data("profile", role_name_clean)
+    if entry:
+        return entry["data"]
+    profile = RoleSkill.objects.filter(role_key=normalize_role_key(role_name_clean), is_locked=True).first()
+    if profile is None or not profile.required_skills:
+        return None
+    _set_cached_role_data("profile", role_name_clean, profile, profile.updated_at)
+    return profile
+
+async def aget_market_benchmark(role_name):
+    """
+    Async read path for get_market_benchmark. Regeneration (with its lock,
+    waiting and stale-while-revalidate) stays on the sync path in a thread.
+    """
+    role_name_clean = role_name.strip().title()
+    entry = _get_cached_role_data("benchmark", role_name_clean)
+    if entry and entry["refreshed_at"] > timezone.now() - BENCHMARK_MAX_AGE:
+        return dict(entry["data"])
+
+    benchmark = await RoleMarketBenchmark.objects.filter(role_key=normalize_role_key(role_name_clean)).afirst()
+    if benchmark and _is_fresh(benchmark):
+        data = _serialize_benchmark(benchmark)
+        _set_cached_role_data("benchmark", role_name_clean, data, benchmark.updated_at)
+        return dict(data)
+
+    return await sync_to_async(get_market_benchmark, thread_sensitive=False)(role_name)
+
+def _refresh_lock_key(role_name_clean):
+    return f"benchmark_refresh_{normalize_role_key(role_name_clean)}"
+
+def _worst_case_generation_seconds():
+    return get_gemini_client().worst_case_seconds()
+
+def _acquire_refresh_lock(role_name_clean):
+    # The lease must outlive the holder's Gemini call, or a second holder starts
+    ttl = max(getattr(settings, 'BENCHMARK_LOCK_TIMEOUT', 120), _worst_case_generation_seconds() + 30)
+    return acquire_advisory_lock(_refresh_lock_key(role_name_clean), ttl)
+
+def _release_refresh_lock(role_name_clean, token):
+    release_advisory_lock(_refresh_lock_key(role_name_clean), token)
+
+def _wait_for_benchmark(role_name_clean):
+    """
+    Waits for the lock holder's result. Returns (data, timed_out); data is
+    None with timed_out False when the holder finished without a benchmark.
+    """
+    wait = max(getattr(settings, 'BENCHMARK_WAIT_TIMEOUT', 45), _worst_case_generation_seconds())
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(0.25)
+        data, _ = _load_fresh_benchmark(role_name_clean)
+        if data:
+            return data, False
+        if not advisory_lock_held(_refresh_lock_key(role_name_clean)):
+            # The holder finished (or failed); one last look at the row
+            data, _ = _load_fresh_benchmark(role_name_clean)
+            return data, False
+    return None, True
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _refresh_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="benchmark-refresh")
+    return _executor
+
+def _refresh_in_background(role_name_clean, token):
+    try:
+        _regenerate_market_benchmark(role_name_clean)
+    finally:
+        _release_refresh_lock(role_name_clean, token)
+        close_old_connections()
+
+def refresh_market_benchmark(role_name):
+    """
+    Regenerates a benchmark ahead of its expiry, honouring the same per-role
+    lock as the request path. Returns None if a refresh is already running.
+    """
+    role_name_clean = role_name.strip().title()
+    token = _acquire_refresh_lock(role_name_clean)
+    if not token:
+        return None
+    try:
+        return _regenerate_market_benchmark(role_name_clean, force=True)
+    finally:
+        _release_refresh_lock(role_name_clean, token)
+
+def _regenerate_market_benchmark(role_name_clean, force=False):
+    # Another worker may have refreshed the row between our read and the lock
+    data, _ = _load_fresh_benchmark(role_name_clean)
+    if data and not force:
+        return data
+
     prompt = f"""
     You are an AI Career Intelligence Engine. 
     Define the realistic required skill structure for the role: "{role_name_clean}"
@@ -41,42 +257,36 @@ def get_market_benchmark(role_name):
     """
     
     try:
-        response = requests.post(f"{api_url}?key={api_key}", json={"contents": [{"parts": [{"text": prompt}]}]}, timeout=30)
-        
-        if response.status_code != 200:
-            # Fallback to 1.5
-            api_url_alt = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
-            response = requests.post(f"{api_url_alt}?key={api_key}", json={"contents": [{"parts": [{"text": prompt}]}]}, timeout=30)
-            response.raise_for_status()
-            
-        data = response.json()
-        content = data['candidates'][0]['content']['parts'][0]['text'].strip()
+        result = get_gemini_client().generate_json(prompt)
         
-        start = content.find("{")
-        end = content.rfind("}")
-        result = json.loads(content[start:end+1])
-        
-        new_version = "v1.0"
-        if benchmark:
-            v_num = float(benchmark.version.replace('v', ''))
-            new_version = f"v{round(v_num + 0.1, 1)}"
-            benchmark.core_skills = result['core_skills']
-            benchmark.advanced_skills = result['advanced_skills']
-            benchmark.experience_expectation = result['experience_expectation']
-            benchmark.project_expectation = result['project_expectation']
-            benchmark.version = new_version
-            benchmark.save()
-        else:
-            RoleMarketBenchmark.objects.create(
-                role=role_name_clean,
-                core_skills=result['core_skills'],
-                advanced_skills=result['advanced_skills'],
-                experience_expectation=result['experience_expectation'],
-                project_expectation=result['project_expectation'],
-                version=new_version
-            )
-            
-        return result
+        with transaction.atomic():
+            benchmark = RoleMarketBenchmark.objects.select_for_update().filter(
+                role_key=normalize_role_key(role_name_clean)
+            ).first()
+            new_version = "v1.0"
+            if benchmark:
+                v_num = float(benchmark.version.replace('v', ''))
+                new_version = f"v{round(v_num + 0.1, 1)}"
+                benchmark.core_skills = result['core_skills']
+                benchmark.advanced_skills = result['advanced_skills']
+                benchmark.experience_expectation = result['experience_expectation']
+                benchmark.project_expectation = result['project_expectation']
+                benchmark.version = new_version
+                benchmark.save()
+            else:
+                benchmark = RoleMarketBenchmark.objects.create(
+                    role=role_name_clean,
+                    core_skills=result['core_skills'],
+                    advanced_skills=result['advanced_skills'],
+                    experience_expectation=result['experience_expectation'],
+                    project_expectation=result['project_expectation'],
+                    version=new_version
+                )
+
+        bump_role_data_version("benchmark", role_name_clean)
+        data = _serialize_benchmark(benchmark)
+        _set_cached_role_data("benchmark", role_name_clean, data, benchmark.updated_at)
+        return dict(data)
     except Exception as e:
         logger.error(f"Failed to generate market benchmark: {e}")
         return None
@@ -86,25 +296,13 @@ def generate_role_profile(role_name):
     if not api_key:
         raise ValueError("Gemini API key missing")
 
-    api_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
-    
     prompt = f"""
     Create a professional skill profile for the role: "{role_name}"
     Return ONLY a JSON object with a single key "skills" containing a list of exactly 10 most critical technical and soft skills.
     """
 
     try:
-        response = requests.post(f"{api_url}?key={api_key}", json={"contents": [{"parts": [{"text": prompt}]}]}, timeout=30)
-        if response.status_code != 200:
-            api_url_alt = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
-            response = requests.post(f"{api_url_alt}?key={api_key}", json={"contents": [{"parts": [{"text": prompt}]}]}, timeout=30)
-            response.raise_for_status()
-            
-        data = response.json()
-        content = data['candidates'][0]['content']['parts'][0]['text'].strip()
-        start = content.find("{")
-        end = content.rfind("}")
-        profile = json.loads(content[start:end+1])
+        profile = get_gemini_client().generate_json(prompt)
         return profile.get("skills", [])
     except Exception as e:
         logger.error(f"Profile generation failed: {e}")
@@ -112,7 +310,13 @@ def generate_role_profile(role_name):
 
 def get_or_create_role_profile(role_name):
     role_name_clean = role_name.strip().title()
-    profile, created = RoleSkill.objects.get_or_create(role_name=role_name_clean)
+    entry = _get_cached_role_data("profile", role_name_clean)
+    if entry:
+        return entry["data"]
+
+    profile, created = RoleSkill.objects.get_or_create(
+        role_key=normalize_role_key(role_name_clean), defaults={"role_name": role_name_clean}
+    )
     if created or not profile.is_locked or not profile.required_skills:
         skills = generate_role_profile(role_name_clean)
         if skills:
@@ -120,15 +324,19 @@ def get_or_create_role_profile(role_name):
             profile.is_locked = True
             profile.version += 1
             profile.save()
+            bump_role_data_version("profile", role_name_clean)
+    if profile.is_locked and profile.required_skills:
+        _set_cached_role_data("profile", role_name_clean, profile, profile.updated_at)
     return profile
 
 def calculate_deterministic_score(extracted_skills, role_profile):
-    required = set(s.lower() for s in role_profile.required_skills)
+    # Compared on alias-aware keys, so "JS" on a resume satisfies "JavaScript"
+    required = {skill_key(s): s for s in role_profile.required_skills}
     if not required: return 0.0, []
-    extracted = set(s.lower() for s in extracted_skills)
-    matched = required.intersection(extracted)
+    extracted = set(skill_key(s) for s in extracted_skills)
+    matched = [name for key, name in required.items() if key in extracted]
     percentage = (len(matched) / len(required)) * 100
-    return round(percentage, 2), list(matched)
+    return round(percentage, 2), matched
 
 def calculate_confidence_score(match_percentage):
     base = 0.90
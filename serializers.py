@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import ResumeAnalysis
 
@@ -6,8 +7,40 @@ class ResumeAnalysisSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ResumeAnalysis
-        fields = '__all__'
+        # Explicit, so new columns (e.g. vectors) never leak into responses
+        fields = [
+            'public_id', 'resume_file', 'target_role', 'extracted_skills', 'matched_skills', 'missing_skills',
+            'match_percentage', 'readiness_score', 'roadmap', 'confidence_score', 'role_profile_version',
+            'created_at', 'improvement_plan'
+        ]
 
 class ResumeUploadSerializer(serializers.Serializer):
     resume_file = serializers.FileField()
     target_role = serializers.CharField(max_length=255)
+    fit_mode = serializers.ChoiceField(choices=["llm", "prefilter", "fast"], required=False)
+
+class BatchUploadSerializer(serializers.Serializer):
+    resume_files = serializers.ListField(child=serializers.FileField(), required=False)
+    archive = serializers.FileField(required=False)
+    target_role = serializers.CharField(max_length=255)
+
+    def validate(self, data):
+        if not data.get('resume_files') and not data.get('archive'):
+            raise serializers.ValidationError("Upload resume_files or a zip archive")
+        return data
+
+class MultiRoleUploadSerializer(serializers.Serializer):
+    resume_file = serializers.FileField()
+    # The role limit is checked in validate_target_roles, at request time
+    target_roles = serializers.ListField(child=serializers.CharField(max_length=255), min_length=1)
+
+    def validate_target_roles(self, value):
+        # Accept a single comma-separated field as well as repeated fields
+        roles = [role.strip() for entry in value for role in entry.split(",") if role.strip()]
+        roles = list(dict.fromkeys(roles))
+        if not roles:
+            raise serializers.ValidationError("At least one target role is required")
+        max_roles = getattr(settings, 'MULTI_ROLE_MAX_ROLES', 6)
+        if len(roles) > max_roles:
+            raise serializers.ValidationError(f"At most {max_roles} target roles are allowed")
+        return roles
@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -22,6 +23,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'resume.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,13 +52,62 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'amd.wsgi.application'
 
+# SQLite profile applied to every new connection. WAL lets readers run
+# alongside the single writer; NORMAL sync is durable across app crashes
+# (only an OS crash can lose the last commits) and much cheaper than FULL.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "20"))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock up front so concurrent read-then-write
+            # transactions wait on the busy timeout instead of deadlocking
+            'transaction_mode': 'IMMEDIATE',
+            # Seconds a writer waits for the lock before "database is locked"
+            'timeout': SQLITE_BUSY_TIMEOUT,
+            'init_command': (
+                f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE};"
+                f"PRAGMA synchronous={SQLITE_SYNCHRONOUS};"
+                f"PRAGMA mmap_size={SQLITE_MMAP_SIZE};"
+                f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB};"
+                "PRAGMA temp_store=MEMORY;"
+            ),
+        },
+        # The in-memory default uses shared-cache table locks, which fail at
+        # once instead of waiting on the busy timeout; threaded tests need a
+        # file, kept out of the source tree
+        'TEST': {'NAME': os.path.join(tempfile.gettempdir(), 'resume_test_db.sqlite3')},
     }
 }
 
+# Rate-limit buckets, the Gemini QPS bucket and cooldowns, single-flight
+# locks and cached results all live in the default cache. Set REDIS_URL
+# (needs the redis package) to share it between worker processes. Without it
+# each process has its own LocMem cache, so those limits hold per process:
+# N workers allow N x GEMINI_MAX_QPS and N x each client's burst.
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            # LocMem's default of 300 entries would evict token buckets and locks
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv("LOCMEM_CACHE_MAX_ENTRIES", "10000"))},
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -91,3 +142,129 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_API_URL = os.getenv("GEMINI_API_URL")
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
 
+PIPELINE_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", "16"))
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "16"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_QUEUE_TIMEOUT = float(os.getenv("HTTP_QUEUE_TIMEOUT", "30"))
+
+GEMINI_MODELS = [m.strip() for m in os.getenv("GEMINI_MODELS", "gemini-2.5-flash,gemini-1.5-flash").split(",") if m.strip()]
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "3"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "8"))
+GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "3"))
+GEMINI_BREAKER_RESET_SECONDS = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "60"))
+
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PDF_CACHE_MAX_ENTRIES", "512"))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "4"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+
+STAGE_CACHE_L1_MAX_ENTRIES = int(os.getenv("STAGE_CACHE_L1_MAX_ENTRIES", "1024"))
+STAGE_CACHE_L1_TTL = int(os.getenv("STAGE_CACHE_L1_TTL", "300"))
+STAGE_CACHE_TTLS = {
+    "fit": int(os.getenv("STAGE_CACHE_TTL_FIT", str(60 * 60 * 24))),
+    "growth": int(os.getenv("STAGE_CACHE_TTL_GROWTH", str(60 * 60 * 24))),
+    "dashboard": int(os.getenv("STAGE_CACHE_TTL_DASHBOARD", str(60 * 60 * 24))),
+}
+
+ROLE_CACHE_MAX_ENTRIES = int(os.getenv("ROLE_CACHE_MAX_ENTRIES", "512"))
+ROLE_CACHE_TTL = int(os.getenv("ROLE_CACHE_TTL", "3600"))
+# Floors only: both are raised to the Gemini client's worst-case call time
+# (models x attempts x (queue wait + timeout + backoff)), so the lock outlives
+# its holder and waiters don't give up while it is still retrying
+BENCHMARK_LOCK_TIMEOUT = int(os.getenv("BENCHMARK_LOCK_TIMEOUT", "120"))
+BENCHMARK_WAIT_TIMEOUT = int(os.getenv("BENCHMARK_WAIT_TIMEOUT", "45"))
+
+PREWARM_SEED_ROLES = ["Data Analyst", "Business Analyst", "Backend Developer", "DevOps Engineer"]
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", "20"))
+PREWARM_LEAD_HOURS = int(os.getenv("PREWARM_LEAD_HOURS", "24"))
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "2"))
+PREWARM_RATE_PER_MINUTE = int(os.getenv("PREWARM_RATE_PER_MINUTE", "10"))
+
+ANALYSIS_JOB_WORKERS = int(os.getenv("ANALYSIS_JOB_WORKERS", "2"))
+ANALYSIS_JOB_POLL_INTERVAL = float(os.getenv("ANALYSIS_JOB_POLL_INTERVAL", "2"))
+ANALYSIS_JOB_STALE_SECONDS = int(os.getenv("ANALYSIS_JOB_STALE_SECONDS", "600"))
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", "2"))
+ANALYSIS_JOB_REAP_INTERVAL = int(os.getenv("ANALYSIS_JOB_REAP_INTERVAL", "60"))
+
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "200"))
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "8"))
+BATCH_MAX_ARCHIVE_BYTES = int(os.getenv("BATCH_MAX_ARCHIVE_BYTES", str(200 * 1024 * 1024)))
+
+MULTI_ROLE_MAX_ROLES = int(os.getenv("MULTI_ROLE_MAX_ROLES", "6"))
+
+# llm | prefilter | fast (see llm_engine.FIT_MODES); overridable per request
+FIT_MODE = os.getenv("FIT_MODE", "llm")
+
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "512"))
+EMBEDDING_INDEX_MAX_ENTRIES = int(os.getenv("EMBEDDING_INDEX_MAX_ENTRIES", "20000"))
+EMBEDDING_INDEX_REFRESH_SECONDS = int(os.getenv("EMBEDDING_INDEX_REFRESH_SECONDS", "30"))
+
+# SimHash similarity (0-1) above which a cached analysis for the same role
+# is reused; 1 disables near-duplicate hits
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.95"))
+NEAR_DUPLICATE_BUCKET_SIZE = int(os.getenv("NEAR_DUPLICATE_BUCKET_SIZE", "32"))
+
+# Approximate token budgets for the resume text inlined into LLM prompts
+PROMPT_BUDGET_FIT_TOKENS = int(os.getenv("PROMPT_BUDGET_FIT_TOKENS", "1500"))
+PROMPT_BUDGET_GROWTH_TOKENS = int(os.getenv("PROMPT_BUDGET_GROWTH_TOKENS", "400"))
+
+SSE_KEEPALIVE_SECONDS = int(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+# Dashboards are rendered locally; when enabled, an LLM-written executive
+# summary is generated in the background and merged into cached results
+DASHBOARD_LLM_ENRICHMENT = os.getenv("DASHBOARD_LLM_ENRICHMENT", "False") == "True"
+DASHBOARD_ENRICHMENT_WORKERS = int(os.getenv("DASHBOARD_ENRICHMENT_WORKERS", "2"))
+
+JOB_STORE_TTL = int(os.getenv("JOB_STORE_TTL", str(60 * 60 * 6)))
+JOB_STORE_FAILURE_BACKOFF = int(os.getenv("JOB_STORE_FAILURE_BACKOFF", "300"))
+JOB_STORE_RESULTS_PER_FETCH = int(os.getenv("JOB_STORE_RESULTS_PER_FETCH", "50"))
+JOB_STORE_REFRESH_WORKERS = int(os.getenv("JOB_STORE_REFRESH_WORKERS", "2"))
+# Locations a benchmarked role may be fetched for via the public job search
+JOB_STORE_LOCATIONS = [l.strip() for l in os.getenv("JOB_STORE_LOCATIONS", "India").split(",") if l.strip()]
+
+# Point these at `manage.py run_api_stubs` for offline runs and load tests
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+ADZUNA_API_BASE = os.getenv("ADZUNA_API_BASE", "https://api.adzuna.com/v1/api")
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True") == "True"
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True") == "True"
+# Served by MetricsMiddleware at METRICS_PATH to scrapers that send
+# "Authorization: Bearer $METRICS_TOKEN" or connect from one of
+# METRICS_ALLOWED_NETWORKS (e.g. "10.0.0.0/8"); with neither set it isn't
+# served. Behind a reverse proxy REMOTE_ADDR is the proxy, so use the token
+METRICS_PATH = os.getenv("METRICS_PATH", "/internal/metrics")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ALLOWED_NETWORKS = [n.strip() for n in os.getenv("METRICS_ALLOWED_NETWORKS", "").split(",") if n.strip()]
+# Adds per-stage timings to analysis responses, e.g. for load tests
+EXPOSE_STAGE_TIMINGS = os.getenv("EXPOSE_STAGE_TIMINGS", "False") == "True"
+
+# Token buckets: RATE tokens/second refill, BURST tokens capacity. Enforced
+# per cache, so per process unless REDIS_URL is set (see CACHES)
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", "0.2"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "3"))
+RATE_LIMIT_API_KEYS = [k.strip() for k in os.getenv("RATE_LIMIT_API_KEYS", "").split(",") if k.strip()]
+RATE_LIMIT_API_KEY_RATE = float(os.getenv("RATE_LIMIT_API_KEY_RATE", "2"))
+RATE_LIMIT_API_KEY_BURST = int(os.getenv("RATE_LIMIT_API_KEY_BURST", "20"))
+# Separate bucket for the public job search (GET /api/jobs/)
+RATE_LIMIT_JOBS_RATE = float(os.getenv("RATE_LIMIT_JOBS_RATE", "1"))
+RATE_LIMIT_JOBS_BURST = int(os.getenv("RATE_LIMIT_JOBS_BURST", "10"))
+
+# Concurrency is per process; the QPS cap is shared only with REDIS_URL set
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_MAX_QPS = float(os.getenv("GEMINI_MAX_QPS", "10"))
+GEMINI_QUEUE_TIMEOUT = float(os.getenv("GEMINI_QUEUE_TIMEOUT", "30"))
+
+# Analyses are written before the response by default. With write-behind
+# they are persisted after it in bulk_create batches from an in-memory
+# buffer, which a crash or kill of the process loses (up to one interval)
+ANALYSIS_WRITE_BEHIND = os.getenv("ANALYSIS_WRITE_BEHIND", "False") == "True"
+ANALYSIS_WRITE_BATCH_SIZE = int(os.getenv("ANALYSIS_WRITE_BATCH_SIZE", "50"))
+ANALYSIS_WRITE_INTERVAL = float(os.getenv("ANALYSIS_WRITE_INTERVAL", "0.5"))
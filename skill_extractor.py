@@ -0,0 +1,196 @@
+import logging
+import re
+import threading
+from collections import deque
+from django.core.cache import cache
+from .models import RoleMarketBenchmark, RoleSkill
+
+logger = logging.getLogger(__name__)
+
+VOCABULARY_VERSION_KEY = "skill_vocabulary_version"
+
+# Canonical skill -> spellings that mean the same thing on a resume
+SKILL_ALIASES = {
+    "JavaScript": ["js", "javascript", "ecmascript", "es6"],
+    "TypeScript": ["ts", "typescript"],
+    "Node.js": ["node", "nodejs", "node js", "node.js"],
+    "React": ["react", "reactjs", "react.js"],
+    "Python": ["python", "python3"],
+    "PostgreSQL": ["postgres", "postgresql", "psql"],
+    "MySQL": ["mysql"],
+    "SQL": ["sql"],
+    "NoSQL": ["nosql"],
+    "MongoDB": ["mongo", "mongodb"],
+    "Kubernetes": ["k8s", "kubernetes"],
+    "Docker": ["docker", "containerization"],
+    "CI/CD": ["ci/cd", "ci cd", "cicd", "continuous integration", "continuous delivery"],
+    "AWS": ["aws", "amazon web services"],
+    "GCP": ["gcp", "google cloud", "google cloud platform"],
+    "Azure": ["azure", "microsoft azure"],
+    "Machine Learning": ["ml", "machine learning"],
+    "Deep Learning": ["dl", "deep learning"],
+    "Natural Language Processing": ["nlp", "natural language processing"],
+    "Power BI": ["power bi", "powerbi"],
+    "Excel": ["excel", "ms excel", "microsoft excel", "advanced excel"],
+    "Statistics": ["statistics", "statistical analysis"],
+    "REST APIs": ["rest", "rest api", "rest apis", "restful", "restful apis"],
+    "Git": ["git", "github", "gitlab"],
+    "Linux": ["linux", "unix"],
+    "Terraform": ["terraform"],
+    "Data Visualization": ["data visualization", "data visualisation"],
+}
+
+# Spellings that are everyday words or letter pairs in lowercase ("the rest
+# of the team", "to excel at", "react to") and so only count as the skill
+# when written exactly like this
+CASE_SENSITIVE_ALIASES = {
+    "REST": "REST APIs",
+    "TS": "TypeScript",
+    "ML": "Machine Learning",
+    "DL": "Deep Learning",
+    "Excel": "Excel",
+    "React": "React",
+    "Node": "Node.js",
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_skill(text):
+    return _WHITESPACE.sub(" ", text.strip().lower())
+
+_alias_index = {
+    normalize_skill(alias): canonical
+    for canonical, aliases in SKILL_ALIASES.items()
+    for alias in [canonical, *aliases]
+}
+
+_case_sensitive_patterns = {normalize_skill(alias) for alias in CASE_SENSITIVE_ALIASES}
+
+def skill_key(skill):
+    """Comparison key that treats aliases of one skill as equal."""
+    normalized = normalize_skill(skill)
+    return normalize_skill(_alias_index.get(normalized, normalized))
+
+class SkillMatcher:
+    """
+    Aho-Corasick automaton over lowercased skill patterns. A single pass
+    over the resume finds every pattern; matches must sit on word
+    boundaries so "java" does not fire inside "javascript". Patterns in
+    `exact` ({spelling: canonical skill}) must also match case.
+    """
+
+    def __init__(self, patterns, exact=None):
+        # patterns: {normalized pattern: canonical skill}
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for pattern, canonical in patterns.items():
+            self._add(pattern, canonical)
+        for spelling, canonical in (exact or {}).items():
+            self._add(normalize_skill(spelling), canonical, spelling)
+        self._build_failure_links()
+
+    def _add(self, pattern, canonical, spelling=None):
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = nxt
+        self._output[node].append((len(pattern), canonical, spelling))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, text):
+        original = _WHITESPACE.sub(" ", text.strip())
+        text = original.lower()
+        if len(original) != len(text):
+            # Lowercasing changed offsets (rare Unicode); skip exact patterns
+            original = None
+        found = {}
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, canonical, spelling in self._output[node]:
+                start = end - length + 1
+                if spelling is not None and (original is None or original[start:end + 1] != spelling):
+                    continue
+                if _is_boundary(text, start - 1) and _is_boundary(text, end + 1):
+                    found.setdefault(canonical, start)
+        # Order of first appearance keeps the output stable for caching
+        return sorted(found, key=found.get)
+
+def _is_boundary(text, index):
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+def build_vocabulary():
+    """
+    Union of every benchmark and role-profile skill plus the alias table,
+    as {normalized pattern: canonical skill}. Case-sensitive spellings are
+    left out; the matcher adds them from CASE_SENSITIVE_ALIASES.
+    """
+    patterns = {p: c for p, c in _alias_index.items() if p not in _case_sensitive_patterns}
+    skills = []
+    for core, advanced in RoleMarketBenchmark.objects.values_list('core_skills', 'advanced_skills'):
+        skills.extend(core or [])
+        skills.extend(advanced or [])
+    for required in RoleSkill.objects.values_list('required_skills', flat=True):
+        skills.extend(required or [])
+
+    for skill in skills:
+        if not isinstance(skill, str) or not skill.strip():
+            continue
+        pattern = normalize_skill(skill)
+        if pattern in _case_sensitive_patterns:
+            continue
+        patterns.setdefault(pattern, _alias_index.get(pattern, skill.strip()))
+    return patterns
+
+def get_vocabulary_version():
+    return cache.get(VOCABULARY_VERSION_KEY, 0)
+
+def invalidate_skill_matcher():
+    cache.add(VOCABULARY_VERSION_KEY, 0, None)
+    try:
+        cache.incr(VOCABULARY_VERSION_KEY)
+    except ValueError:
+        cache.set(VOCABULARY_VERSION_KEY, 1, None)
+
+_matcher = None
+_matcher_version = None
+_matcher_lock = threading.Lock()
+
+def get_skill_matcher():
+    """
+    Compiled matcher for the current vocabulary, rebuilt only when a
+    benchmark or role profile changes (see invalidate_skill_matcher).
+    """
+    global _matcher, _matcher_version
+    version = get_vocabulary_version()
+    if _matcher is None or _matcher_version != version:
+        with _matcher_lock:
+            if _matcher is None or _matcher_version != version:
+                vocabulary = build_vocabulary()
+                _matcher = SkillMatcher(vocabulary, CASE_SENSITIVE_ALIASES)
+                _matcher_version = version
+                logger.info(f"Compiled skill matcher v{version} with {len(vocabulary)} patterns")
+    return _matcher
+
+def extract_skills(resume_text):
+    return get_skill_matcher().find(resume_text)
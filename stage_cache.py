@@ -0,0 +1,135 @@
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from .caching import LRUCache
+from .gemini_client import get_gemini_client
+from .metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STAGE_TTLS = {
+    "fit": 60 * 60 * 24,
+    "growth": 60 * 60 * 24,
+    "dashboard": 60 * 60 * 24,
+}
+
+_l1 = LRUCache(
+    max_entries=getattr(settings, 'STAGE_CACHE_L1_MAX_ENTRIES', 1024),
+    ttl=getattr(settings, 'STAGE_CACHE_L1_TTL', 300)
+)
+
+def get_stage_ttl(stage):
+    ttls = {**DEFAULT_STAGE_TTLS, **getattr(settings, 'STAGE_CACHE_TTLS', {})}
+    return ttls.get(stage, 60 * 60)
+
+def _generation_key(stage):
+    return f"stage_generation_{stage}"
+
+def get_stage_generation(stage):
+    return cache.get(_generation_key(stage), 1)
+
+def invalidate_stage(stage):
+    """
+    Bumps the stage generation so every entry written under the old one
+    (in both tiers, across all workers) is ignored from now on.
+    """
+    key = _generation_key(stage)
+    cache.add(key, 1, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+def canonical_hash(payload):
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def _stage_digest(version, args, kwargs):
+    return canonical_hash({
+        "version": version,
+        "models": list(get_gemini_client().models),
+        "args": args,
+        "kwargs": kwargs
+    })
+
+def stage_cache_key(stage, version, args, kwargs):
+    return f"stage_{stage}_g{get_stage_generation(stage)}_{_stage_digest(version, args, kwargs)}"
+
+async def astage_cache_key(stage, version, args, kwargs):
+    generation = await cache.aget(_generation_key(stage), 1)
+    return f"stage_{stage}_g{generation}_{_stage_digest(version, args, kwargs)}"
+
+def get_stage_result(key):
+    result = _l1.get(key)
+    if result is not None:
+        CACHE_REQUESTS.inc(tier="stage_l1", result="hit")
+        # Callers own the returned dict, so never hand out the shared L1 copy
+        return copy.deepcopy(result)
+    result = cache.get(key)
+    CACHE_REQUESTS.inc(tier="stage_l2", result="miss" if result is None else "hit")
+    if result is not None:
+        _l1.set(key, copy.deepcopy(result))
+    return result
+
+def set_stage_result(stage, key, result):
+    _l1.set(key, copy.deepcopy(result))
+    cache.set(key, result, get_stage_ttl(stage))
+
+async def aget_stage_result(key):
+    result = _l1.get(key)
+    if result is not None:
+        CACHE_REQUESTS.inc(tier="stage_l1", result="hit")
+        return copy.deepcopy(result)
+    result = await cache.aget(key)
+    CACHE_REQUESTS.inc(tier="stage_l2", result="miss" if result is None else "hit")
+    if result is not None:
+        _l1.set(key, copy.deepcopy(result))
+    return result
+
+async def aset_stage_result(stage, key, result):
+    _l1.set(key, copy.deepcopy(result))
+    await cache.aset(key, result, get_stage_ttl(stage))
+
+def cached_stage(stage, version):
+    """
+    Caches a pipeline stage on a canonical hash of its prompt version, the
+    model chain and its exact arguments. Failed stages (None) are not cached.
+    Sync and async variants of a stage share entries.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = await astage_cache_key(stage, version, args, kwargs)
+                result = await aget_stage_result(key)
+                if result is not None:
+                    logger.debug(f"Stage cache hit for {stage}")
+                    return result
+                result = await func(*args, **kwargs)
+                if result is not None:
+                    await aset_stage_result(stage, key, result)
+                return result
+            async_wrapper.stage = stage
+            async_wrapper.version = version
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = stage_cache_key(stage, version, args, kwargs)
+            result = get_stage_result(key)
+            if result is not None:
+                logger.debug(f"Stage cache hit for {stage}")
+                return result
+            result = func(*args, **kwargs)
+            if result is not None:
+                set_stage_result(stage, key, result)
+            return result
+        wrapper.stage = stage
+        wrapper.version = version
+        return wrapper
+    return decorator
@@ -1,3 +1,488 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+import threading
+import zipfile
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import close_old_connections
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from . import analysis_jobs, gemini_client, pdf_parser, scoring, stage_cache
+from .analysis_jobs import claim_next_job, reap_stale_jobs_periodically
+from .analysis_service import run_analysis
+from .analysis_stream import stream_analysis_events
+from .api_stubs import StubConfig, start_stub_server
+from .batch_analysis import BatchInputError, collect_batch_files
+from .llm_engine import evaluate_fit_for_roles, evaluate_fit_with_guardrails
+from .load_test import synthetic_resume_pdf, synthetic_resume_text
+from .metrics import CACHE_REQUESTS, render_metrics
+from .models import AnalysisJob, ResumeAnalysis, RoleMarketBenchmark
+from .pdf_parser import PDFLimitExceeded, extract_pdf
+from .persistence import AnalysisWriter, build_analysis, flush_pending_analyses
+from .pipeline import PipelineCancelled, StagePipeline, check_cancelled
+from .prompt_compaction import compact_for_growth, compact_resume, estimate_tokens
+from .rate_limiting import check_rate_limit
+from .skill_extractor import CASE_SENSITIVE_ALIASES, SkillMatcher
 
-# Create your tests here.
+BENCHMARK = {
+    "core_skills": ["Python", "SQL"],
+    "advanced_skills": ["Tableau"],
+    "experience_expectation": "1-3 years",
+    "project_expectation": "A dashboard"
+}
+
+def resume_text(name, seed=7):
+    # Same body under a different header: a near-duplicate, not an exact one
+    body = "\n".join(synthetic_resume_text(seed).split("\n")[2:])
+    return f"{name}\n{name.split()[0].lower()}@example.com\n{body * 3}"
+
+class StubServerTestCase(TransactionTestCase):
+    """
+    Runs against api_stubs on a free port with every in-process cache
+    emptied, so Gemini calls can be counted from the stub's stats.
+    """
+    gemini_latency = "fixed:0"
+
+    def setUp(self):
+        self.stub_config = StubConfig(gemini_latency=self.gemini_latency, adzuna_latency="fixed:0")
+        server = start_stub_server(port=0, config=self.stub_config)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(
+            GEMINI_API_BASE=f"http://127.0.0.1:{server.server_address[1]}/v1beta",
+            GEMINI_API_KEY="test-key",
+            GEMINI_MODELS=["stub-model"],
+            GEMINI_MAX_ATTEMPTS=1,
+            MEDIA_ROOT=media_root,
+            RATE_LIMIT_ENABLED=True
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self._reset_caches()
+        self.addCleanup(self._reset_caches)
+
+    def _reset_caches(self):
+        cache.clear()
+        scoring._role_data_cache.clear()
+        stage_cache._l1.clear()
+        gemini_client._breakers.clear()
+        gemini_client._client = None
+        gemini_client._async_client = None
+
+    def gemini_calls(self, kind):
+        return self.stub_config.stats.get(f"gemini_{kind}", 0)
+
+class BenchmarkSingleFlightTests(StubServerTestCase):
+    # Slow enough that every caller arrives while the first is generating
+    gemini_latency = "fixed:0.5"
+
+    def test_concurrent_callers_share_one_generation(self):
+        results = []
+
+        def fetch():
+            try:
+                results.append(scoring.get_market_benchmark("Quant Analyst"))
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=fetch) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.gemini_calls("benchmark"), 1)
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(result and result['core_skills'] for result in results))
+        self.assertEqual(RoleMarketBenchmark.objects.filter(role_key="quant analyst").count(), 1)
+
+class NearDuplicateCacheTests(StubServerTestCase):
+
+    @override_settings(NEAR_DUPLICATE_THRESHOLD=0.8, FIT_MODE="llm")
+    def test_near_duplicate_gets_its_own_row_and_file(self):
+        first_text = resume_text("Alice Example")
+        second_text = resume_text("Carol Third")
+        first, first_created = run_analysis(
+            first_text, ContentFile(first_text.encode(), name="alice.pdf"), "Data Analyst"
+        )
+        second, second_created = run_analysis(
+            second_text, ContentFile(second_text.encode(), name="carol.pdf"), "Data Analyst"
+        )
+        flush_pending_analyses()
+
+        self.assertTrue(first_created and second_created)
+        self.assertLess(second['cache_similarity'], 1.0)
+        self.assertEqual(self.gemini_calls("fit"), 1)
+        self.assertEqual(second['match_percentage'], first['match_percentage'])
+        self.assertNotEqual(second['public_id'], first['public_id'])
+        self.assertNotEqual(second['resume_file'], first['resume_file'])
+
+        row = ResumeAnalysis.objects.get(public_id=second['public_id'])
+        with row.resume_file.open() as stored:
+            self.assertEqual(stored.read(), second_text.encode())
+
+        # A repeat of the second upload is now an exact hit on its own result
+        repeat, repeat_created = run_analysis(
+            second_text, ContentFile(second_text.encode(), name="carol.pdf"), "Data Analyst"
+        )
+        self.assertFalse(repeat_created)
+        self.assertEqual(repeat['public_id'], second['public_id'])
+
+class MultiRoleFanOutTests(StubServerTestCase):
+
+    def test_one_call_fills_the_fit_cache_for_every_role(self):
+        text = resume_text("Alice Example")
+        benchmarks = {"Data Analyst": BENCHMARK, "Backend Developer": {**BENCHMARK, "core_skills": ["Django"]}}
+
+        fits, llm_calls = evaluate_fit_for_roles(text, benchmarks)
+
+        self.assertEqual(llm_calls, 1)
+        self.assertEqual(self.gemini_calls("multi_role_fit"), 1)
+        self.assertEqual(set(fits), set(benchmarks))
+        # Single-role analyses of the same resume are served from the fan-out
+        for role, benchmark in benchmarks.items():
+            self.assertEqual(evaluate_fit_with_guardrails(text, role, benchmark), fits[role])
+        self.assertEqual(self.gemini_calls("fit"), 0)
+
+        _, llm_calls = evaluate_fit_for_roles(text, benchmarks)
+        self.assertEqual(llm_calls, 0)
+
+class TokenBucketTests(StubServerTestCase):
+
+    @override_settings(RATE_LIMIT_RATE=0.01, RATE_LIMIT_BURST=3)
+    def test_burst_then_retry_after(self):
+        factory = RequestFactory()
+        request = factory.post("/", REMOTE_ADDR="10.0.0.1")
+        for _ in range(3):
+            self.assertIsNone(check_rate_limit(request))
+        retry_after = check_rate_limit(request)
+        self.assertIsNotNone(retry_after)
+        self.assertGreater(retry_after, 0)
+
+        # Buckets are per client
+        self.assertIsNone(check_rate_limit(factory.post("/", REMOTE_ADDR="10.0.0.2")))
+
+    @override_settings(RATE_LIMIT_JOBS_RATE=0.01, RATE_LIMIT_JOBS_BURST=2)
+    def test_view_answers_429_with_retry_after(self):
+        url = reverse("job-list")
+        for _ in range(2):
+            self.assertEqual(self.client.get(url, {"role": "Data Analyst"}).status_code, 404)
+        response = self.client.get(url, {"role": "Data Analyst"})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+class WriteBehindTests(StubServerTestCase):
+
+    def queue_analysis(self, writer, content):
+        analysis, data = build_analysis(
+            ContentFile(content, name="resume.pdf"),
+            target_role="Data Analyst", match_percentage=60, readiness_score=55
+        )
+        writer.submit(analysis, data)
+        return analysis
+
+    def test_rows_and_files_land_on_flush(self):
+        # Long interval, so only the explicit flush writes anything
+        writer = AnalysisWriter(batch_size=10, interval=60)
+        first = self.queue_analysis(writer, b"%PDF same bytes")
+        second = self.queue_analysis(writer, b"%PDF same bytes")
+        self.assertFalse(ResumeAnalysis.objects.exists())
+        self.assertFalse(default_storage.exists(first.resume_file.name))
+
+        writer.flush()
+
+        rows = ResumeAnalysis.objects.filter(public_id__in=[first.public_id, second.public_id])
+        self.assertEqual(rows.count(), 2)
+        self.assertEqual({row.role_key for row in rows}, {"data analyst"})
+        # Content-addressed: identical uploads share one stored file
+        self.assertEqual(first.resume_file.name, second.resume_file.name)
+        self.assertTrue(default_storage.exists(first.resume_file.name))
+        self.assertEqual(len(default_storage.listdir(first.resume_file.name.rsplit("/", 1)[0])[1]), 1)
+
+class PipelineFailureTests(SimpleTestCase):
+
+    def test_optional_failure_yields_none_and_dependants_still_run(self):
+        def broken():
+            raise RuntimeError("optional stage down")
+
+        pipeline = StagePipeline("test")
+        pipeline.add_stage("base", lambda: 2)
+        pipeline.add_stage("extra", broken, required=False)
+        pipeline.add_stage("total", lambda base, extra: base + (extra or 0), depends_on=("base", "extra"))
+
+        run = pipeline.run()
+
+        self.assertIsNone(run.results["extra"])
+        self.assertIsNone(run.timings["extra"])
+        self.assertEqual(run.results["total"], 2)
+
+    def test_required_failure_raises_and_cancels_running_stages(self):
+        release = threading.Event()
+        finished = threading.Event()
+        outcome = {}
+
+        def failing():
+            raise RuntimeError("required stage down")
+
+        def slow():
+            release.wait(5)
+            try:
+                check_cancelled()
+                outcome["cancelled"] = False
+            except PipelineCancelled:
+                outcome["cancelled"] = True
+            finally:
+                finished.set()
+
+        pipeline = StagePipeline("test")
+        pipeline.add_stage("slow", slow, required=False)
+        pipeline.add_stage("failing", failing)
+        pipeline.add_stage("after", lambda failing: failing, depends_on=("failing",))
+
+        with self.assertRaises(RuntimeError):
+            pipeline.run()
+        release.set()
+        self.assertTrue(finished.wait(5))
+        # The stage already running sees the failure before its next external call
+        self.assertTrue(outcome["cancelled"])
+
+    def test_check_cancelled_is_a_no_op_outside_a_pipeline(self):
+        check_cancelled()
+
+class PdfExtractionTests(SimpleTestCase):
+
+    def setUp(self):
+        pdf_parser._extraction_cache.clear()
+        self.addCleanup(pdf_parser._extraction_cache.clear)
+
+    def test_resubmitted_pdf_is_a_cache_hit(self):
+        data = synthetic_resume_pdf(11)
+        first = extract_pdf(ContentFile(data, name="a.pdf"))
+        second = extract_pdf(ContentFile(data, name="b.pdf"))
+
+        self.assertFalse(first["cache_hit"])
+        self.assertTrue(second["cache_hit"])
+        self.assertEqual(second["text"], first["text"])
+        self.assertEqual(first["page_count"], 1)
+        self.assertIn('tier="pdf",result="hit"', "\n".join(CACHE_REQUESTS.samples()))
+
+    @override_settings(PDF_MAX_BYTES=1024)
+    def test_oversized_pdf_is_rejected_before_parsing(self):
+        with self.assertRaises(PDFLimitExceeded):
+            extract_pdf(ContentFile(synthetic_resume_pdf(12), name="big.pdf"))
+        self.assertEqual(len(pdf_parser._extraction_cache), 0)
+
+    @override_settings(PDF_MAX_PAGES=0, RATE_LIMIT_ENABLED=False)
+    def test_page_limit_answers_413(self):
+        upload = SimpleUploadedFile("long.pdf", synthetic_resume_pdf(13), content_type="application/pdf")
+        response = self.client.post(reverse("analyze-resume"), {"resume_file": upload, "target_role": "Data Analyst"})
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("limit is 0", response.json()["error"])
+
+    @override_settings(PDF_MAX_BYTES=1024, RATE_LIMIT_ENABLED=False)
+    def test_byte_limit_answers_413(self):
+        upload = SimpleUploadedFile("big.pdf", synthetic_resume_pdf(14), content_type="application/pdf")
+        response = self.client.post(reverse("analyze-resume"), {"resume_file": upload, "target_role": "Data Analyst"})
+        self.assertEqual(response.status_code, 413)
+
+class SkillMatcherTests(SimpleTestCase):
+
+    def setUp(self):
+        self.matcher = SkillMatcher({"python": "Python", "java": "Java"}, CASE_SENSITIVE_ALIASES)
+
+    def test_case_only_aliases_match_their_written_case(self):
+        found = self.matcher.find("Built REST services in TS and Python; some ML work.")
+        self.assertEqual(found, ["REST APIs", "TypeScript", "Python", "Machine Learning"])
+
+    def test_case_only_aliases_ignore_ordinary_words(self):
+        found = self.matcher.find("Took a rest, then the ml sample and ts file; react quickly to node failures.")
+        self.assertEqual(found, [])
+
+    def test_matches_respect_word_boundaries(self):
+        self.assertEqual(self.matcher.find("JavaScript and PYTHON"), ["Python"])
+
+class PromptCompactionTests(SimpleTestCase):
+
+    def test_output_fits_the_budget(self):
+        for seed in range(20):
+            text = synthetic_resume_text(seed) * 3
+            for budget in (40, 150, 400):
+                compacted = compact_resume(text, budget)
+                self.assertLessEqual(compacted["compacted_tokens"], budget)
+                self.assertEqual(compacted["compacted_tokens"], estimate_tokens(compacted["text"]))
+
+    def test_tight_budget_keeps_skills_first(self):
+        compacted = compact_resume(synthetic_resume_text(3) * 3, 30)
+        # Sections come back in document order, and the summary comes first in the resume
+        self.assertEqual(compacted["sections"][0], "skills")
+        self.assertNotIn("summary", compacted["sections"])
+        self.assertIn("experience", compacted["truncated_sections"])
+
+    @override_settings(PROMPT_BUDGET_GROWTH_TOKENS=100)
+    def test_growth_budget_comes_from_settings(self):
+        compacted = compact_for_growth(synthetic_resume_text(5) * 3)
+        self.assertLessEqual(compacted["compacted_tokens"], 100)
+        self.assertGreater(compacted["tokens_saved"], 0)
+
+class StreamEventOrderTests(StubServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        pdf_parser._extraction_cache.clear()
+
+    def parse(self, frames):
+        events = []
+        for frame in frames:
+            fields = dict(line.split(": ", 1) for line in frame.strip().split("\n") if not line.startswith(":"))
+            if "event" in fields:
+                events.append((fields["event"], json.loads(fields["data"])))
+        return events
+
+    def test_retry_then_extraction_first_and_result_last(self):
+        frames = list(stream_analysis_events(ContentFile(synthetic_resume_pdf(21), name="r.pdf"), "Data Analyst"))
+
+        self.assertEqual(frames[0], "retry: 3000\n\n")
+        events = self.parse(frames[1:])
+        self.assertEqual(events[0][0], "stage")
+        self.assertEqual(events[0][1]["stage"], "extraction")
+        self.assertFalse(events[0][1]["data"]["cache_hit"])
+        self.assertEqual([name for name, _ in events[1:-1]], ["stage"] * (len(events) - 2))
+        self.assertEqual(events[-1][0], "result")
+        # The result is stored before the client is told its public_id
+        self.assertTrue(ResumeAnalysis.objects.filter(public_id=events[-1][1]["public_id"]).exists())
+
+    def test_unreadable_pdf_ends_with_an_error_event(self):
+        frames = list(stream_analysis_events(ContentFile(b"not a pdf", name="r.pdf"), "Data Analyst"))
+        events = self.parse(frames[1:])
+        self.assertEqual([name for name, _ in events], ["error"])
+
+def zip_archive(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as bundle:
+        for name, data in members.items():
+            bundle.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+class BatchLimitTests(SimpleTestCase):
+
+    def test_archive_members_are_filtered(self):
+        archive = zip_archive({
+            "a.pdf": b"%PDF a", "nested/b.PDF": b"%PDF b", "notes.txt": b"x",
+            "__MACOSX/._a.pdf": b"junk", ".hidden.pdf": b"junk"
+        })
+        files = collect_batch_files([ContentFile(b"%PDF c", name="c.pdf")], archive)
+        self.assertEqual([f.name for f in files], ["c.pdf", "a.pdf", "b.PDF"])
+
+    @override_settings(BATCH_MAX_FILES=2)
+    def test_file_count_limit_includes_archive_members(self):
+        uploads = [ContentFile(b"%PDF", name=f"{i}.pdf") for i in range(2)]
+        with self.assertRaisesMessage(BatchInputError, "at most 2"):
+            collect_batch_files(uploads, zip_archive({"extra.pdf": b"%PDF"}))
+        with self.assertRaisesMessage(BatchInputError, "at most 2"):
+            collect_batch_files(uploads + [ContentFile(b"%PDF", name="3.pdf")], None)
+
+    @override_settings(BATCH_MAX_ARCHIVE_BYTES=1000)
+    def test_archive_size_is_checked_before_inflating(self):
+        archive = zip_archive({"big.pdf": b"0" * 5000})
+        with self.assertRaisesMessage(BatchInputError, "expands beyond 1000 bytes"):
+            collect_batch_files([], archive)
+
+    def test_invalid_or_empty_uploads(self):
+        with self.assertRaisesMessage(BatchInputError, "not a valid zip"):
+            collect_batch_files([], io.BytesIO(b"not a zip"))
+        with self.assertRaisesMessage(BatchInputError, "No PDF resumes"):
+            collect_batch_files([], zip_archive({"notes.txt": b"x"}))
+
+class JobClaimTests(TransactionTestCase):
+
+    def setUp(self):
+        analysis_jobs._last_reap = None
+        self.addCleanup(setattr, analysis_jobs, "_last_reap", None)
+
+    def create_jobs(self, count, **fields):
+        return [
+            AnalysisJob.objects.create(resume_file=f"resumes/{i}.pdf", target_role="Data Analyst", **fields)
+            for i in range(count)
+        ]
+
+    def test_concurrent_workers_claim_each_job_once(self):
+        self.create_jobs(20)
+        claimed = []
+
+        def work():
+            try:
+                while True:
+                    job = claim_next_job()
+                    if job is None:
+                        return
+                    claimed.append(job.pk)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=work) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(claimed), 20)
+        self.assertEqual(len(set(claimed)), 20)
+        self.assertFalse(AnalysisJob.objects.filter(status=AnalysisJob.STATUS_PENDING).exists())
+        self.assertEqual(set(AnalysisJob.objects.values_list('attempts', flat=True)), {1})
+
+    @override_settings(ANALYSIS_JOB_STALE_SECONDS=60, ANALYSIS_JOB_MAX_ATTEMPTS=2, ANALYSIS_JOB_REAP_INTERVAL=60)
+    def test_stale_jobs_are_reaped_at_most_once_per_interval(self):
+        long_ago = timezone.now() - timezone.timedelta(seconds=600)
+        retry, = self.create_jobs(1, status=AnalysisJob.STATUS_RUNNING, started_at=long_ago, attempts=1)
+        exhausted, = self.create_jobs(1, status=AnalysisJob.STATUS_RUNNING, started_at=long_ago, attempts=2)
+
+        reap_stale_jobs_periodically()
+        retry.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual(retry.status, AnalysisJob.STATUS_PENDING)
+        self.assertEqual(exhausted.status, AnalysisJob.STATUS_FAILED)
+
+        late, = self.create_jobs(1, status=AnalysisJob.STATUS_RUNNING, started_at=long_ago, attempts=1)
+        reap_stale_jobs_periodically()
+        late.refresh_from_db()
+        self.assertEqual(late.status, AnalysisJob.STATUS_RUNNING)
+
+class MetricsTests(SimpleTestCase):
+
+    def test_exposition_format(self):
+        output = render_metrics()
+        self.assertTrue(output.endswith("\n"))
+        self.assertIn("# TYPE resume_cache_requests_total counter", output)
+        self.assertIn("# TYPE resume_pdf_parse_seconds histogram", output)
+        for line in output.splitlines():
+            if line and not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                self.assertTrue(name.startswith("resume_"), line)
+                float(value)
+
+    @override_settings(METRICS_TOKEN="secret", METRICS_ALLOWED_NETWORKS=[], METRICS_PATH="/internal/metrics")
+    def test_endpoint_needs_the_token(self):
+        self.assertEqual(self.client.get("/internal/metrics").status_code, 404)
+        self.assertEqual(
+            self.client.get("/internal/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 404
+        )
+        response = self.client.get("/internal/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("# HELP", response.content.decode())
+        # Not served under the public API prefix
+        self.assertEqual(self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer secret").status_code, 404)
+
+    @override_settings(METRICS_TOKEN="", METRICS_ALLOWED_NETWORKS=["10.0.0.0/8"])
+    def test_endpoint_allows_configured_networks(self):
+        self.assertEqual(self.client.get("/internal/metrics", REMOTE_ADDR="10.1.2.3").status_code, 200)
+        self.assertEqual(self.client.get("/internal/metrics", REMOTE_ADDR="203.0.113.9").status_code, 404)
@@ -1,7 +1,15 @@
 from django.urls import path
-from .views import AnalyzeResumeView, RoleProfileListView
+from .views import analyze_resume_async, AnalyzeResumeView, BatchAnalyzeResumeView, StreamAnalyzeResumeView, MultiRoleAnalyzeResumeView, AnalysisJobCreateView, AnalysisJobDetailView, RoleProfileListView, SimilarAnalysesView, JobListingView
 
 urlpatterns = [
     path('analyze-resume/', AnalyzeResumeView.as_view(), name='analyze-resume'),
+    path('analyze-resume/async/', analyze_resume_async, name='analyze-resume-async'),
+    path('analyze-resume/stream/', StreamAnalyzeResumeView.as_view(), name='analyze-resume-stream'),
+    path('analyze-resume/multi-role/', MultiRoleAnalyzeResumeView.as_view(), name='analyze-resume-multi-role'),
+    path('analyze-resume/batch/', BatchAnalyzeResumeView.as_view(), name='analyze-resume-batch'),
+    path('analysis-jobs/', AnalysisJobCreateView.as_view(), name='analysis-job-create'),
+    path('analysis-jobs/<uuid:job_id>/', AnalysisJobDetailView.as_view(), name='analysis-job-detail'),
+    path('analyses/<uuid:public_id>/similar/', SimilarAnalysesView.as_view(), name='analysis-similar'),
+    path('jobs/', JobListingView.as_view(), name='job-list'),
     path('roles/', RoleProfileListView.as_view(), name='role-list'),
 ]
@@ -1,30 +1,51 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from .serializers import ResumeUploadSerializer, ResumeAnalysisSerializer
-from .pdf_parser import extract_text_from_pdf
-from .llm_engine import analyze_resume_with_llm
-from .models import ResumeAnalysis, RoleSkill
-from .caching import get_cached_analysis, set_cached_analysis
-from jobs.adzuna_service import fetch_live_jobs
-from django.core.cache import cache
+from .serializers import ResumeUploadSerializer, BatchUploadSerializer, MultiRoleUploadSerializer
+from .llm_engine import analyze_resume_for_roles
+from .pdf_parser import extract_text_from_pdf, PDFLimitExceeded
+from .analysis_service import run_analysis, arun_analysis
+from .analysis_jobs import enqueue_analysis_job, ensure_workers_started
+from .batch_analysis import BatchInputError, collect_batch_files, stream_batch_analysis
+from .analysis_stream import stream_analysis_events
+from .job_store import is_known_job_role, search_job_listings
+from .scoring import RoleNotPrepared, get_market_benchmark
+from .models import AnalysisJob, RoleSkill, ResumeAnalysis
+from .embeddings import find_similar_analyses, vector_from_bytes
+from .persistence import flush_pending_analyses
+from .rate_limiting import check_rate_limit
+from django.conf import settings
+from django.core.files.base import ContentFile
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 
 def home(request):
     return render(request, "index.html")
 
+def rate_limit_response(request, scope="analysis"):
+    """A 429 with Retry-After if the caller's token bucket is empty, else None."""
+    retry_after = check_rate_limit(request, scope=scope)
+    if retry_after is None:
+        return None
+    response = JsonResponse({"error": "Rate limit exceeded"}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(max(math.ceil(retry_after), 1))
+    return response
+
 class AnalyzeResumeView(APIView):
     parser_classes = (MultiPartParser, FormParser)
 
     def post(self, request, *args, **kwargs):
-        client_ip = request.META.get('REMOTE_ADDR')
-        if cache.get(f"rate_limit_{client_ip}"):
-            return Response({"error": "Rate limit exceeded"}, status=status.HTTP_429_TOO_MANY_REQUESTS)
-        cache.set(f"rate_limit_{client_ip}", True, 5)
+        limited = rate_limit_response(request)
+        if limited:
+            return limited
 
         serializer = ResumeUploadSerializer(data=request.data)
         if not serializer.is_valid():
@@ -38,45 +59,190 @@ class AnalyzeResumeView(APIView):
             if not resume_text:
                 return Response({"error": "PDF extraction failed"}, status=status.HTTP_400_BAD_REQUEST)
 
-            cached = get_cached_analysis(resume_text, target_role)
-            if cached:
-                return Response(cached, status=status.HTTP_200_OK)
-
-            analysis_data = analyze_resume_with_llm(resume_text, target_role)
-            
-            # Fetch Live Jobs
-            live_jobs = fetch_live_jobs(target_role)
-            analysis_data['live_jobs'] = live_jobs
-
-            analysis = ResumeAnalysis.objects.create(
-                resume_file=resume_file,
-                target_role=target_role,
-                extracted_skills=analysis_data['extracted_skills'],
-                matched_skills=analysis_data['matched_skills'],
-                missing_skills=analysis_data['missing_skills'],
-                match_percentage=analysis_data['match_percentage'],
-                readiness_score=analysis_data['readiness_score'],
-                roadmap=analysis_data['roadmap'],
-                confidence_score=analysis_data.get('confidence_score', 0.0),
-                resume_embedding=analysis_data.get('resume_embedding')
+            result, created = run_analysis(
+                resume_text, resume_file, target_role, fit_mode=serializer.validated_data.get('fit_mode')
             )
+            return Response(result, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+        except PDFLimitExceeded as e:
+            return Response({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except RoleNotPrepared as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            logger.error(f"API Error: {e}")
+            return Response({"error": "Processing failed", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class StreamAnalyzeResumeView(APIView):
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request, *args, **kwargs):
+        limited = rate_limit_response(request)
+        if limited:
+            return limited
 
-            result = ResumeAnalysisSerializer(analysis).data
-            
-            # Append non-model data
-            result['improvement_plan'] = analysis_data.get('improvement_plan')
-            result['dashboard_summary'] = analysis_data.get('dashboard_summary')
-            result['live_jobs'] = analysis_data.get('live_jobs')
-            result['role_profile_version'] = analysis_data.get('role_profile_version')
-                
-            set_cached_analysis(resume_text, target_role, result)
+        serializer = ResumeUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            return Response(result, status=status.HTTP_201_CREATED)
+        upload = serializer.validated_data['resume_file']
+        max_bytes = getattr(settings, 'PDF_MAX_BYTES', 10 * 1024 * 1024)
+        if upload.size > max_bytes:
+            return Response({"error": f"PDF exceeds {max_bytes} bytes"}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        # The request's temp upload is closed if the client disconnects, but
+        # the analysis runs to completion, so hand it an in-memory copy.
+        resume_file = ContentFile(upload.read(), name=upload.name)
 
+        response = StreamingHttpResponse(
+            stream_analysis_events(
+                resume_file, serializer.validated_data['target_role'], serializer.validated_data.get('fit_mode')
+            ),
+            content_type="text/event-stream"
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class MultiRoleAnalyzeResumeView(APIView):
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request, *args, **kwargs):
+        limited = rate_limit_response(request)
+        if limited:
+            return limited
+
+        serializer = MultiRoleUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            resume_text = extract_text_from_pdf(serializer.validated_data['resume_file'])
+            if not resume_text:
+                return Response({"error": "PDF extraction failed"}, status=status.HTTP_400_BAD_REQUEST)
+
+            result = analyze_resume_for_roles(resume_text, serializer.validated_data['target_roles'])
+            return Response(result, status=status.HTTP_200_OK)
+
+        except PDFLimitExceeded as e:
+            return Response({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
         except Exception as e:
             logger.error(f"API Error: {e}")
             return Response({"error": "Processing failed", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class BatchAnalyzeResumeView(APIView):
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request, *args, **kwargs):
+        # One token for the whole batch rather than one per resume
+        limited = rate_limit_response(request)
+        if limited:
+            return limited
+
+        serializer = BatchUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        target_role = serializer.validated_data['target_role']
+        try:
+            files = collect_batch_files(
+                serializer.validated_data.get('resume_files'),
+                serializer.validated_data.get('archive')
+            )
+        except BatchInputError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        benchmark = get_market_benchmark(target_role)
+        if not benchmark:
+            return Response({"error": "Could not establish market benchmark for role"}, status=status.HTTP_502_BAD_GATEWAY)
+
+        response = StreamingHttpResponse(
+            stream_batch_analysis(files, target_role, benchmark),
+            content_type="application/x-ndjson"
+        )
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+@csrf_exempt
+@require_POST
+async def analyze_resume_async(request):
+    """
+    Native async variant of AnalyzeResumeView for ASGI servers: the whole
+    pipeline awaits Gemini/Adzuna on the event loop instead of holding a
+    thread per request. PDF parsing still runs in a worker thread.
+    """
+    limited = await sync_to_async(rate_limit_response)(request)
+    if limited:
+        return limited
+
+    data = request.POST.copy()
+    data.update(request.FILES)
+    serializer = ResumeUploadSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    resume_file = serializer.validated_data['resume_file']
+    target_role = serializer.validated_data['target_role']
+
+    try:
+        resume_text = await sync_to_async(extract_text_from_pdf, thread_sensitive=False)(resume_file)
+        if not resume_text:
+            return JsonResponse({"error": "PDF extraction failed"}, status=status.HTTP_400_BAD_REQUEST)
+
+        result, created = await arun_analysis(
+            resume_text, resume_file, target_role, fit_mode=serializer.validated_data.get('fit_mode')
+        )
+        return JsonResponse(result, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    except PDFLimitExceeded as e:
+        return JsonResponse({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    except RoleNotPrepared as e:
+        return JsonResponse({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+    except Exception as e:
+        logger.error(f"API Error: {e}")
+        return JsonResponse({"error": "Processing failed", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def serialize_job(job):
+    return {
+        "job_id": str(job.pk),
+        "status": job.status,
+        "target_role": job.target_role,
+        "progress": job.progress,
+        "result": job.result,
+        "error": job.error or None,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+
+class AnalysisJobCreateView(APIView):
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request, *args, **kwargs):
+        limited = rate_limit_response(request)
+        if limited:
+            return limited
+
+        serializer = ResumeUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        job = enqueue_analysis_job(
+            serializer.validated_data['resume_file'],
+            serializer.validated_data['target_role']
+        )
+        data = serialize_job(job)
+        data["status_url"] = request.build_absolute_uri(f"/api/analysis-jobs/{job.pk}/")
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+class AnalysisJobDetailView(APIView):
+    def get(self, request, job_id):
+        job = AnalysisJob.objects.filter(pk=job_id).first()
+        if not job:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+        if job.status == AnalysisJob.STATUS_PENDING:
+            # Pending jobs may predate this process; make sure someone picks them up
+            ensure_workers_started()
+        return Response(serialize_job(job))
+
 class RoleProfileListView(APIView):
     def get(self, request):
         profiles = RoleSkill.objects.all().order_by('-created_at')
@@ -87,3 +253,75 @@ class RoleProfileListView(APIView):
             "locked": p.is_locked
         } for p in profiles]
         return Response(data)
+
+class SimilarAnalysesView(APIView):
+    """
+    Analyses similar to one the caller holds the public_id of. Matches are
+    other people's uploads, so only their scores are returned, never their
+    public_id.
+    """
+
+    def get(self, request, public_id):
+        analysis = ResumeAnalysis.objects.filter(public_id=public_id).first()
+        if analysis is None:
+            # A just-returned analysis may still be in this worker's write buffer
+            flush_pending_analyses()
+            analysis = ResumeAnalysis.objects.filter(public_id=public_id).first()
+        if analysis is None:
+            return Response({"error": "Analysis not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        vector = vector_from_bytes(analysis.resume_vector)
+        if vector is None:
+            return Response({"error": "Analysis has no embedding"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            k = max(1, min(int(request.query_params.get('k', 5)), 50))
+        except ValueError:
+            return Response({"error": "k must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        # Defaults to the same role; ?role= searches another, ?role=any all of them
+        role = request.query_params.get('role', analysis.target_role)
+
+        matches = find_similar_analyses(
+            vector, k=k, target_role=None if role == 'any' else role, exclude_id=analysis.pk
+        )
+        data = [{
+            "target_role": match.target_role,
+            "match_percentage": match.match_percentage,
+            "readiness_score": match.readiness_score,
+            "similarity": similarity,
+            "created_at": match.created_at
+        } for match, similarity in matches]
+        return Response({"analysis_id": analysis.public_id, "results": data})
+
+class JobListingView(APIView):
+    def get(self, request):
+        limited = rate_limit_response(request, scope="jobs")
+        if limited:
+            return limited
+
+        role = request.query_params.get('role', '').strip()
+        if not role:
+            return Response({"error": "role is required"}, status=status.HTTP_400_BAD_REQUEST)
+        location = request.query_params.get('location', 'India')
+        if not is_known_job_role(role, location):
+            return Response(
+                {"error": "No job listings are tracked for this role and location"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = max(1, min(int(request.query_params.get('page_size', 10)), 50))
+            min_salary = request.query_params.get('min_salary')
+            min_salary = float(min_salary) if min_salary else None
+        except ValueError:
+            return Response({"error": "page, page_size and min_salary must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = search_job_listings(
+            role,
+            location=location,
+            query=request.query_params.get('q'),
+            min_salary=min_salary,
+            page=page,
+            page_size=page_size
+        )
+        return Response(data)